@@ -0,0 +1,150 @@
+import asyncio
+import json
+import threading
+import time
+
+from infrastructure import metrics
+
+_snapshot_build_seconds = metrics.REGISTRY.histogram(
+    'chart_snapshot_build_seconds', 'Time to build chart data of a base asset and serialize its snapshot')
+
+
+# Chart data of a base asset at some moment. Never mutated after publishing, so it can be read from any thread.
+# Data and its delta from the previous version are serialized once on publishing and shared by all readers
+class ChartSnapshot:
+    __slots__ = ('_base_asset_ticker', '_version', '_data', '_data_json', '_delta_json')
+
+    def __init__(self, base_asset_ticker: str, version: int, data: dict, delta: dict = None):
+        self._base_asset_ticker = base_asset_ticker
+        self._version = version
+        self._data = data
+        self._data_json = json.dumps(data)
+        self._delta_json = json.dumps(delta) if delta is not None else None
+
+    @property
+    def base_asset_ticker(self) -> str:
+        return self._base_asset_ticker
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def data(self) -> dict:
+        return self._data
+
+    @property
+    def data_json(self) -> str:
+        return self._data_json
+
+    # None if labels or strikes differ from the previous version, so only the full data can be applied
+    @property
+    def delta_json(self) -> str:
+        return self._delta_json
+
+
+# Builds chart snapshots on the event loop thread and publishes them by replacing a single reference,
+# so readers from other threads take the current snapshot without locks and never see a half updated chart.
+# The new snapshot is built aside while readers keep using the previous one.
+# Changes are collected and published not more often than once per min_interval seconds.
+# Readers waiting for a newer snapshot are woken up on every publish
+class ChartSnapshotPublisher:
+    def __init__(self, build_function: callable, min_interval: float = 0.25):
+        self._build_function = build_function  # base asset ticker -> chart data dict
+        self._min_interval = min_interval
+        self._snapshots = {}  # base asset ticker -> ChartSnapshot
+        self._changed_base_asset_tickers = set()
+        self._is_publish_scheduled = False
+        self._last_publish_time = None
+        self._publish_condition = threading.Condition()
+        self._publish_event = None  # asyncio.Event for readers on the event loop thread, created on demand
+
+    def get_snapshot(self, base_asset_ticker: str) -> ChartSnapshot:
+        return self._snapshots.get(base_asset_ticker)
+
+    # Blocks the calling thread until a snapshot with a version greater than the given one is published,
+    # returns the current snapshot on timeout. Must not be called from the event loop thread
+    def wait_for_snapshot(self, base_asset_ticker: str, after_version: int, timeout: float) -> ChartSnapshot:
+        def is_newer_published():
+            snapshot = self._snapshots.get(base_asset_ticker)
+            return snapshot is not None and snapshot.version > after_version
+
+        with self._publish_condition:
+            self._publish_condition.wait_for(is_newer_published, timeout)
+        return self._snapshots.get(base_asset_ticker)
+
+    # Same as wait_for_snapshot, but for readers on the event loop thread
+    async def wait_for_snapshot_async(self, base_asset_ticker: str, after_version: int,
+                                      timeout: float) -> ChartSnapshot:
+        deadline = time.monotonic() + timeout
+        while True:
+            snapshot = self._snapshots.get(base_asset_ticker)
+            remaining_time = deadline - time.monotonic()
+            if (snapshot is not None and snapshot.version > after_version) or remaining_time <= 0:
+                return snapshot
+
+            if self._publish_event is None:
+                self._publish_event = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._publish_event.wait(), remaining_time)
+            except asyncio.TimeoutError:
+                pass
+
+    # Publishes the snapshot later, or right away if called outside of the event loop
+    def mark_changed(self, base_asset_ticker: str):
+        self._changed_base_asset_tickers.add(base_asset_ticker)
+        if self._is_publish_scheduled:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.publish_changed()
+            return
+
+        delay = 0
+        if self._last_publish_time is not None:
+            delay = max(0., self._last_publish_time + self._min_interval - time.monotonic())
+        self._is_publish_scheduled = True
+        loop.call_later(delay, self.publish_changed)
+
+    def publish_changed(self):
+        self._is_publish_scheduled = False
+        self._last_publish_time = time.monotonic()
+        changed_base_asset_tickers, self._changed_base_asset_tickers = self._changed_base_asset_tickers, set()
+        for base_asset_ticker in changed_base_asset_tickers:
+            started_at = time.perf_counter()
+            previous_snapshot = self._snapshots.get(base_asset_ticker)
+            version = previous_snapshot.version + 1 if previous_snapshot is not None else 1
+            data = self._build_function(base_asset_ticker)
+            data['version'] = version
+            delta = _get_delta(previous_snapshot.data, data) if previous_snapshot is not None else None
+            self._snapshots[base_asset_ticker] = ChartSnapshot(base_asset_ticker, version, data, delta)
+            _snapshot_build_seconds.observe(time.perf_counter() - started_at)
+
+        if changed_base_asset_tickers:
+            with self._publish_condition:
+                self._publish_condition.notify_all()
+            if self._publish_event is not None:
+                self._publish_event.set()
+                self._publish_event = None
+
+
+# Cells of view datasets changed since the previous version as [label index, strike index, value]
+def _get_delta(previous_data: dict, data: dict):
+    if previous_data['labels'] != data['labels'] or previous_data['strikes'] != data['strikes']:
+        return None
+
+    cells = []
+    for label_index, (previous_values, values) in enumerate(zip(previous_data['view_datasets'],
+                                                                data['view_datasets'])):
+        for strike_index, (previous_value, value) in enumerate(zip(previous_values, values)):
+            if previous_value != value:
+                cells.append([label_index, strike_index, value])
+    return {
+        'version': data['version'],
+        'previous_version': previous_data['version'],
+        'last_price': data['last_price'],
+        'is_stale': data['is_stale'],
+        'cells': cells,
+    }
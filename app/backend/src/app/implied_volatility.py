@@ -1,83 +1,318 @@
 import math
 import numpy as np
-from scipy.stats import norm
+from scipy.special import ndtr, ndtri, erfcx
 
 from model import option_type
 from model.option import Option
 
 _RISK_FREE_INTEREST_RATE = 0  # risk-free interest rate
 _VOLATILITY_CALCULATION_ITERATIONS_LIMIT = 100
+_SAFEGUARDED_ITERATIONS_LIMIT = 20
+_VOLATILITY_CALCULATION_TOLERANCE = 10 ** -8
+_INV_SQRT_2PI = 1 / math.sqrt(2 * math.pi)
+_SQRT_HALF = math.sqrt(0.5)
 
+# Classic Newton method starting from the inflexion point
+SOLVER_NEWTON = 'newton'
+# Householder (Halley) iterations from an asymptotic initial guess, safeguarded by bisection within a bracket
+SOLVER_SAFEGUARDED = 'safeguarded'
+SOLVERS = (SOLVER_NEWTON, SOLVER_SAFEGUARDED)
 
-def get_iv_for_option_price(asset_price: int, option: Option, opt_price: int):
-    strike_price = option.strike
-    for param in (asset_price, strike_price, opt_price, option.type):
-        if param is None:
-            return None
+FAILURE_REASON_NONE = 0
+FAILURE_REASON_INVALID_INPUT = 1
+FAILURE_REASON_BELOW_INTRINSIC = 2
+FAILURE_REASON_ABOVE_MAX_PRICE = 3
+FAILURE_REASON_NOT_CONVERGED = 4
+FAILURE_REASON_NAMES = {
+    FAILURE_REASON_NONE: 'none',
+    FAILURE_REASON_INVALID_INPUT: 'invalid_input',
+    FAILURE_REASON_BELOW_INTRINSIC: 'below_intrinsic',
+    FAILURE_REASON_ABOVE_MAX_PRICE: 'above_max_price',
+    FAILURE_REASON_NOT_CONVERGED: 'not_converged',
+}
 
-    time_to_maturity = option.get_time_to_maturity()
 
-    tolerance = 10 ** -8
-    try:
-        iv = _implied_vol(opt_price, asset_price, strike_price, _RISK_FREE_INTEREST_RATE, time_to_maturity, tolerance, option.type)
-    except ZeroDivisionError:
-        iv = None
+class IvSolution:
+    def __init__(self, ivs: np.ndarray, iterations: np.ndarray, failure_reasons: np.ndarray):
+        self._ivs = ivs
+        self._iterations = iterations
+        self._failure_reasons = failure_reasons
 
-    if not iv or math.isinf(iv) or math.isnan(iv):
-        return None
-    return iv * 100
+    # IV values in percents, NaN where IV could not be calculated
+    @property
+    def ivs(self) -> np.ndarray:
+        return self._ivs
+
+    @property
+    def iterations(self) -> np.ndarray:
+        return self._iterations
+
+    # One of FAILURE_REASON_* values for each option
+    @property
+    def failure_reasons(self) -> np.ndarray:
+        return self._failure_reasons
+
+
+def get_iv_for_option_price(asset_price: int, option: Option, opt_price: int, solver: str = SOLVER_NEWTON):
+    return get_ivs_for_option_prices(asset_price, [option], [opt_price], solver)[0]
+
+
+# Same as get_iv_for_option_price, but for a list of options and their prices at once.
+# Returns a list of IV values (or None where IV could not be calculated) in the order of given options
+def get_ivs_for_option_prices(asset_price: int, options: [Option], opt_prices: [], solver: str = SOLVER_NEWTON) -> list:
+    if asset_price is None:
+        return [None] * len(options)
+
+    strikes = [_none_to_nan(option.strike) for option in options]
+    prices = [_none_to_nan(opt_price) for opt_price in opt_prices]
+    times_to_maturity = [option.get_time_to_maturity() for option in options]
+    is_call = [option.type == option_type.CALL for option in options]
+
+    ivs = get_iv_for_option_prices_array(asset_price, strikes, prices, times_to_maturity, is_call, solver)
+    return [None if math.isnan(iv) else float(iv) for iv in ivs]
+
+
+# Vectorized IV calculation for a whole option chain.
+# All arguments are array-like and broadcastable to each other, is_call is a mask of call options (put otherwise).
+# Returns an array of IV values in percents, NaN where IV could not be calculated
+def get_iv_for_option_prices_array(asset_prices, strikes, opt_prices, times_to_maturity, is_call,
+                                   solver: str = SOLVER_NEWTON) -> np.ndarray:
+    return solve_ivs(asset_prices, strikes, opt_prices, times_to_maturity, is_call, solver).ivs
+
+
+# Same as get_iv_for_option_prices_array, but also reports iterations count and failure reason for each option
+def solve_ivs(asset_prices, strikes, opt_prices, times_to_maturity, is_call, solver: str = SOLVER_NEWTON) -> IvSolution:
+    S, K, C, T, is_call = np.broadcast_arrays(
+        np.asarray(asset_prices, dtype=float),
+        np.asarray(strikes, dtype=float),
+        np.asarray(opt_prices, dtype=float),
+        np.asarray(times_to_maturity, dtype=float),
+        np.asarray(is_call, dtype=bool),
+    )
+    shape = S.shape
+    S, K, C, T, is_call = S.ravel(), K.ravel(), C.ravel(), T.ravel(), is_call.ravel()
+    r = _RISK_FREE_INTEREST_RATE
+    tol = _VOLATILITY_CALCULATION_TOLERANCE
+    if solver == SOLVER_NEWTON:
+        ivs, iterations = _implied_vols(C, S, K, r, T, tol, is_call)
+    elif solver == SOLVER_SAFEGUARDED:
+        ivs, iterations = _implied_vols_safeguarded(C, S, K, r, T, tol, is_call)
+    else:
+        raise ValueError(f'Unknown IV solver: {solver}')
+
+    ivs[ivs == 0] = np.nan
+    is_failed = np.isnan(ivs)
+    failure_reasons = np.full(ivs.shape, FAILURE_REASON_NONE)
+    failure_reasons[is_failed] = _get_failure_reasons(C[is_failed], S[is_failed], K[is_failed], r, T[is_failed],
+                                                      is_call[is_failed])
+    return IvSolution((ivs * 100).reshape(shape), iterations.reshape(shape), failure_reasons.reshape(shape))
+
+
+# Sensitivity of IV (in percents) to the underlying price for a fixed option price: dIV/dS = -delta / vega.
+# Allows to estimate how IV changes on an underlying move without solving for it again
+def get_iv_sensitivities_array(asset_prices, strikes, ivs, times_to_maturity, is_call) -> np.ndarray:
+    S, K, sigma, T, is_call = np.broadcast_arrays(
+        np.asarray(asset_prices, dtype=float),
+        np.asarray(strikes, dtype=float),
+        np.asarray(ivs, dtype=float) / 100,
+        np.asarray(times_to_maturity, dtype=float),
+        np.asarray(is_call, dtype=bool),
+    )
+    r = _RISK_FREE_INTEREST_RATE
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(S / K) + (r + .5 * sigma ** 2) * T) / (sigma * T ** .5)
+        delta = np.where(is_call, ndtr(d1), ndtr(d1) - 1)
+        return -100 * delta / _vega(S, sigma, K, T, r)
+
+
+# Discounted intrinsic values, no IV exists for an option price at or below them
+def get_intrinsic_values_array(asset_prices, strikes, times_to_maturity, is_call) -> np.ndarray:
+    S, K, T, is_call = np.broadcast_arrays(
+        np.asarray(asset_prices, dtype=float),
+        np.asarray(strikes, dtype=float),
+        np.asarray(times_to_maturity, dtype=float),
+        np.asarray(is_call, dtype=bool),
+    )
+    DF = np.exp(-_RISK_FREE_INTEREST_RATE * T)
+    return DF * _intrinsic_value(S / DF, K, is_call)
+
+
+# Black-Scholes option prices for IVs in percents, all arguments are array-like and broadcastable to each other
+def get_option_prices_array(asset_prices, strikes, ivs, times_to_maturity, is_call) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return _option_price(np.asarray(asset_prices, dtype=float), np.asarray(ivs, dtype=float) / 100,
+                             np.asarray(strikes, dtype=float), np.asarray(times_to_maturity, dtype=float),
+                             _RISK_FREE_INTEREST_RATE, np.asarray(is_call, dtype=bool))
 
 
 def _implied_vol(C, S, K, r, T, tol, opt_type=option_type.CALL):
-    x0 = _inflexion_point(S, K, T, r)
-    p = _option_price(S, x0, K, T, r, opt_type)
-    v = _vega(S, x0, K, T, r, opt_type)
-    if not v:
-        return None
+    ivs, _ = _implied_vols(np.array([C], dtype=float), np.array([S], dtype=float), np.array([K], dtype=float), r,
+                           np.array([T], dtype=float), tol, np.array([opt_type == option_type.CALL]))
+    return None if math.isnan(ivs[0]) else float(ivs[0])
+
+
+# Newton iterations run for all lanes together. Every lane leaves the iteration set
+# as soon as it converges or fails (zero vega), so the semantics for a single lane
+# are the same as for the classic scalar Newton method with iterations limit.
+# No IV exists for a price at or below the intrinsic value, and iterations would stop anywhere
+# on the flat tail of the option price there, so such lanes are not solved
+def _implied_vols(C, S, K, r, T, tol, is_call) -> (np.ndarray, np.ndarray):
+    result = np.full(C.shape, np.nan)
+    iterations = np.zeros(C.shape, dtype=int)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        DF = np.exp(-r * T)
+        is_above_intrinsic = C > DF * _intrinsic_value(S / DF, K, is_call)
+        lanes = np.flatnonzero(_is_valid_input(C, S, K, T) & is_above_intrinsic)
+        C, S, K, T, is_call = C[lanes], S[lanes], K[lanes], T[lanes], is_call[lanes]
+        x = _inflexion_point(S, K, T, r)
+
+        # infinite loop is possible here, so we count iterations
+        for i in range(_VOLATILITY_CALCULATION_ITERATIONS_LIMIT):
+            if lanes.size == 0:
+                break
+            p = _option_price(S, x, K, T, r, is_call)
+            v = _vega(S, x, K, T, r)
+            step = (p - C) / v
+            is_failed = (v == 0) | ~np.isfinite(step)
+            is_converged = ~is_failed & (np.abs(step) <= tol)
+            result[lanes[is_converged]] = x[is_converged]
+            iterations[lanes] = i
+
+            is_active = ~(is_failed | is_converged)
+            lanes = lanes[is_active]
+            C, S, K, T, is_call = C[is_active], S[is_active], K[is_active], T[is_active], is_call[is_active]
+            x = x[is_active] - step[is_active]
+        iterations[lanes] = _VOLATILITY_CALCULATION_ITERATIONS_LIMIT
+
+    result[~np.isfinite(result)] = np.nan
+    return result, iterations
 
-    # infinite loop is possible here, so we count iterations
-    i = 0
-    while abs((p - C) / v) > tol and i < _VOLATILITY_CALCULATION_ITERATIONS_LIMIT:
-        i += 1
-        x0 = x0 - (p - C) / v
-        p = _option_price(S, x0, K, T, r, opt_type)
-        v = _vega(S, x0, K, T, r, opt_type)
-        if not v:
-            return None
 
-    if i >= _VOLATILITY_CALCULATION_ITERATIONS_LIMIT:
-        return None
+# The problem is reduced to the normalized out-of-the-money price b(x, s) = e^(x/2) N(x/s + s/2) - e^(-x/2) N(x/s - s/2),
+# where x = -|ln(F/K)| and s is the total volatility sigma * sqrt(T) (see P. Jäckel, "By Implication", 2006).
+# b(s) is monotonic with a single inflexion point at s_c = sqrt(2|x|), so the asymptotic guesses
+# for both branches around s_c are accurate enough for Halley iterations to converge in 2-3 steps.
+# Every step is checked against a bracket of the root and replaced by bisection if it leaves the bracket,
+# so the iterations count is bounded for every lane
+def _implied_vols_safeguarded(C, S, K, r, T, tol, is_call) -> (np.ndarray, np.ndarray):
+    result = np.full(C.shape, np.nan)
+    iterations = np.zeros(C.shape, dtype=int)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore', under='ignore'):
+        DF = np.exp(-r * T)
+        F = S / DF
+        time_value = C / DF - _intrinsic_value(F, K, is_call)
+        beta = time_value / np.sqrt(F * K)
+        x = -np.abs(np.log(F / K))
+        b_max = np.exp(x / 2)
 
-    return x0
+        lanes = np.flatnonzero(_is_valid_input(C, S, K, T) & (beta > 0) & (beta < b_max))
+        beta, x, b_max, sqrt_t = beta[lanes], x[lanes], b_max[lanes], np.sqrt(T[lanes])
+
+        s_c = np.sqrt(-2 * x)
+        b_c = np.where(s_c > 0, _normalized_otm_price(x, s_c), 0)
+        is_lower = beta < b_c
+        s = np.where(is_lower,
+                     _lower_branch_guess(beta, x, b_c),
+                     _upper_branch_guess(beta, b_max, b_c, s_c))
+        s_low = np.where(is_lower, 0, s_c)
+        s_high = np.where(is_lower, s_c, np.inf)
+
+        for i in range(_SAFEGUARDED_ITERATIONS_LIMIT):
+            if lanes.size == 0:
+                break
+            b = _normalized_otm_price(x, s)
+            b1 = _normalized_vega(x, s)
+            b2 = b1 * (x * x / s ** 3 - s / 4)
+            # lower branch is solved for ln(b) - ln(beta) because b and its derivatives vanish there
+            f = np.where(is_lower, np.log(b / beta), b - beta)
+            f1 = np.where(is_lower, b1 / b, b1)
+            f2 = np.where(is_lower, b2 / b - f1 * f1, b2)
+            newton_step = -f / f1
+            step = newton_step / np.maximum(1 + newton_step * f2 / (2 * f1), 0.5)
+
+            is_converged = (f == 0) | (np.abs(step) / sqrt_t <= tol)
+            result[lanes[is_converged]] = s[is_converged] / sqrt_t[is_converged]
+            iterations[lanes] = i
+
+            s_low = np.where(f < 0, np.maximum(s_low, s), s_low)
+            s_high = np.where(f > 0, np.minimum(s_high, s), s_high)
+            next_s = s + step
+            is_out_of_bracket = ~((next_s > s_low) & (next_s < s_high))
+            bisection = np.where(np.isinf(s_high), 2 * np.maximum(s, s_low), (s_low + s_high) / 2)
+            next_s = np.where(is_out_of_bracket, bisection, next_s)
+
+            is_active = ~is_converged
+            lanes = lanes[is_active]
+            beta, x, b_max, sqrt_t = beta[is_active], x[is_active], b_max[is_active], sqrt_t[is_active]
+            s_c, b_c, is_lower = s_c[is_active], b_c[is_active], is_lower[is_active]
+            s, s_low, s_high = next_s[is_active], s_low[is_active], s_high[is_active]
+        iterations[lanes] = _SAFEGUARDED_ITERATIONS_LIMIT
+
+    result[~np.isfinite(result)] = np.nan
+    return result, iterations
+
+
+def _lower_branch_guess(beta, x, b_c):
+    return np.sqrt(2 * x * x / (-x - 4 * np.log(beta / b_c)))
+
+
+def _upper_branch_guess(beta, b_max, b_c, s_c):
+    return -2 * ndtri((b_max - beta) / (b_max - b_c) * ndtr(-s_c / 2))
+
+
+# Both terms are scaled by erfcx to avoid the cancellation of two tiny values for deep out-of-the-money options
+def _normalized_otm_price(x, s):
+    d1 = x / s + s / 2
+    d2 = x / s - s / 2
+    scaled = 0.5 * np.exp(-x * x / (2 * s * s) - s * s / 8) * (erfcx(-d1 * _SQRT_HALF) - erfcx(-d2 * _SQRT_HALF))
+    direct = np.exp(x / 2) * ndtr(d1) - np.exp(-x / 2) * ndtr(d2)
+    return np.where(d1 < 0, scaled, direct)
+
+
+def _normalized_vega(x, s):
+    return _INV_SQRT_2PI * np.exp(-x * x / (2 * s * s) - s * s / 8)
+
+
+def _intrinsic_value(F, K, is_call):
+    return np.where(is_call, np.maximum(F - K, 0), np.maximum(K - F, 0))
+
+
+# Failed lanes are classified by the option price bounds, the rest of them just have not converged
+def _get_failure_reasons(C, S, K, r, T, is_call) -> np.ndarray:
+    failure_reasons = np.full(C.shape, FAILURE_REASON_NOT_CONVERGED)
+    with np.errstate(invalid='ignore', over='ignore'):
+        DF = np.exp(-r * T)
+        intrinsic_value = DF * _intrinsic_value(S / DF, K, is_call)
+        max_price = np.where(is_call, S, K * DF)
+        failure_reasons[C >= max_price] = FAILURE_REASON_ABOVE_MAX_PRICE
+        failure_reasons[C <= intrinsic_value] = FAILURE_REASON_BELOW_INTRINSIC
+    failure_reasons[~_is_valid_input(C, S, K, T)] = FAILURE_REASON_INVALID_INPUT
+    return failure_reasons
+
+
+def _is_valid_input(C, S, K, T):
+    return (S > 0) & (K > 0) & (T > 0) & np.isfinite(C) & np.isfinite(S) & np.isfinite(K) & np.isfinite(T)
 
 
 def _inflexion_point(S, K, T, r):
-    m = S / (K * math.exp(-r * T))
-    return math.sqrt(2 * np.abs(math.log(m)) / T)
+    m = S / (K * np.exp(-r * T))
+    return np.sqrt(2 * np.abs(np.log(m)) / T)
 
 
-def _option_price(S, sigma, K, T, r, opt_type=option_type.CALL):
-    d1 = (math.log(S / K) + (r + .5 * sigma ** 2) * T) / (sigma * T ** .5)
+def _option_price(S, sigma, K, T, r, is_call):
+    d1 = (np.log(S / K) + (r + .5 * sigma ** 2) * T) / (sigma * T ** .5)
     d2 = d1 - sigma * T ** 0.5
-    price = 0
-    if opt_type == option_type.CALL:
-        n1 = norm.cdf(d1)
-        n2 = norm.cdf(d2)
-        DF = math.exp(-r * T)
-        price = S * n1 - K * DF * n2
-    elif opt_type == option_type.PUT:
-        n1 = norm.cdf(-d1)
-        n2 = norm.cdf(-d2)
-        DF = math.exp(-r * T)
-        price = K * DF * n2 - S * n1
-    return price
-
-
-def _vega(S, sigma, K, T, r, opt_type=option_type.CALL):
-    d1 = (math.log(S / K) + (r + .5 * sigma ** 2) * T) / (sigma * T ** .5)
-    v = 0
-    if opt_type == option_type.CALL:
-        v = S * T ** 0.5 * norm.pdf(d1)
-    elif opt_type == option_type.PUT:
-        v = S * T ** 0.5 * norm.pdf(-d1)
-    return v
\ No newline at end of file
+    DF = np.exp(-r * T)
+    call_price = S * ndtr(d1) - K * DF * ndtr(d2)
+    put_price = K * DF * ndtr(-d2) - S * ndtr(-d1)
+    return np.where(is_call, call_price, put_price)
+
+
+# Vega is the same for call and put options
+def _vega(S, sigma, K, T, r):
+    d1 = (np.log(S / K) + (r + .5 * sigma ** 2) * T) / (sigma * T ** .5)
+    return S * T ** 0.5 * np.exp(-.5 * d1 ** 2) * _INV_SQRT_2PI
+
+
+def _none_to_nan(value):
+    return math.nan if value is None else value
@@ -0,0 +1,90 @@
+import asyncio
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Jobs are computed and applied right away in the calling thread
+MODE_INLINE = 'inline'
+# Jobs are computed in a pool of threads (NumPy releases GIL for the most of the vectorized math)
+MODE_THREAD = 'thread'
+# Jobs are computed in a pool of processes
+MODE_PROCESS = 'process'
+MODES = (MODE_INLINE, MODE_THREAD, MODE_PROCESS)
+
+
+# Runs IV computation jobs off the asyncio event loop, so that a heavy recalculation does not delay reading the socket.
+# Results are applied on the event loop thread strictly in the order of submission,
+# so the model is never mutated from other threads and a newer result is never overwritten by an older one
+class IvExecutor:
+    def __init__(self, mode: str = MODE_INLINE, max_workers: int = None):
+        self._mode = mode
+        self._pool = None
+        if mode == MODE_THREAD:
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='iv_executor')
+        elif mode == MODE_PROCESS:
+            self._pool = ProcessPoolExecutor(max_workers=max_workers)
+        self._pending_jobs = deque()
+        self._applier_task = None
+
+    @property
+    def is_inline(self) -> bool:
+        return self._pool is None
+
+    @property
+    def pending_jobs_count(self) -> int:
+        return len(self._pending_jobs)
+
+    # Schedules the callback for the next event loop iteration, used to collect jobs into batches
+    def call_soon(self, callback: callable):
+        if self.is_inline:
+            callback()
+        else:
+            asyncio.get_running_loop().call_soon(callback)
+
+    # Computes compute_function(*args) and passes the result to apply_function, or None if computation failed.
+    # compute_function may be None to apply something in order with the computed results
+    def submit(self, compute_function: callable, args: tuple, apply_function: callable):
+        if self.is_inline:
+            result = None
+            if compute_function is not None:
+                try:
+                    result = compute_function(*args)
+                except Exception as exception:
+                    _write_job_error(exception)
+            _apply_result(apply_function, result)
+            return
+
+        loop = asyncio.get_running_loop()
+        future = None
+        if compute_function is not None:
+            future = loop.run_in_executor(self._pool, compute_function, *args)
+        self._pending_jobs.append((future, apply_function))
+        if self._applier_task is None or self._applier_task.done():
+            self._applier_task = loop.create_task(self._apply_jobs())
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _apply_jobs(self):
+        while self._pending_jobs:
+            future, apply_function = self._pending_jobs[0]
+            result = None
+            if future is not None:
+                try:
+                    result = await future
+                except Exception as exception:
+                    _write_job_error(exception)
+            self._pending_jobs.popleft()
+            _apply_result(apply_function, result)
+
+
+def _apply_result(apply_function: callable, result):
+    try:
+        apply_function(result)
+    except Exception as exception:
+        _write_job_error(exception)
+
+
+def _write_job_error(exception: Exception):
+    sys.stderr.write(f'IV job failed: {exception!r}\n')
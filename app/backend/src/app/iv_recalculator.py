@@ -0,0 +1,276 @@
+import time
+
+import numpy as np
+
+from app import implied_volatility
+from app.iv_executor import IvExecutor
+from infrastructure import metrics
+from model import option_store
+from model.option_store import OptionStore
+
+# Every quote IV is solved from its own price and cached together with its sensitivity
+# to the underlying price and the underlying price it was solved at.
+# Last price IV is solved on deals only, so its sensitivity is not cached
+_IV_COLUMNS = {
+    option_store.COLUMN_ASK: (option_store.COLUMN_ASK_IV, option_store.COLUMN_ASK_IV_SENSITIVITY,
+                              option_store.COLUMN_ASK_IV_BASE_ASSET_PRICE),
+    option_store.COLUMN_BID: (option_store.COLUMN_BID_IV, option_store.COLUMN_BID_IV_SENSITIVITY,
+                              option_store.COLUMN_BID_IV_BASE_ASSET_PRICE),
+    option_store.COLUMN_LAST_PRICE: (option_store.COLUMN_LAST_PRICE_IV, None, None),
+}
+QUOTE_PRICE_COLUMNS = (option_store.COLUMN_ASK, option_store.COLUMN_BID)
+
+_SOLVER_ITERATIONS_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50, 100)
+
+_iv_job_seconds = metrics.REGISTRY.histogram('iv_job_seconds',
+                                             'Time from submission of an IV job to applying of its result',
+                                             label_names=('price_column',))
+_solver_iterations = metrics.REGISTRY.histogram('iv_solver_iterations', 'Iterations of the IV solver per option',
+                                                _SOLVER_ITERATIONS_BUCKETS, ('solver',))
+_solver_failures = metrics.REGISTRY.counter('iv_solver_failures_total', 'Options without IV by failure reason',
+                                            ('solver', 'reason'))
+
+# All quote IVs are solved again on every underlying price change
+MODE_FULL = 'full'
+# Only quote IVs with an estimated change above epsilon are solved again, the rest are kept
+MODE_INCREMENTAL = 'incremental'
+MODES = (MODE_FULL, MODE_INCREMENTAL)
+
+
+class IvRecalculator:
+    def __init__(self, store: OptionStore, solver: str, mode: str = MODE_FULL, epsilon: float = 0.1,
+                 full_refresh_price_drift: float = 0.002, full_refresh_interval: float = 30,
+                 executor: IvExecutor = None, on_ivs_applied: callable = None):
+        self._store = store
+        self._solver = solver
+        self._mode = mode
+        self._epsilon = epsilon                                    # IV points
+        self._full_refresh_price_drift = full_refresh_price_drift  # share of the underlying price
+        self._full_refresh_interval = full_refresh_interval        # seconds
+        self._last_full_refreshes = {}  # base asset ticker -> (underlying price, monotonic time)
+        self._executor = executor if executor is not None else IvExecutor()
+        self._on_ivs_applied = on_ivs_applied  # called with rows after their IVs are written to the store
+        # IVs requested during one event loop iteration, or while previous jobs are computed,
+        # are solved by one job per price column, so that jobs never pile up when the pool is slower than ticks
+        self._pending_batches = {}  # price column -> ([rows arrays], [underlying prices arrays])
+        self._is_flush_scheduled = False
+        # Cached columns of a row with requests not applied yet are about to be overwritten by their jobs.
+        # Per price column, indexed by row: count of such requests and the underlying price of the latest one
+        self._requests_counts = {}
+        self._requested_base_asset_prices = {}
+        self._jobs_in_flight_count = 0
+        self._requested_ivs_count = 0
+        self._submitted_ivs_count = 0  # after deduplication of requests of the same rows
+        self._applied_ivs_count = 0
+        self._failed_jobs_count = 0
+
+    @property
+    def executor(self) -> IvExecutor:
+        return self._executor
+
+    # No IVs are waiting to be computed or applied
+    @property
+    def is_idle(self) -> bool:
+        return self._jobs_in_flight_count == 0 and not self._pending_batches and not self._is_flush_scheduled
+
+    def get_stats(self) -> dict:
+        return {
+            'requested_ivs_count': self._requested_ivs_count,
+            'submitted_ivs_count': self._submitted_ivs_count,
+            'applied_ivs_count': self._applied_ivs_count,
+            'failed_jobs_count': self._failed_jobs_count,
+            'jobs_in_flight_count': self._jobs_in_flight_count,
+        }
+
+    # Solves IVs by given price columns of given rows, quote IVs sensitivities are cached as well.
+    # With a pool executor IVs are applied to the store later, in order of the calls
+    def solve_ivs(self, base_asset_price, rows: np.ndarray, price_columns=QUOTE_PRICE_COLUMNS):
+        base_asset_prices = np.full(len(rows), np.nan if base_asset_price is None else base_asset_price)
+        for price_column in price_columns:
+            self._requested_ivs_count += len(rows)
+            self._track_requests(price_column, rows, base_asset_prices)
+            batch_rows, batch_base_asset_prices = self._pending_batches.setdefault(price_column, ([], []))
+            batch_rows.append(rows)
+            batch_base_asset_prices.append(base_asset_prices)
+
+        if not self._is_flush_scheduled and self._jobs_in_flight_count == 0:
+            self._is_flush_scheduled = True
+            self._executor.call_soon(self._flush_pending_batches)
+
+    # Resets IVs by given price column of given rows after the IVs requested before are applied
+    def reset_ivs(self, rows: np.ndarray, price_column: str):
+        self._flush_pending_batches()
+        iv_column, _, _ = _IV_COLUMNS[price_column]
+
+        def apply_reset(_):
+            self._store.column(iv_column)[rows] = np.nan
+            self._notify_ivs_applied(rows)
+
+        self._executor.submit(None, (), apply_reset)
+
+    # Recalculates quote IVs of given rows after the underlying price change.
+    # Returns the count of IVs to solve
+    def recalculate(self, base_asset_ticker: str, base_asset_price, rows: np.ndarray) -> int:
+        if self._mode == MODE_FULL or self._is_full_refresh_due(base_asset_ticker, base_asset_price):
+            self.solve_ivs(base_asset_price, rows)
+            self._last_full_refreshes[base_asset_ticker] = (base_asset_price, time.monotonic())
+            return len(rows) * len(QUOTE_PRICE_COLUMNS)
+
+        solved_count = 0
+        for price_column in QUOTE_PRICE_COLUMNS:
+            rows_to_solve = self._get_rows_to_solve(price_column, base_asset_price, rows)
+            if rows_to_solve.size:
+                self.solve_ivs(base_asset_price, rows_to_solve, (price_column,))
+            solved_count += rows_to_solve.size
+        return solved_count
+
+    # Job inputs are copied from the store on the event loop thread, so jobs never touch the model
+    def _flush_pending_batches(self):
+        self._is_flush_scheduled = False
+        pending_batches, self._pending_batches = self._pending_batches, {}
+        store = self._store
+        for price_column, (batch_rows, batch_base_asset_prices) in pending_batches.items():
+            requested_rows = np.concatenate(batch_rows)
+            rows, base_asset_prices = _get_latest_requests(requested_rows, np.concatenate(batch_base_asset_prices))
+            _, sensitivity_column, _ = _IV_COLUMNS[price_column]
+            args = (
+                base_asset_prices,
+                store.column(option_store.COLUMN_STRIKE)[rows],
+                store.column(price_column)[rows],
+                store.get_times_to_maturity(rows),
+                store.column(option_store.COLUMN_IS_CALL)[rows],
+                self._solver,
+                sensitivity_column is not None,
+            )
+            self._jobs_in_flight_count += 1
+            self._submitted_ivs_count += len(rows)
+            self._executor.submit(_compute_ivs, args,
+                                  self._get_apply_ivs(price_column, requested_rows, rows, base_asset_prices))
+
+    # requested_rows - rows of all requests solved by the job, including the duplicates
+    def _get_apply_ivs(self, price_column: str, requested_rows: np.ndarray, rows: np.ndarray,
+                       base_asset_prices: np.ndarray) -> callable:
+        iv_column, sensitivity_column, base_asset_price_column = _IV_COLUMNS[price_column]
+        submitted_at = time.perf_counter()
+
+        def apply_ivs(result):
+            self._jobs_in_flight_count -= 1
+            np.subtract.at(self._requests_counts[price_column], requested_rows, 1)
+            if result is not None:
+                ivs, sensitivities, iterations, failure_reasons = result
+                _record_solution(self._solver, iterations, failure_reasons)
+                _iv_job_seconds.observe(time.perf_counter() - submitted_at, (price_column,))
+                store = self._store
+                store.column(iv_column)[rows] = ivs
+                if sensitivity_column is not None:
+                    store.column(sensitivity_column)[rows] = sensitivities
+                    store.column(base_asset_price_column)[rows] = base_asset_prices
+                self._applied_ivs_count += len(rows)
+                self._notify_ivs_applied(rows)
+            else:
+                self._failed_jobs_count += 1
+            if self._jobs_in_flight_count == 0 and self._pending_batches:
+                self._flush_pending_batches()
+
+        return apply_ivs
+
+    def _track_requests(self, price_column: str, rows: np.ndarray, base_asset_prices: np.ndarray):
+        requests_counts = self._requests_counts.get(price_column)
+        if requests_counts is None or len(requests_counts) < len(self._store):
+            capacity = max(len(self._store), 2 * len(requests_counts) if requests_counts is not None else 0)
+            requests_counts = self._requests_counts[price_column] = _resize(requests_counts, capacity, 0, np.int64)
+            self._requested_base_asset_prices[price_column] = _resize(
+                self._requested_base_asset_prices.get(price_column), capacity, np.nan, float)
+        np.add.at(requests_counts, rows, 1)
+        self._requested_base_asset_prices[price_column][rows] = base_asset_prices
+
+    def _is_requested(self, price_column: str, rows: np.ndarray) -> np.ndarray:
+        requests_counts = self._requests_counts.get(price_column)
+        if requests_counts is None:
+            return np.zeros(len(rows), dtype=bool)
+        return requests_counts[rows] > 0
+
+    def _notify_ivs_applied(self, rows: np.ndarray):
+        if self._on_ivs_applied is not None:
+            self._on_ivs_applied(rows)
+
+    # First order estimate of the IV change is compared with epsilon. The sensitivity changes along the move,
+    # so the larger one of the cached sensitivity and the sensitivity at the current underlying price
+    # and the estimated IV is taken.
+    # Rows without a finite cached sensitivity (unsolved IV, zero vega) are always solved again,
+    # except for the ones without a quote, as there is nothing to solve for them.
+    # Rows with a quote at or below the intrinsic value are solved again as well: the IV is ill-conditioned
+    # near the intrinsic value and does not exist below it, so the first order estimate does not hold there.
+    # The cache of a row with a job not applied yet is about to be overwritten, so the row is solved again,
+    # unless the job is requested at the same underlying price
+    def _get_rows_to_solve(self, price_column: str, base_asset_price, rows: np.ndarray) -> np.ndarray:
+        iv_column, sensitivity_column, base_asset_price_column = _IV_COLUMNS[price_column]
+        store = self._store
+        strikes = store.column(option_store.COLUMN_STRIKE)[rows]
+        times_to_maturity = store.get_times_to_maturity(rows)
+        is_call = store.column(option_store.COLUMN_IS_CALL)[rows]
+        cached_sensitivities = store.column(sensitivity_column)[rows]
+        price_moves = base_asset_price - store.column(base_asset_price_column)[rows]
+        estimated_ivs = store.column(iv_column)[rows] + cached_sensitivities * price_moves
+        with np.errstate(invalid='ignore'):
+            sensitivities = np.maximum(np.abs(cached_sensitivities), np.abs(
+                implied_volatility.get_iv_sensitivities_array(base_asset_price, strikes, estimated_ivs,
+                                                              times_to_maturity, is_call)))
+        prices = store.column(price_column)[rows]
+        intrinsic_values = implied_volatility.get_intrinsic_values_array(base_asset_price, strikes, times_to_maturity,
+                                                                         is_call)
+        with np.errstate(invalid='ignore'):
+            is_within_epsilon = (np.isfinite(sensitivities) & (sensitivities * np.abs(price_moves) <= self._epsilon) &
+                                 ~(prices <= intrinsic_values))
+        is_without_quote = np.isnan(prices) & np.isnan(store.column(iv_column)[rows])
+        is_requested = self._is_requested(price_column, rows)
+        is_requested_at_price = is_requested.copy()
+        if is_requested.any():
+            is_requested_at_price[is_requested] = \
+                self._requested_base_asset_prices[price_column][rows[is_requested]] == base_asset_price
+        is_skipped = ((is_within_epsilon | is_without_quote) & ~is_requested) | is_requested_at_price
+        return rows[~is_skipped]
+
+    def _is_full_refresh_due(self, base_asset_ticker: str, base_asset_price) -> bool:
+        last_price, last_time = self._last_full_refreshes.get(base_asset_ticker, (None, None))
+        if last_price is None or base_asset_price is None:
+            return True
+
+        is_drifted = abs(base_asset_price - last_price) > self._full_refresh_price_drift * abs(last_price)
+        is_expired = time.monotonic() - last_time > self._full_refresh_interval
+        return is_drifted or is_expired
+
+
+def _resize(array: np.ndarray, capacity: int, fill_value, dtype) -> np.ndarray:
+    resized_array = np.full(capacity, fill_value, dtype=dtype)
+    if array is not None:
+        resized_array[:len(array)] = array
+    return resized_array
+
+
+# A row may be requested several times within a batch, only the latest request is solved
+def _get_latest_requests(rows: np.ndarray, base_asset_prices: np.ndarray):
+    _, reversed_indexes = np.unique(rows[::-1], return_index=True)
+    indexes = np.sort(rows.size - 1 - reversed_indexes)
+    return rows[indexes], base_asset_prices[indexes]
+
+
+# Module level function, so that it can be sent to a process pool
+def _compute_ivs(base_asset_prices, strikes, prices, times_to_maturity, is_call, solver: str,
+                 with_sensitivities: bool):
+    solution = implied_volatility.solve_ivs(base_asset_prices, strikes, prices, times_to_maturity, is_call, solver)
+    ivs = solution.ivs
+    sensitivities = None
+    if with_sensitivities:
+        sensitivities = implied_volatility.get_iv_sensitivities_array(base_asset_prices, strikes, ivs,
+                                                                      times_to_maturity, is_call)
+    return ivs, sensitivities, solution.iterations, solution.failure_reasons
+
+
+# Options without a price are counted as invalid input as well
+def _record_solution(solver: str, iterations: np.ndarray, failure_reasons: np.ndarray):
+    _solver_iterations.observe_array(iterations, (solver,))
+    failure_counts = np.bincount(failure_reasons.ravel(), minlength=len(implied_volatility.FAILURE_REASON_NAMES))
+    for failure_reason, count in enumerate(failure_counts.tolist()):
+        if failure_reason != implied_volatility.FAILURE_REASON_NONE and count:
+            _solver_failures.inc((solver, implied_volatility.FAILURE_REASON_NAMES[failure_reason]), count)
@@ -0,0 +1,79 @@
+import math
+from datetime import date
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+_BASE_ASSET_TICKER_QUERY_PARAM = 'base_asset_ticker'
+_EXPIRATION_DATE_QUERY_PARAM = 'expiration_date'
+_MIN_STRIKE_QUERY_PARAM = 'min_strike'
+_MAX_STRIKE_QUERY_PARAM = 'max_strike'
+_OFFSET_QUERY_PARAM = 'offset'
+_LIMIT_QUERY_PARAM = 'limit'
+
+
+# Selects options of the model dumps and a page of them, so that only the page is serialized.
+# Every criterion is optional, strikes are in the closed range [min_strike, max_strike]
+class ModelDumpFilter:
+    def __init__(self, base_asset_ticker: str = None, expiration_date: date = None, min_strike: float = None,
+                 max_strike: float = None, offset: int = 0, limit: int = DEFAULT_LIMIT):
+        self._base_asset_ticker = base_asset_ticker
+        self._expiration_date = expiration_date
+        self._min_strike = min_strike
+        self._max_strike = max_strike
+        self._offset = max(offset, 0)
+        self._limit = min(max(limit, 0), MAX_LIMIT)
+
+    @property
+    def base_asset_ticker(self) -> str:
+        return self._base_asset_ticker
+
+    @property
+    def expiration_date(self) -> date:
+        return self._expiration_date
+
+    @property
+    def min_strike(self) -> float:
+        return self._min_strike
+
+    @property
+    def max_strike(self) -> float:
+        return self._max_strike
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def get_page(self, items: list) -> list:
+        return items[self._offset:self._offset + self._limit]
+
+
+# get_query_param - returns the value of the query parameter by its name or None, invalid values are ignored
+def parse_model_dump_filter(get_query_param: callable) -> ModelDumpFilter:
+    return ModelDumpFilter(
+        get_query_param(_BASE_ASSET_TICKER_QUERY_PARAM) or None,
+        _parse(get_query_param(_EXPIRATION_DATE_QUERY_PARAM), date.fromisoformat),
+        _parse(get_query_param(_MIN_STRIKE_QUERY_PARAM), _parse_strike),
+        _parse(get_query_param(_MAX_STRIKE_QUERY_PARAM), _parse_strike),
+        _parse(get_query_param(_OFFSET_QUERY_PARAM), int, 0),
+        _parse(get_query_param(_LIMIT_QUERY_PARAM), int, DEFAULT_LIMIT),
+    )
+
+
+def _parse(value, parse: callable, default=None):
+    try:
+        return parse(value)
+    except (TypeError, ValueError):
+        return default
+
+
+# nan would select no options and inf is no bound at all, so they are as invalid as other non-numbers
+def _parse_strike(value: str) -> float:
+    strike = float(value)
+    if not math.isfinite(strike):
+        raise ValueError(f'Strike {value} is not finite')
+    return strike
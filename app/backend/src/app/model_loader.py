@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app import trading_session_time
+from infrastructure import moex_api
+from model.base_asset import BaseAsset
+from model.option_model import OptionModel
+
+
+# Fills the model with base assets and their options from MOEX ISS.
+# Reference data of all base assets is requested concurrently,
+# but the model is filled in the same order as with sequential requests
+class ModelLoader:
+    def __init__(self, model: OptionModel, max_concurrency: int = 8):
+        self._model = model
+        self._max_concurrency = max_concurrency
+
+    def load(self, base_asset_tickers):
+        base_asset_tickers = list(base_asset_tickers)
+        with ThreadPoolExecutor(max_workers=self._max_concurrency, thread_name_prefix='moex_api') as executor:
+            description_futures = [executor.submit(moex_api.get_security_description, ticker)
+                                   for ticker in base_asset_tickers]
+            expirations_futures = [executor.submit(moex_api.get_option_expirations, ticker)
+                                   for ticker in base_asset_tickers]
+
+            option_board_futures = []
+            for ticker, description_future, expirations_future in zip(base_asset_tickers, description_futures,
+                                                                       expirations_futures):
+                base_asset = self._init_base_asset(ticker, description_future.result())
+                self._model.base_asset_repository.insert_base_asset(base_asset)
+                for option_expiration_data in expirations_future.result():
+                    option_board_future = executor.submit(moex_api.get_option_board, ticker,
+                                                          option_expiration_data['expiration_date'])
+                    option_board_futures.append((base_asset, option_expiration_data, option_board_future))
+
+            for base_asset, option_expiration_data, option_board_future in option_board_futures:
+                series_type = option_expiration_data['series_type']
+                expiration_date = option_expiration_data['expiration_date']
+                self._populate_options_from_board(base_asset, series_type, expiration_date,
+                                                  option_board_future.result())
+
+    def _populate_options_from_board(self, base_asset: BaseAsset, series_type: str, expiration_date: str,
+                                     option_board_data: dict):
+        expiration_datetime = trading_session_time.get_option_expiration_datetime(base_asset.base_asset_code,
+                                                                                  series_type,
+                                                                                  expiration_date)
+        base_asset.add_expiration_datetime(expiration_datetime)
+
+        for opt_type, option_board_table in option_board_data.items():
+            for option_ticker, strike in zip(option_board_table.column('SECID'), option_board_table.column('STRIKE')):
+                self._model.option_repository.create_option(option_ticker, base_asset.ticker, expiration_datetime,
+                                                            strike, opt_type)
+
+    @staticmethod
+    def _init_base_asset(base_asset_ticker: str, asset_description_rows) -> BaseAsset:
+        base_asset = BaseAsset(base_asset_ticker)
+        for row in asset_description_rows:
+            if row['name'] == 'SHORTNAME':
+                base_asset.short_name = row['value']
+            if row['name'] == 'ASSETCODE':
+                base_asset.base_asset_code = row['value']
+        return base_asset
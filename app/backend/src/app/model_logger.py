@@ -0,0 +1,100 @@
+import json
+import logging
+import time
+
+from model.base_asset import BaseAsset
+from model.option import Option
+
+LOGGER_NAME = 'model'
+LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+# The last changed instrument with the count of changes since the previous record
+MODE_SAMPLED = 'sampled'
+# Changed fields of all instruments changed since the previous record
+MODE_DIFF = 'diff'
+MODES = (MODE_SAMPLED, MODE_DIFF)
+
+_KIND_BASE_ASSET = 'base_asset'
+_KIND_OPTION = 'option'
+
+
+# Sets the level of the "model" logger and writes its records to stderr unless it has handlers already
+def configure_logger(level: str):
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(levelname)s %(message)s'))
+        logger.addHandler(handler)
+        logger.propagate = False
+
+
+# Logs changes of the model as JSON records at the debug level of the "model" logger, at most one record per interval.
+# Records are written on a change, so changes after the last record are logged with the next change only.
+# The level is left to the logging configuration, see configure_logger, and checked once on creation:
+# above the debug level only a flag is checked on the hot path
+class ModelLogger:
+    def __init__(self, mode: str = MODE_DIFF, interval: float = 5):
+        self._logger = logging.getLogger(LOGGER_NAME)
+        self._is_enabled = self._logger.isEnabledFor(logging.DEBUG)
+        self._mode = mode
+        self._interval = interval  # seconds
+        self._next_record_time = 0
+        self._changes_count = 0
+        self._changed_instruments = {}  # ticker -> (kind, instrument), the last changed one only when sampled
+        self._logged_dumps = {}         # ticker -> dump of the previous record, when diff
+
+    @property
+    def is_enabled(self) -> bool:
+        return self._is_enabled
+
+    def log_base_asset_changed(self, base_asset: BaseAsset):
+        if self._is_enabled:
+            self._handle_change(_KIND_BASE_ASSET, base_asset.ticker, base_asset)
+
+    def log_option_changed(self, option: Option):
+        if self._is_enabled:
+            self._handle_change(_KIND_OPTION, option.ticker, option)
+
+    def _handle_change(self, kind: str, ticker: str, instrument):
+        self._changes_count += 1
+        if self._mode == MODE_SAMPLED:
+            self._changed_instruments.clear()
+        self._changed_instruments[ticker] = (kind, instrument)
+
+        now = time.monotonic()
+        if now < self._next_record_time:
+            return
+        self._next_record_time = now + self._interval
+        record = self._make_record()
+        # Changes to the same values are not logged in the diff mode
+        if record['instruments']:
+            self._logger.debug(json.dumps(record, default=str))
+        self._changes_count = 0
+        self._changed_instruments.clear()
+
+    def _make_record(self) -> dict:
+        instruments = []
+        for ticker, (kind, instrument) in self._changed_instruments.items():
+            dump = _dump_instrument(kind, instrument)
+            if self._mode == MODE_DIFF:
+                logged_dump = self._logged_dumps.get(ticker, {})
+                self._logged_dumps[ticker] = dump
+                dump = {name: value for name, value in dump.items() if name not in logged_dump or
+                        logged_dump[name] != value}
+                if not dump:
+                    continue
+            instruments.append(dict(dump, kind=kind, ticker=ticker))
+        return {
+            'mode': self._mode,
+            'changes_count': self._changes_count,
+            'instruments': instruments,
+        }
+
+
+def _dump_instrument(kind: str, instrument) -> dict:
+    if kind == _KIND_OPTION:
+        return instrument.dump()
+    dump = dict(vars(instrument))
+    dump['_expiration_datetimes'] = list(dump['_expiration_datetimes'])
+    return dump
@@ -1,33 +1,199 @@
-from app import trading_session_time, supported_base_asset, central_strike
-from app.implied_volatility import get_iv_for_option_price
+from app import trading_session_time, supported_base_asset, implied_volatility, iv_recalculator, model_logger, \
+    iv_executor
+from app.chart_snapshot import ChartSnapshot, ChartSnapshotPublisher
+from app.iv_executor import IvExecutor
+from app.iv_recalculator import IvRecalculator
+from app.model_dump_filter import ModelDumpFilter
+from app.model_loader import ModelLoader
+from app.model_logger import ModelLogger
+from app.subscription_manager import SubscriptionManager
+from infrastructure import alor_api, json_decoder, metrics
 from infrastructure.alor_api import AlorApi
-from model import option_type
-from model.base_asset import BaseAsset
-from model.option import Option
+from infrastructure.iss_cache import IssCache
+from infrastructure.sampling_profiler import SamplingProfiler
+from infrastructure.tick_journal import TickJournal
+from model import option_type, option_store
 from model.option_model import OptionModel
 from model.watched_instruments_filter import WatchedInstrumentsFilter
+from view.asgi_app import get_asgi_app
 from view.flask_app import get_flask_app
 from datetime import datetime
+import flask
+import numpy as np
+import signal
+import threading
+import time
 from infrastructure import moex_api, env_utils
 
 
+# Web server is not started
+WEB_SERVER_NONE = 'none'
+# Flask dev server in a separate thread
+WEB_SERVER_FLASK = 'flask'
+# ASGI server on the event loop of AlorApi
+WEB_SERVER_ASGI = 'asgi'
+WEB_SERVERS = (WEB_SERVER_NONE, WEB_SERVER_FLASK, WEB_SERVER_ASGI)
+
+_HANDLER_BASE_ASSET_QUOTES = 'base_asset_quotes'
+_HANDLER_OPTION_QUOTES = 'option_quotes'
+_HANDLER_OPTION_INSTRUMENT = 'option_instrument'
+
+# Tags of profiler samples by the event being handled
+_PROFILER_TAG_QUOTES = 'quotes'
+_PROFILER_TAG_INSTRUMENT = 'instrument'
+_PROFILER_TAG_HTTP = 'http'
+
+_handler_seconds = metrics.REGISTRY.histogram('option_app_handler_seconds', 'Time spent in an Alor event handler',
+                                              label_names=('handler',))
+
+
 class OptionApp:
 
     def __init__(self):
         self._model = OptionModel()
+        model_log_level = env_utils.get_choice('MODEL_LOG_LEVEL', model_logger.LEVELS, None)
+        if model_log_level is not None:
+            model_logger.configure_logger(model_log_level)
+        self._model_logger = ModelLogger(
+            env_utils.get_choice('MODEL_LOG_MODE', model_logger.MODES, model_logger.MODE_DIFF),
+            env_utils.get_float('MODEL_LOG_INTERVAL', 5),
+        )
+        json_decoder_name = env_utils.get_choice('JSON_DECODER', json_decoder.DECODERS, json_decoder.DEFAULT_DECODER)
+        json_decoder.set_decoder(json_decoder_name)
+        moex_api.set_api_url(env_utils.get_str('MOEX_ISS_URL', moex_api.DEFAULT_API_URL))
+        iss_cache_directory = env_utils.get_str('ISS_CACHE_DIR', None)
+        if iss_cache_directory:
+            moex_api.set_cache(IssCache(iss_cache_directory, trading_session_time.get_next_trading_day_start_datetime,
+                                        not env_utils.get_bool('ISS_CACHE_NO_BACKGROUND_REVALIDATION')))
+        self._iss_max_concurrency = env_utils.get_int('ISS_MAX_CONCURRENCY', 8)
         self._watchedInstrumentsFilter = WatchedInstrumentsFilter()
         alor_client_token = env_utils.get_env_or_exit('ALOR_CLIENT_TOKEN')
-        self._alorApi = AlorApi(alor_client_token)
+        self._tick_journal = None
+        tick_journal_directory = env_utils.get_str('TICK_JOURNAL_DIR', None)
+        if tick_journal_directory:
+            self._tick_journal = TickJournal(tick_journal_directory,
+                                             env_utils.get_int('TICK_JOURNAL_SEGMENT_SIZE_MB', 64) * 1024 * 1024)
+        self._alorApi = AlorApi(
+            alor_client_token,
+            env_utils.get_float('ALOR_CONFLATION_INTERVAL', 0),
+            env_utils.get_choice('ALOR_WIRE_FORMAT', alor_api.WIRE_FORMATS, alor_api.WIRE_FORMAT_SIMPLE),
+            json_decoder_name,
+            env_utils.get_int('ALOR_SHARDS_COUNT', 1),
+            self._handle_alor_ready_changed,
+            env_utils.get_str('ALOR_WEBSOCKET_URL', alor_api.DEFAULT_WEBSOCKET_URL),
+            env_utils.get_str('ALOR_REFRESH_TOKEN_URL', alor_api.DEFAULT_REFRESH_TOKEN_URL),
+            self._tick_journal,
+        )
+        self._subscription_manager = SubscriptionManager(
+            self._alorApi,
+            self._model.option_repository,
+            self._watchedInstrumentsFilter,
+            _get_timed_handler(self._handle_option_quotes_event, _HANDLER_OPTION_QUOTES),
+            _get_timed_handler(self._handle_option_instrument_event, _HANDLER_OPTION_INSTRUMENT),
+            env_utils.get_float('SUBSCRIPTION_HYSTERESIS', 0.25),
+        )
+        self._iv_solver = env_utils.get_choice('IV_SOLVER', implied_volatility.SOLVERS, implied_volatility.SOLVER_NEWTON)
+        self._iv_recalculator = IvRecalculator(
+            self._model.option_repository.store,
+            self._iv_solver,
+            env_utils.get_choice('IV_RECALCULATION_MODE', iv_recalculator.MODES, iv_recalculator.MODE_FULL),
+            env_utils.get_float('IV_RECALCULATION_EPSILON', 0.1),
+            env_utils.get_float('IV_FULL_REFRESH_PRICE_DRIFT', 0.002),
+            env_utils.get_float('IV_FULL_REFRESH_INTERVAL', 30),
+            IvExecutor(
+                env_utils.get_choice('IV_EXECUTOR_MODE', iv_executor.MODES, iv_executor.MODE_INLINE),
+                env_utils.get_int('IV_EXECUTOR_MAX_WORKERS', None),
+            ),
+            self._handle_ivs_applied,
+        )
+        self._chart_snapshot_publisher = ChartSnapshotPublisher(
+            self._build_diagram_data,
+            env_utils.get_float('CHART_SNAPSHOT_MIN_INTERVAL', 0.25),
+        )
+        self._event_loop_lag_interval = env_utils.get_float('METRICS_EVENT_LOOP_LAG_INTERVAL', 0.5)
+        # Metrics are collected anyway, the route is opt-in for the same reason as the profiler routes
+        self._is_metrics_enabled = env_utils.get_bool('METRICS_ENABLED')
+        self._register_metrics()
+        # Profiler routes and the signal are opt-in, as the routes are reachable through the public ingress
+        self._profiler = None
+        if env_utils.get_bool('PROFILER_ENABLED'):
+            self._profiler = SamplingProfiler(
+                env_utils.get_str('PROFILER_OUTPUT_DIR', None),
+                env_utils.get_float('PROFILER_DURATION', 30),
+                env_utils.get_float('PROFILER_INTERVAL', 0.01),
+            )
+            self._add_profiler_tags()
 
     def start(self):
         self._prepare_model()
-        # self._start_flask_app()
+        self._publish_chart_snapshots()
+        coroutines = []
+        web_server = env_utils.get_choice('WEB_SERVER', WEB_SERVERS, WEB_SERVER_NONE)
+        if web_server == WEB_SERVER_FLASK:
+            self._start_flask_app()
+        elif web_server == WEB_SERVER_ASGI:
+            coroutines.append(self._get_asgi_app_coroutine())
+        if self._event_loop_lag_interval:
+            coroutines.append(metrics.monitor_event_loop_lag(self._event_loop_lag_interval))
+        self._handle_profiler_signal()
         self._subscribe_to_base_asset_events()
-        self._alorApi.run_async_connection(env_utils.get_bool('DEBUG'))
+        try:
+            self._alorApi.run_async_connection(env_utils.get_bool('DEBUG'), *coroutines)
+        finally:
+            if self._tick_journal is not None:
+                self._tick_journal.close()
 
     def _subscribe_to_base_asset_events(self):
+        handle_base_asset_quotes_event = _get_timed_handler(self._handle_base_asset_quotes_event,
+                                                            _HANDLER_BASE_ASSET_QUOTES)
         for base_asset in self._model.base_asset_repository.get_all():
-            self._alorApi.subscribe_to_quotes(base_asset.ticker, self._handle_base_asset_quotes_event)
+            self._alorApi.subscribe_to_quotes(base_asset.ticker, handle_base_asset_quotes_event)
+
+    # Queue depths are read on scrape, so nothing is recorded for them on the hot path
+    def _register_metrics(self):
+        registry = metrics.REGISTRY
+        registry.gauge('alor_shard_connected', 'Whether the shard is connected to Alor', ('shard',),
+                       lambda: self._get_shard_metric_values('is_connected'))
+        registry.gauge('alor_shard_queued_requests', 'Requests waiting to be sent by the shard', ('shard',),
+                       lambda: self._get_shard_metric_values('queued_requests_count'))
+        registry.gauge('alor_shard_awaiting_subscriptions', 'Subscriptions of the shard without data yet', ('shard',),
+                       lambda: self._get_shard_metric_values('awaiting_subscriptions_count'))
+        registry.gauge('alor_conflation_pending_messages', 'Messages waiting for the next conflation flush',
+                       get_values=lambda: {(): self._alorApi.get_conflation_stats()['pending_messages_count']})
+        registry.gauge('iv_jobs_in_flight', 'IV jobs submitted and not applied yet',
+                       get_values=lambda: {(): self._iv_recalculator.get_stats()['jobs_in_flight_count']})
+        registry.gauge('iv_executor_pending_jobs', 'IV jobs waiting in the executor',
+                       get_values=lambda: {(): self._iv_recalculator.executor.pending_jobs_count})
+        registry.gauge('subscribed_options', 'Options subscribed to in Alor',
+                       get_values=lambda: {(): self._subscription_manager.get_stats()['subscribed_options_count']})
+        if self._tick_journal is not None:
+            registry.gauge('tick_journal_pending_messages', 'Messages waiting to be written to the tick journal',
+                           get_values=lambda: {(): self._tick_journal.get_stats()['pending_messages_count']})
+            registry.gauge('tick_journal_dropped_messages', 'Messages dropped because the tick journal lagged behind',
+                           get_values=lambda: {(): self._tick_journal.get_stats()['dropped_messages_count']})
+
+    # Handlers are tagged by the outermost frame, so IV jobs and chart publishing count to the event causing them
+    def _add_profiler_tags(self):
+        self._profiler.add_tag(_PROFILER_TAG_QUOTES, (self._handle_base_asset_quotes_event,
+                                                      self._handle_option_quotes_event))
+        self._profiler.add_tag(_PROFILER_TAG_INSTRUMENT, (self._handle_option_instrument_event,))
+        self._profiler.add_tag(_PROFILER_TAG_HTTP, (flask.Flask.wsgi_app, get_asgi_app().__call__))
+
+    # SIGUSR1 starts profiling for the default duration or stops it. Signals are handled by the main thread only,
+    # e.g. not when the app is started by a benchmark in a thread of its own
+    def _handle_profiler_signal(self):
+        if self._profiler is None or not hasattr(signal, 'SIGUSR1') or \
+                threading.current_thread() is not threading.main_thread():
+            return
+
+        # The handler interrupts the main thread, which may hold the lock of the profiler at the moment
+        def handle_signal(signal_number, frame):
+            threading.Thread(target=self._profiler.toggle, daemon=True).start()
+        signal.signal(signal.SIGUSR1, handle_signal)
+
+    def _get_shard_metric_values(self, stat_name: str) -> dict:
+        return {(shard_stats['shard_id'],): int(shard_stats[stat_name])
+                for shard_stats in self._alorApi.get_shard_stats()}
 
     def _handle_base_asset_quotes_event(self, ticker, data):
         prev_last_price = None
@@ -36,26 +202,20 @@ class OptionApp:
             prev_last_price = base_asset.last_price
 
         base_asset.last_price = data['last_price']
+        self._model_logger.log_base_asset_changed(base_asset)
 
         if prev_last_price is None:
             self._update_watched_instruments_filter(base_asset)
         elif prev_last_price != base_asset.last_price:
             self._update_watched_instruments_filter(base_asset)
             self._recalculate_volatilities(base_asset)
+        self._chart_snapshot_publisher.mark_changed(base_asset.ticker)
 
+    # Moves the window of subscribed options, see SubscriptionManager
     def _update_watched_instruments_filter(self, base_asset):
-        strike_step = supported_base_asset.MAP[base_asset.ticker]['strike_step']
-        max_strikes_count = supported_base_asset.MAP[base_asset.ticker]['max_strikes_count']
-        list_of_strikes = central_strike.get_list_of_strikes(base_asset.last_price, strike_step, max_strikes_count)
-        options_by_strikes = self._model.option_repository.get_by_strikes(base_asset.ticker, list_of_strikes)
-        for option in options_by_strikes:
-            if not self._watchedInstrumentsFilter.has_option_ticker(option.ticker):
-                self._alorApi.subscribe_to_quotes(option.ticker, self._handle_option_quotes_event)
-                self._alorApi.subscribe_to_instrument(option.ticker, self._handle_option_instrument_event)
-                self._watchedInstrumentsFilter.add_option_ticker(option.ticker)
+        self._subscription_manager.update(base_asset)
 
     def _handle_option_quotes_event(self, ticker, data):
-        print(self._model.dump())
         option = self._model.option_repository.get_by_ticker(ticker)
         base_asset = self._model.base_asset_repository.get_by_ticker(option.base_asset_ticker)
         base_asset_last_price = base_asset.last_price
@@ -65,6 +225,7 @@ class OptionApp:
         option.last_price_timestamp = data['last_price_timestamp']
         option.ask = data['ask']
         option.bid = data['bid']
+        self._model_logger.log_option_changed(option)
 
         if option.last_price is not None and option.last_price_timestamp is not None:
             last_price_timestamp_datetime = datetime.fromtimestamp(option.last_price_timestamp)
@@ -75,92 +236,106 @@ class OptionApp:
                     # Волатильность по цене последней сделки опциона вычисляется только по факту совершения сделки,
                     # так как это уже свершившиеся событие, и волатильность по нему не нужно пересчитывать постоянно.
                     # При этом возможны сделки по прежней цене, но с другим временем совершения
-                    option.last_price_iv = get_iv_for_option_price(base_asset_last_price, option,
-                                                                   option.last_price)
+                    self._iv_recalculator.solve_ivs(base_asset_last_price, np.array([option.row]),
+                                                    (option_store.COLUMN_LAST_PRICE,))
             elif trading_session_time.is_trading_session_active_now():
                 # Если на данный момент идёт активная торговая сессия,
                 # нужно убирать данные по вычисленной волатильности сделки,
                 # имевшей место в прошлой торговой сессии
-                option.last_price_iv = None
+                self._iv_recalculator.reset_ivs(np.array([option.row]), option_store.COLUMN_LAST_PRICE)
 
+        quote_price_columns = []
         if option.ask:
-            option.ask_iv = get_iv_for_option_price(base_asset_last_price, option,
-                                                    option.ask)
+            quote_price_columns.append(option_store.COLUMN_ASK)
         if option.bid:
-            option.bid_iv = get_iv_for_option_price(base_asset_last_price, option,
-                                                    option.bid)
+            quote_price_columns.append(option_store.COLUMN_BID)
+        self._iv_recalculator.solve_ivs(base_asset_last_price, np.array([option.row]), quote_price_columns)
 
     def _handle_option_instrument_event(self, ticker, data):
         option = self._model.option_repository.get_by_ticker(ticker)
         option.volatility = data['volatility']
+        self._model_logger.log_option_changed(option)
+        self._chart_snapshot_publisher.mark_changed(option.base_asset_ticker)
+
+    # Charts are republished to show whether their data is stale
+    def _handle_alor_ready_changed(self, is_ready: bool):
+        for base_asset in self._model.base_asset_repository.get_all():
+            self._chart_snapshot_publisher.mark_changed(base_asset.ticker)
+
+    def _handle_ivs_applied(self, rows):
+        store = self._model.option_repository.store
+        for base_asset_ticker in {store.get_base_asset_ticker(row) for row in rows.tolist()}:
+            self._chart_snapshot_publisher.mark_changed(base_asset_ticker)
+
+    def _publish_chart_snapshots(self):
+        for base_asset in self._model.base_asset_repository.get_all():
+            self._chart_snapshot_publisher.mark_changed(base_asset.ticker)
+        self._chart_snapshot_publisher.publish_changed()
 
     def _recalculate_volatilities(self, base_asset):
         option_repository = self._model.option_repository
         watched_option_tickers = self._watchedInstrumentsFilter.option_tickers
         watched_options_of_base_asset = option_repository.get_by_tickers_for_base_asset(base_asset.ticker,
                                                                                         watched_option_tickers)
-        for option in watched_options_of_base_asset:
-            option.ask_iv = get_iv_for_option_price(base_asset.last_price, option,
-                                                    option.ask)
-            option.bid_iv = get_iv_for_option_price(base_asset.last_price, option,
-                                                    option.bid)
+        rows = option_repository.get_rows(watched_options_of_base_asset)
+        self._iv_recalculator.recalculate(base_asset.ticker, base_asset.last_price, rows)
 
     def _start_flask_app(self):
         flask_app = get_flask_app()
         flask_app.set_option_app(self)
         flask_app.start_app_in_thread()
 
+    def _get_asgi_app_coroutine(self):
+        asgi_app = get_asgi_app()
+        asgi_app.set_option_app(self)
+        return asgi_app.serve(int(env_utils.get_env_or_exit('BACKEND_PORT')))
+
     def _prepare_model(self):
-        for base_asset_ticker in supported_base_asset.MAP.keys():
-            self._populate_model_for_base_asset(base_asset_ticker)
-
-    def _populate_model_for_base_asset(self, base_asset_ticker: str):
-        base_asset = self._init_base_asset_from_moex_api(base_asset_ticker)
-        self._model.base_asset_repository.insert_base_asset(base_asset)
-
-        option_expirations = moex_api.get_option_expirations(base_asset_ticker)
-        for option_expiration_data in option_expirations:
-            series_type = option_expiration_data['series_type']
-            expiration_date = option_expiration_data['expiration_date']
-            self._populate_options_from_board(base_asset, series_type, expiration_date)
-
-    def _populate_options_from_board(self, base_asset: BaseAsset, series_type: str, expiration_date: str):
-        expiration_datetime = trading_session_time.get_option_expiration_datetime(base_asset.base_asset_code,
-                                                                                  series_type,
-                                                                                  expiration_date)
-        base_asset.add_expiration_datetime(expiration_datetime)
-
-        option_board_data = moex_api.get_option_board(base_asset.ticker, expiration_date)
-        for opt_type in option_board_data:
-            for option_data in option_board_data[opt_type]:
-                option_ticker = option_data['SECID']
-                strike = option_data['STRIKE']
-                option = Option(option_ticker, base_asset.ticker, expiration_datetime, strike, opt_type)
-                self._model.option_repository.insert_option(option)
-
-    def _init_base_asset_from_moex_api(self, base_asset_ticker):
-        base_asset = BaseAsset(base_asset_ticker)
-        asset_description_rows = moex_api.get_security_description(base_asset_ticker)
-        for row in asset_description_rows:
-            if row['name'] == 'SHORTNAME':
-                base_asset.short_name = row['value']
-            if row['name'] == 'ASSETCODE':
-                base_asset.base_asset_code = row['value']
-        return base_asset
+        ModelLoader(self._model, self._iss_max_concurrency).load(supported_base_asset.MAP.keys())
 
+    # Called from the Flask thread, so only the published snapshot is read here, not the model
     def get_diagram_data(self, base_asset_ticker: str):
-        # TODO: концепт с динамическим обновлением списка "наблюдаемых" инструментов пока не реализован
-        #  из-за трудностей передачи данных между потоками. Метод вызывается из обработчика Flask в другом потоке.
-        #  если вызывать отсюда методы asyncio.Queue() - происходит падение с ошибкой
-        #  "RuntimeError: Non-thread-safe operation invoked on an event loop other than the current one"
-        #  Так что на данный момент извлекаем только те данные, что уже есть
-
         if base_asset_ticker not in supported_base_asset.MAP:
             return {
                 'error': f'Could not find base asset by ticker: {base_asset_ticker}',
                 'supported_base_assets': supported_base_asset.MAP,
             }
 
+        snapshot = self._chart_snapshot_publisher.get_snapshot(base_asset_ticker)
+        if snapshot is None:
+            return {
+                'last_price': None,
+                'labels': [],
+                'strikes': [],
+                'view_datasets': [],
+                'is_stale': True,
+                'version': 0,
+            }
+        return snapshot.data
+
+    def get_chart_snapshot(self, base_asset_ticker: str) -> ChartSnapshot:
+        return self._chart_snapshot_publisher.get_snapshot(base_asset_ticker)
+
+    # Called from the Flask thread, blocks it until a newer chart snapshot is published or timeout expires
+    def wait_for_chart_snapshot(self, base_asset_ticker: str, after_version: int, timeout: float) -> ChartSnapshot:
+        return self._chart_snapshot_publisher.wait_for_snapshot(base_asset_ticker, after_version, timeout)
+
+    # Called from the ASGI app on the event loop thread, so the model may be used here directly
+    async def wait_for_chart_snapshot_async(self, base_asset_ticker: str, after_version: int,
+                                            timeout: float) -> ChartSnapshot:
+        return await self._chart_snapshot_publisher.wait_for_snapshot_async(base_asset_ticker, after_version,
+                                                                            timeout)
+
+    # Subscribes to options around the current price of the base asset, if the window has moved.
+    # Must be called on the event loop thread, i.e. from the ASGI app
+    def refresh_watched_instruments(self, base_asset_ticker: str):
+        base_asset = self._model.base_asset_repository.get_by_ticker(base_asset_ticker)
+        if base_asset is not None and base_asset.last_price is not None:
+            self._update_watched_instruments_filter(base_asset)
+
+    # Called by ChartSnapshotPublisher on the event loop thread. Options of the chart are the watched ones,
+    # SubscriptionManager keeps them around the current price of the base asset
+    def _build_diagram_data(self, base_asset_ticker: str):
         base_asset = self._model.base_asset_repository.get_by_ticker(base_asset_ticker)
         watched_option_tickers = self._watchedInstrumentsFilter.option_tickers
 
@@ -168,18 +343,33 @@ class OptionApp:
                                                                                                    watched_option_tickers,
                                                                                                    base_asset.expiration_datetimes)
 
-        options_sorted_by_strike = sorted(options, key=_get_option_strike)
+        # Values are read from the columns of the store for all options at once
+        # instead of walking through the properties of every option
+        option_repository = self._model.option_repository
+        store = option_repository.store
+        rows = option_repository.get_rows(options)
+        strike_order = np.argsort(store.column(option_store.COLUMN_STRIKE)[rows], kind='stable')
+        options_sorted_by_strike = [options[i] for i in strike_order]
+        rows = rows[strike_order]
+        strikes = store.get_values(option_store.COLUMN_STRIKE, rows)
+        is_call = store.column(option_store.COLUMN_IS_CALL)[rows].tolist()
+        volatilities = store.get_values(option_store.COLUMN_VOLATILITY, rows)
+        ask_ivs = store.get_values(option_store.COLUMN_ASK_IV, rows)
+        bid_ivs = store.get_values(option_store.COLUMN_BID_IV, rows)
+        last_price_ivs = store.get_values(option_store.COLUMN_LAST_PRICE_IV, rows)
 
         strikes_dictionary = {}
-        for option in options_sorted_by_strike:
-            if option.strike not in strikes_dictionary:
-                strikes_dictionary[option.strike] = {}
+        for i, option in enumerate(options_sorted_by_strike):
+            strike = strikes[i]
+            if strike not in strikes_dictionary:
+                strikes_dictionary[strike] = {}
 
             expiration_date_iso_string = option.expiration_datetime.date().isoformat()
-            if expiration_date_iso_string not in strikes_dictionary[option.strike]:
-                strikes_dictionary[option.strike][expiration_date_iso_string] = {}
+            if expiration_date_iso_string not in strikes_dictionary[strike]:
+                strikes_dictionary[strike][expiration_date_iso_string] = {}
 
-            strikes_dictionary[option.strike][expiration_date_iso_string][option.type] = option
+            opt_type = option_type.CALL if is_call[i] else option_type.PUT
+            strikes_dictionary[strike][expiration_date_iso_string][opt_type] = i
         list_of_labels = []
         # TODO: сортировка по возрастанию даты экспирации
 
@@ -187,27 +377,27 @@ class OptionApp:
         for strike, strike_dataset in strikes_dictionary.items():
             strikes_to_labels_dict[strike] = {}
             for expiration_date, option_pair in strike_dataset.items():
-                for opt_type, option in option_pair.items():
+                for opt_type, i in option_pair.items():
                     if opt_type == option_type.CALL:
                         label = f'{expiration_date} Volatility'
-                        strikes_to_labels_dict[strike][label] = option.volatility
+                        strikes_to_labels_dict[strike][label] = volatilities[i]
                         if label not in list_of_labels:
                             list_of_labels.append(label)
                     type_string = 'Call' if opt_type == option_type.CALL else 'Put'
                     label_prefix = f'{expiration_date} {type_string}'
 
                     label = f'{label_prefix} Ask'
-                    strikes_to_labels_dict[strike][label] = option.ask_iv
+                    strikes_to_labels_dict[strike][label] = ask_ivs[i]
                     if label not in list_of_labels:
                         list_of_labels.append(label)
 
                     label = f'{label_prefix} Bid'
-                    strikes_to_labels_dict[strike][label] = option.bid_iv
+                    strikes_to_labels_dict[strike][label] = bid_ivs[i]
                     if label not in list_of_labels:
                         list_of_labels.append(label)
 
                     label = f'{label_prefix} Last Price'
-                    strikes_to_labels_dict[strike][label] = option.last_price_iv
+                    strikes_to_labels_dict[strike][label] = last_price_ivs[i]
                     if label not in list_of_labels:
                         list_of_labels.append(label)
 
@@ -228,17 +418,84 @@ class OptionApp:
             'labels': list_of_labels,
             'strikes': list_of_strikes,
             'view_datasets': view_datasets,
+            # Connection to Alor is lost or not all data has been received again after reconnection
+            'is_stale': not self._alorApi.is_ready,
         }
 
-    def dump_model(self):
-        return self._model.dump()
+    # Base assets and a page of options matching the filter, only the page is serialized
+    def dump_model(self, dump_filter: ModelDumpFilter):
+        base_assets = self._model.base_asset_repository.get_all()
+        if dump_filter.base_asset_ticker is not None:
+            base_assets = [base_asset for base_asset in base_assets
+                           if base_asset.ticker == dump_filter.base_asset_ticker]
+        options = self._find_options(dump_filter)
+        return dict(self._dump_options_page(options, dump_filter),
+                    base_assets=[vars(base_asset) for base_asset in base_assets])
+
+    def dump_watched_instruments(self, dump_filter: ModelDumpFilter):
+        watched_option_tickers = set(self._watchedInstrumentsFilter.option_tickers)
+        watched_options = [option for option in self._find_options(dump_filter)
+                           if option.ticker in watched_option_tickers]
+        return self._dump_options_page(watched_options, dump_filter)
+
+    def _find_options(self, dump_filter: ModelDumpFilter):
+        return self._model.option_repository.find(dump_filter.base_asset_ticker, dump_filter.expiration_date,
+                                                  dump_filter.min_strike, dump_filter.max_strike)
+
+    def _dump_options_page(self, options, dump_filter: ModelDumpFilter) -> dict:
+        return {
+            'options': [option.dump() for option in dump_filter.get_page(options)],
+            'options_count': len(options),
+            'offset': dump_filter.offset,
+            'limit': dump_filter.limit,
+        }
 
-    def dump_watched_instruments(self):
-        watched_option_tickers = self._watchedInstrumentsFilter.option_tickers
-        watched_options = self._model.option_repository.get_by_tickers(watched_option_tickers)
+    # Counters of Alor messages, see AlorApi.get_conflation_stats
+    def get_alor_stats(self) -> dict:
+        return self._alorApi.get_conflation_stats()
+
+    # Counters of IV jobs, see IvRecalculator.get_stats, and whether no IVs are waiting to be computed or applied
+    def get_iv_stats(self) -> dict:
+        return dict(self._iv_recalculator.get_stats(), is_idle=self._iv_recalculator.is_idle)
+
+    @property
+    def watched_options_count(self) -> int:
+        return len(self._watchedInstrumentsFilter.option_tickers)
+
+    @property
+    def is_metrics_enabled(self) -> bool:
+        return self._is_metrics_enabled
+
+    # Prometheus text exposition of all metrics, see infrastructure.metrics
+    def get_metrics(self) -> str:
+        return metrics.REGISTRY.render()
+
+    @property
+    def is_profiler_enabled(self) -> bool:
+        return self._profiler is not None
+
+    # Starts profiling of all threads for a bounded window, see SamplingProfiler. Requires is_profiler_enabled
+    def start_profiler(self, duration: float = None, interval: float = None) -> dict:
+        self._profiler.start(duration, interval)
+        return self._profiler.get_status()
+
+    def stop_profiler(self) -> dict:
+        self._profiler.stop()
+        return self._profiler.get_status()
+
+    # Folded stacks of the last finished profiling window, None if there is none yet
+    def get_profile(self) -> str:
+        return self._profiler.get_last_result()
 
-        return [vars(option) for option in watched_options]
 
+# Observes the duration of every call of the handler
+def _get_timed_handler(handler: callable, handler_name: str) -> callable:
+    label_values = (handler_name,)
 
-def _get_option_strike(option: Option):
-    return option.strike
+    def handle(ticker, data):
+        started_at = time.perf_counter()
+        try:
+            handler(ticker, data)
+        finally:
+            _handler_seconds.observe(time.perf_counter() - started_at, label_values)
+    return handle
@@ -0,0 +1,70 @@
+from app import central_strike, supported_base_asset
+from infrastructure.alor_api import AlorApi
+from model.base_asset import BaseAsset
+from model.option_repository import OptionRepository
+from model.watched_instruments_filter import WatchedInstrumentsFilter
+
+
+# Keeps Alor subscriptions to options of the strike window around the price of every base asset.
+# When the window moves, options that left it are unsubscribed and options that entered it are subscribed.
+# The window is moved only when the price is farther from its central strike than half of the strike step
+# plus hysteresis (a share of the strike step), so that the price oscillating around the middle
+# between two strikes does not cause subscribing and unsubscribing the same options over and over
+class SubscriptionManager:
+    def __init__(self, alor_api: AlorApi, option_repository: OptionRepository,
+                 watched_instruments_filter: WatchedInstrumentsFilter, quotes_callback: callable,
+                 instrument_callback: callable, hysteresis: float = 0.25):
+        self._alor_api = alor_api
+        self._option_repository = option_repository
+        self._watched_instruments_filter = watched_instruments_filter
+        self._quotes_callback = quotes_callback
+        self._instrument_callback = instrument_callback
+        self._hysteresis = hysteresis
+        self._central_strikes = {}  # base asset ticker -> central strike of the window
+        self._option_tickers = {}   # base asset ticker -> {option ticker: None} subscribed, in insertion order
+        self._subscriptions_count = 0
+        self._unsubscriptions_count = 0
+        self._window_moves_count = 0
+
+    def get_stats(self) -> dict:
+        return {
+            'subscribed_options_count': sum(len(option_tickers) for option_tickers in self._option_tickers.values()),
+            'subscriptions_count': self._subscriptions_count,
+            'unsubscriptions_count': self._unsubscriptions_count,
+            'window_moves_count': self._window_moves_count,
+        }
+
+    # Returns True if the window of the base asset has been moved
+    def update(self, base_asset: BaseAsset) -> bool:
+        strike_step = supported_base_asset.MAP[base_asset.ticker]['strike_step']
+        max_strikes_count = supported_base_asset.MAP[base_asset.ticker]['max_strikes_count']
+        central_strike_of_window = self._central_strikes.get(base_asset.ticker)
+        if central_strike_of_window is not None and \
+                abs(base_asset.last_price - central_strike_of_window) <= strike_step * (0.5 + self._hysteresis):
+            return False
+
+        strikes = central_strike.get_list_of_strikes(base_asset.last_price, strike_step, max_strikes_count)
+        central_strike_of_window = strikes[max_strikes_count // 2]
+        if central_strike_of_window == self._central_strikes.get(base_asset.ticker):
+            return False
+        self._central_strikes[base_asset.ticker] = central_strike_of_window
+
+        options = self._option_repository.get_by_strikes(base_asset.ticker, strikes)
+        self._apply_option_tickers(base_asset.ticker, dict.fromkeys(option.ticker for option in options))
+        self._window_moves_count += 1
+        return True
+
+    # Unsubscriptions are sent before subscriptions, so that the number of subscriptions never exceeds the window
+    def _apply_option_tickers(self, base_asset_ticker: str, option_tickers: dict):
+        active_option_tickers = self._option_tickers.get(base_asset_ticker, {})
+        for option_ticker in [ticker for ticker in active_option_tickers if ticker not in option_tickers]:
+            self._alor_api.unsubscribe_from_quotes(option_ticker)
+            self._alor_api.unsubscribe_from_instrument(option_ticker)
+            self._watched_instruments_filter.remove_option_ticker(option_ticker)
+            self._unsubscriptions_count += 1
+        for option_ticker in [ticker for ticker in option_tickers if ticker not in active_option_tickers]:
+            self._alor_api.subscribe_to_quotes(option_ticker, self._quotes_callback)
+            self._alor_api.subscribe_to_instrument(option_ticker, self._instrument_callback)
+            self._watched_instruments_filter.add_option_ticker(option_ticker)
+            self._subscriptions_count += 1
+        self._option_tickers[base_asset_ticker] = option_tickers
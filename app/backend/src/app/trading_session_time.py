@@ -1,4 +1,4 @@
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
 
 from model import option_series_type
 
@@ -25,6 +25,15 @@ def is_datetime_in_current_trading_session(datetime_to_check: datetime) -> bool:
     return is_in_daily_session or is_in_evening_session
 
 
+# Trading day of the derivatives market starts with the evening session of the previous calendar day,
+# reference data (series, option boards) may change only on this boundary
+def get_next_trading_day_start_datetime(dtime: datetime) -> datetime:
+    next_trading_day_start_datetime = datetime.combine(dtime.date(), _EVENING_SESSION_START_TIME_UTC)
+    if next_trading_day_start_datetime <= dtime:
+        next_trading_day_start_datetime += timedelta(days=1)
+    return next_trading_day_start_datetime
+
+
 def get_option_expiration_datetime(base_asset_code: str, series_type: str, expiration_date_str: str):
     expiration_date = datetime.fromisoformat(expiration_date_str)
 
@@ -0,0 +1,88 @@
+# Measures decoding of Alor quote messages in a single thread (i.e. per core): messages in the simple
+# and in the slim format, decoded by each available JSON decoder. Slim data is converted back to simple
+# field names and the fields read by OptionApp are taken, as AlorApi and its callbacks do.
+# Run from the src directory: python -m benchmark.alor_message_decoding
+import hashlib
+import json
+import time
+
+from benchmark.option_chain_fixture import load_option_chain
+from infrastructure import alor_api, json_decoder
+
+_MESSAGES_COUNT = 100000
+_REPEATS_COUNT = 5  # the best repeat is taken, others are disturbed by GC and the machine
+_READ_FIELD_NAMES = ('last_price', 'last_price_timestamp', 'ask', 'bid')
+
+
+def _make_simple_quote(option_data: dict, i: int) -> dict:
+    return {
+        'symbol': option_data['ticker'],
+        'exchange': 'MOEX',
+        'description': f'Марж. амер. Call {option_data["strike"]} с исп. 20 мар. на RTS-3.25',
+        'prev_close_price': option_data['last_price'],
+        'open_price': option_data['last_price'],
+        'high_price': option_data['ask'],
+        'low_price': option_data['bid'],
+        'last_price': option_data['last_price'],
+        'last_price_timestamp': 1741176000 + i,
+        'volume': 10 + i % 100,
+        'ask': option_data['ask'],
+        'bid': option_data['bid'],
+        'ask_vol': 5,
+        'bid_vol': 7,
+        'total_ask_vol': 150,
+        'total_bid_vol': 210,
+        'change': 10.0,
+        'change_percent': 0.5,
+        'open_interest': 1200,
+        'facevalue': 1,
+        'yield': None,
+        'lotsize': 1,
+        'lotvalue': option_data['last_price'],
+        'ob_ms_timestamp': 1741176000000 + i,
+    }
+
+
+def _make_messages(chain: dict, wire_format: str) -> list:
+    options = chain['options']
+    messages = []
+    for i in range(_MESSAGES_COUNT):
+        option_data = options[i % len(options)]
+        data = alor_api.to_wire_format(_make_simple_quote(option_data, i), wire_format)
+        guid = hashlib.sha256(option_data['ticker'].encode()).hexdigest()
+        messages.append(json.dumps({'data': data, 'guid': guid}, ensure_ascii=False))
+    return messages
+
+
+def run(wire_format: str, decoder: str, messages: list) -> dict:
+    decode = json_decoder.get_decode_function(decoder)
+    elapsed_time = None
+    for _ in range(_REPEATS_COUNT):
+        started_at = time.perf_counter()
+        for message in messages:
+            guid, data = alor_api.parse_message(message, decode)
+            data = alor_api.from_wire_format(data, wire_format)
+            for name in _READ_FIELD_NAMES:
+                data[name]
+        repeat_time = time.perf_counter() - started_at
+        elapsed_time = repeat_time if elapsed_time is None else min(elapsed_time, repeat_time)
+    return {
+        'wire_format': wire_format,
+        'decoder': decoder,
+        'message_size_bytes': sum(len(message.encode()) for message in messages) / len(messages),
+        'messages_per_second': len(messages) / elapsed_time,
+    }
+
+
+def main():
+    chain = load_option_chain()
+    for wire_format in alor_api.WIRE_FORMATS:
+        messages = _make_messages(chain, wire_format)
+        for decoder in json_decoder.DECODERS:
+            if decoder == json_decoder.DECODER_ORJSON and json_decoder.orjson is None:
+                continue
+            print(run(wire_format, decoder, messages))
+
+
+if __name__ == '__main__':
+    main()
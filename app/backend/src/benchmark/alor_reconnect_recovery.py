@@ -0,0 +1,62 @@
+# Measures recovery of AlorApi after all its websocket connections are dropped: time from the disconnection
+# until every subscription has received data again over a new connection, i.e. until the model is repopulated.
+# Runs against the local Alor stub, with one and with several shards.
+# Run from the src directory: python -m benchmark.alor_reconnect_recovery
+import asyncio
+import statistics
+import time
+
+from benchmark.alor_stub_server import AlorStubServer
+from infrastructure.alor_api import AlorApi
+
+_TICKERS_COUNT = 500
+_DISCONNECTIONS_COUNT = 10
+_SHARDS_COUNTS = (1, 4)
+_READY_TIMEOUT = 30  # seconds
+
+
+async def _run(shards_count: int) -> dict:
+    stub_server = AlorStubServer()
+    await stub_server.start()
+    ready_event = asyncio.Event()
+    received_tickers = set()
+    alor_api = AlorApi('client token', shards_count=shards_count,
+                       on_ready_changed=lambda is_ready: ready_event.set() if is_ready else ready_event.clear(),
+                       websocket_url=stub_server.websocket_url, refresh_token_url=stub_server.refresh_token_url)
+    for i in range(_TICKERS_COUNT):
+        alor_api.subscribe_to_quotes(f'RI{i}BB5', lambda ticker, data: received_tickers.add(ticker))
+        alor_api.subscribe_to_instrument(f'RI{i}BB5', lambda ticker, data: None)
+
+    recovery_times = []
+
+    async def disconnect_repeatedly():
+        await asyncio.wait_for(ready_event.wait(), _READY_TIMEOUT)
+        for _ in range(_DISCONNECTIONS_COUNT):
+            received_tickers.clear()
+            disconnected_at = time.perf_counter()
+            stub_server.drop_connections()
+            while ready_event.is_set():
+                await asyncio.sleep(0)
+            await asyncio.wait_for(ready_event.wait(), _READY_TIMEOUT)
+            recovery_times.append(time.perf_counter() - disconnected_at)
+            assert len(received_tickers) == _TICKERS_COUNT
+
+    await alor_api.run_connection(disconnect_repeatedly())
+    await stub_server.stop()
+    return {
+        'shards_count': shards_count,
+        'subscriptions_count': _TICKERS_COUNT * 2,
+        'recoveries_count': len(recovery_times),
+        'recovery_time_p50_ms': statistics.median(recovery_times) * 1000,
+        'recovery_time_max_ms': max(recovery_times) * 1000,
+        'stub_server': stub_server.get_stats(),
+    }
+
+
+def main():
+    for shards_count in _SHARDS_COUNTS:
+        print(asyncio.run(_run(shards_count)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+# Local stand-in for the Alor websocket API and its token refresh endpoint.
+# Every subscription is answered with the current data of the instrument right away, in the requested format,
+# as Alor does. Tokens are JWT-like with the exp claim and are checked on subscription.
+# Connections can be dropped to check reconnection of clients.
+# Recorded or scripted ticks are replayed to connections that subscribed to their guids, see tick_replay
+import base64
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import websockets
+
+from benchmark import tick_replay
+from infrastructure import alor_api
+
+_HTTP_STATUS_UNAUTHORIZED = 401
+
+
+def _make_token(expiration_time: float) -> str:
+    def encode(value: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+    return f'{encode({"alg": "none"})}.{encode({"exp": int(expiration_time)})}.stub'
+
+
+def _get_default_data(api_method: str, ticker: str) -> dict:
+    if api_method == alor_api.API_METHOD_QUOTES_SUBSCRIBE:
+        return {'symbol': ticker, 'last_price': 100.0, 'last_price_timestamp': int(time.time()),
+                'ask': 101.0, 'bid': 99.0}
+    return {'symbol': ticker, 'volatility': 40.0}
+
+
+class AlorStubServer:
+    # get_data - returns data sent on subscription by api method and ticker
+    def __init__(self, get_data: callable = _get_default_data, token_lifetime: float = 30 * 60):
+        self._get_data = get_data
+        self._token_lifetime = token_lifetime  # seconds
+        self._tokens = {}                      # token -> expiration time
+        self._connections = set()
+        self._subscriptions = {}               # guid -> websocket
+        self._websocket_server = None
+        self._http_server = None
+        self._subscribe_requests_count = 0
+        self._rejected_requests_count = 0
+        self._connections_count = 0
+        self._replayed_ticks_count = 0
+        self._skipped_ticks_count = 0
+
+    @property
+    def websocket_url(self) -> str:
+        return f'ws://127.0.0.1:{self._websocket_server.sockets[0].getsockname()[1]}'
+
+    @property
+    def refresh_token_url(self) -> str:
+        return f'http://127.0.0.1:{self._http_server.server_port}/refresh'
+
+    def get_stats(self) -> dict:
+        return {
+            'connections_count': self._connections_count,
+            'open_connections_count': len(self._connections),
+            'subscribe_requests_count': self._subscribe_requests_count,
+            'rejected_requests_count': self._rejected_requests_count,
+            'issued_tokens_count': len(self._tokens),
+            'subscriptions_count': len(self._subscriptions),
+            'replayed_ticks_count': self._replayed_ticks_count,
+            'skipped_ticks_count': self._skipped_ticks_count,
+        }
+
+    # Must be awaited on the event loop of the clients
+    async def start(self):
+        self._websocket_server = await websockets.serve(self._handle_connection, '127.0.0.1', 0)
+        self._start_http_server()
+
+    async def stop(self):
+        self._websocket_server.close()
+        await self._websocket_server.wait_closed()
+        self._http_server.shutdown()
+        self._http_server.server_close()
+
+    # Breaks all connections without the closing handshake, like a network failure
+    def drop_connections(self):
+        for websocket in list(self._connections):
+            websocket.transport.abort()
+
+    def _start_http_server(self):
+        stub_server = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                token = _make_token(time.time() + stub_server._token_lifetime)
+                stub_server._tokens[token] = time.time() + stub_server._token_lifetime
+                body = json.dumps({'AccessToken': token}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._http_server = ThreadingHTTPServer(('127.0.0.1', 0), RequestHandler)
+        self._http_server.daemon_threads = True
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+
+    # Ticks of guids without a subscription are skipped, as Alor would not send them
+    async def replay(self, ticks: list, speed: float = tick_replay.SPEED_REAL_TIME):
+        await tick_replay.replay(ticks, speed, self._send_tick)
+
+    async def _send_tick(self, tick: tick_replay.ReplayTick):
+        websocket = self._subscriptions.get(tick.guid)
+        if websocket is None:
+            self._skipped_ticks_count += 1
+            return
+        try:
+            await websocket.send(tick.message)
+            self._replayed_ticks_count += 1
+        except websockets.ConnectionClosed:
+            self._skipped_ticks_count += 1
+
+    async def _handle_connection(self, websocket):
+        self._connections.add(websocket)
+        self._connections_count += 1
+        try:
+            async for message in websocket:
+                await self._handle_request(websocket, json.loads(message))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._connections.discard(websocket)
+            for guid in [guid for guid, subscriber in self._subscriptions.items() if subscriber is websocket]:
+                del self._subscriptions[guid]
+
+    async def _handle_request(self, websocket, request: dict):
+        if time.time() >= self._tokens.get(request.get('token'), 0):
+            self._rejected_requests_count += 1
+            await websocket.send(json.dumps({'requestGuid': request['guid'], 'httpCode': _HTTP_STATUS_UNAUTHORIZED,
+                                             'message': 'Invalid token'}))
+            return
+        if request['opcode'] == alor_api.API_METHOD_UNSUBSCRIBE:
+            self._subscriptions.pop(request['guid'], None)
+            return
+        self._subscribe_requests_count += 1
+        self._subscriptions[request['guid']] = websocket
+        data = self._get_data(request['opcode'], request['code'])
+        if request['opcode'] == alor_api.API_METHOD_QUOTES_SUBSCRIBE:
+            data = alor_api.to_wire_format(data, request.get('format'))
+        await websocket.send(json.dumps({'data': data, 'guid': request['guid']}))
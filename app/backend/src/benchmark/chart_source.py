@@ -0,0 +1,53 @@
+import time
+
+import numpy as np
+
+from app.chart_snapshot import ChartSnapshotPublisher
+
+BASE_ASSET_TICKER = 'RIH5'
+_LABELS_COUNT = 42
+_STRIKES_COUNT = 30
+_CHANGED_CELLS_SHARE = 0.1
+
+
+# Stands for OptionApp in web benchmarks: publishes chart snapshots of the usual size with random changes
+class ChartSource:
+    def __init__(self):
+        self._random_generator = np.random.default_rng(1)
+        self._values = self._random_generator.uniform(20, 80, (_LABELS_COUNT, _STRIKES_COUNT))
+        self.builds_count = 0
+        self.publish_times = {}  # version -> time.monotonic()
+        self.publisher = ChartSnapshotPublisher(self._build, 0)
+
+    def update(self):
+        is_changed = self._random_generator.random(self._values.shape) < _CHANGED_CELLS_SHARE
+        self._values[is_changed] += self._random_generator.normal(0, 0.5, np.count_nonzero(is_changed))
+        snapshot = self.publisher.get_snapshot(BASE_ASSET_TICKER)
+        self.publish_times[snapshot.version + 1 if snapshot is not None else 1] = time.monotonic()
+        self.publisher.mark_changed(BASE_ASSET_TICKER)
+
+    def _build(self, base_asset_ticker: str) -> dict:
+        self.builds_count += 1
+        return {
+            'last_price': 111370,
+            'labels': [f'label {i}' for i in range(_LABELS_COUNT)],
+            'strikes': [100000 + 2500 * i for i in range(_STRIKES_COUNT)],
+            'view_datasets': np.round(self._values, 4).tolist(),
+            'is_stale': False,
+        }
+
+    # Same interface as OptionApp for the web apps
+    def get_chart_snapshot(self, base_asset_ticker: str):
+        return self.publisher.get_snapshot(base_asset_ticker)
+
+    def wait_for_chart_snapshot(self, base_asset_ticker: str, after_version: int, timeout: float):
+        return self.publisher.wait_for_snapshot(base_asset_ticker, after_version, timeout)
+
+    async def wait_for_chart_snapshot_async(self, base_asset_ticker: str, after_version: int, timeout: float):
+        return await self.publisher.wait_for_snapshot_async(base_asset_ticker, after_version, timeout)
+
+    def refresh_watched_instruments(self, base_asset_ticker: str):
+        pass
+
+    def get_diagram_data(self, base_asset_ticker: str):
+        return {}
@@ -0,0 +1,94 @@
+# Opens many concurrent subscribers of the chart stream and publishes a series of chart updates:
+# every update is built and serialized once and delivered to all subscribers.
+# Reports the count of builds, received events and delivery latency.
+# Run from the src directory: python -m benchmark.chart_stream_load
+import logging
+import threading
+import time
+
+import numpy as np
+import requests
+from werkzeug.serving import make_server
+
+from benchmark.chart_source import ChartSource, BASE_ASSET_TICKER
+from view import flask_app
+
+_SUBSCRIBERS_COUNT = 200
+_UPDATES_COUNT = 50
+_UPDATE_INTERVAL = 0.1    # seconds
+
+
+class _Subscriber(threading.Thread):
+    def __init__(self, url: str, last_version: int):
+        super().__init__(daemon=True)
+        self._url = url
+        self._last_version = last_version
+        self.connected = threading.Event()
+        self.events = []  # (event, version, bytes count, time.monotonic())
+
+    def run(self):
+        with requests.get(self._url, stream=True) as response:
+            self.connected.set()
+            event, version = None, None
+            for line in response.iter_lines(chunk_size=None):
+                if line.startswith(b'event: '):
+                    event = line[7:].decode()
+                elif line.startswith(b'id: '):
+                    version = int(line[4:])
+                elif line.startswith(b'data: '):
+                    self.events.append((event, version, len(line) - 6, time.monotonic()))
+                    if version == self._last_version:
+                        return
+
+
+def run(subscribers_count: int = _SUBSCRIBERS_COUNT) -> dict:
+    chart_source = ChartSource()
+    chart_source.update()
+    flask_app.get_flask_app().set_option_app(chart_source)
+    server = make_server('127.0.0.1', 0, flask_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    url = f'http://127.0.0.1:{server.server_port}/chart_stream?base_asset_ticker={BASE_ASSET_TICKER}'
+    last_version = _UPDATES_COUNT + 1
+    subscribers = [_Subscriber(url, last_version) for _ in range(subscribers_count)]
+    for subscriber in subscribers:
+        subscriber.start()
+    for subscriber in subscribers:
+        subscriber.connected.wait()
+    time.sleep(0.5)
+    builds_count_before_updates = chart_source.builds_count
+
+    for _ in range(_UPDATES_COUNT):
+        time.sleep(_UPDATE_INTERVAL)
+        chart_source.update()
+    for subscriber in subscribers:
+        subscriber.join(10)
+    server.shutdown()
+
+    events = [event for subscriber in subscribers for event in subscriber.events]
+    latencies = np.array([received_at - chart_source.publish_times[version]
+                          for event, version, _, received_at in events if event == 'delta']) * 1000
+    return {
+        'subscribers_count': subscribers_count,
+        'updates_count': _UPDATES_COUNT,
+        'builds_count': chart_source.builds_count - builds_count_before_updates,
+        'events_count': len(events),
+        'full_events_count': sum(1 for event in events if event[0] == 'snapshot'),
+        'delta_events_count': sum(1 for event in events if event[0] == 'delta'),
+        'subscribers_with_all_updates_count': sum(1 for subscriber in subscribers
+                                                  if len(subscriber.events) == _UPDATES_COUNT + 1),
+        'full_event_bytes': int(np.mean([event[2] for event in events if event[0] == 'snapshot'])),
+        'delta_event_bytes': int(np.mean([event[2] for event in events if event[0] == 'delta'])),
+        'delivery_latency_p50_ms': float(np.percentile(latencies, 50)),
+        'delivery_latency_p99_ms': float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    for subscribers_count in (10, _SUBSCRIBERS_COUNT):
+        print(run(subscribers_count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# Compares full and incremental quote IV recalculation on a random walk of the underlying price with every solver:
+# time per tick, count of solved IVs and the deviation of incremental IVs from the fully recalculated ones,
+# which must be within epsilon, see run.
+# Then checks incremental recalculation with every IV executor mode: ticks arrive while jobs are computed,
+# and IVs left when all jobs are applied must be within epsilon of the fully recalculated ones, see check_executor_modes.
+# Run from the src directory: python -m benchmark.incremental_iv_recalculation
+import asyncio
+import time
+
+import numpy as np
+
+from app import implied_volatility, iv_recalculator, iv_executor
+from app.iv_executor import IvExecutor
+from app.iv_recalculator import IvRecalculator
+from benchmark.option_chain_fixture import load_option_chain, fill_option_repository
+from model import option_store
+from model.option_repository import OptionRepository
+
+_TICKS_COUNT = 500
+_PRICE_STEP = 10      # RTS futures price step
+_TICK_STD_STEPS = 1   # standard deviation of the underlying move per tick in price steps
+_CHECK_TICKS_COUNT = 3000
+_CHECK_TICK_STD_STEPS = 2
+_EPSILON = 0.1        # IV points, the default of IvRecalculator
+
+
+def _prepare(chain: dict, mode: str, solver: str, executor: IvExecutor = None):
+    option_repository = OptionRepository()
+    options = fill_option_repository(option_repository, chain)
+    recalculator = IvRecalculator(option_repository.store, solver, mode, executor=executor)
+    rows = option_repository.get_rows(options)
+    recalculator.recalculate(chain['base_asset_ticker'], chain['base_asset_last_price'], rows)
+    return option_repository.store, recalculator, rows
+
+
+# Raises RuntimeError if incremental IVs deviate from the fully recalculated ones by more than epsilon
+def run(solver: str = implied_volatility.SOLVER_NEWTON):
+    chain = load_option_chain()
+    random_generator = np.random.default_rng(1)
+    price_moves = np.round(random_generator.normal(0, _TICK_STD_STEPS, _TICKS_COUNT)) * _PRICE_STEP
+    prices = chain['base_asset_last_price'] + np.cumsum(price_moves)
+
+    full_store, full_recalculator, rows = _prepare(chain, iv_recalculator.MODE_FULL, solver)
+    incremental_store, incremental_recalculator, _ = _prepare(chain, iv_recalculator.MODE_INCREMENTAL, solver)
+
+    full_time, incremental_time = 0, 0
+    full_solved_count, incremental_solved_count = 0, 0
+    deviations = []
+    for price in prices.tolist():
+        started_at = time.perf_counter()
+        full_solved_count += full_recalculator.recalculate(chain['base_asset_ticker'], price, rows)
+        full_time += time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        incremental_solved_count += incremental_recalculator.recalculate(chain['base_asset_ticker'], price, rows)
+        incremental_time += time.perf_counter() - started_at
+
+        for iv_column in (option_store.COLUMN_ASK_IV, option_store.COLUMN_BID_IV):
+            deviation = np.abs(incremental_store.column(iv_column)[rows] - full_store.column(iv_column)[rows])
+            deviations.append(deviation[~np.isnan(deviation)])
+
+    deviations = np.concatenate(deviations)
+    result = {
+        'solver': solver,
+        'ticks_count': _TICKS_COUNT,
+        'options_count': int(rows.size),
+        'full_time_per_tick_ms': full_time / _TICKS_COUNT * 1000,
+        'incremental_time_per_tick_ms': incremental_time / _TICKS_COUNT * 1000,
+        'full_solved_per_tick': full_solved_count / _TICKS_COUNT,
+        'incremental_solved_per_tick': incremental_solved_count / _TICKS_COUNT,
+        'iv_deviation_p99': float(np.percentile(deviations, 99)),
+        'iv_deviation_max': float(np.max(deviations)),
+    }
+    if result['iv_deviation_max'] > _EPSILON:
+        raise RuntimeError(f'Incremental IVs deviate from the fully recalculated ones: {result}')
+    return result
+
+
+async def _check_executor_mode(chain: dict, prices: list, executor_mode: str, solver: str) -> dict:
+    executor = IvExecutor(executor_mode)
+    try:
+        store, recalculator, rows = _prepare(chain, iv_recalculator.MODE_INCREMENTAL, solver, executor)
+        for price in prices:
+            recalculator.recalculate(chain['base_asset_ticker'], price, rows)
+            # Jobs of the previous ticks are computed meanwhile
+            await asyncio.sleep(0)
+        while not recalculator.is_idle:
+            await asyncio.sleep(0.01)
+    finally:
+        executor.shutdown()
+
+    expected_store, expected_recalculator, _ = _prepare(chain, iv_recalculator.MODE_FULL, solver)
+    expected_recalculator.solve_ivs(prices[-1], rows)
+    deviations, estimated_changes, nan_mismatches_count = [], [], 0
+    for iv_column, sensitivity_column, base_asset_price_column in (
+            (option_store.COLUMN_ASK_IV, option_store.COLUMN_ASK_IV_SENSITIVITY,
+             option_store.COLUMN_ASK_IV_BASE_ASSET_PRICE),
+            (option_store.COLUMN_BID_IV, option_store.COLUMN_BID_IV_SENSITIVITY,
+             option_store.COLUMN_BID_IV_BASE_ASSET_PRICE)):
+        ivs, expected_ivs = store.column(iv_column)[rows], expected_store.column(iv_column)[rows]
+        nan_mismatches_count += int(np.count_nonzero(np.isnan(ivs) != np.isnan(expected_ivs)))
+        deviation = np.abs(ivs - expected_ivs)
+        deviations.append(deviation[~np.isnan(deviation)])
+        estimated_change = np.abs(store.column(sensitivity_column)[rows] *
+                                  (prices[-1] - store.column(base_asset_price_column)[rows]))
+        estimated_changes.append(estimated_change[~np.isnan(estimated_change)])
+    return {
+        'solver': solver,
+        'executor_mode': executor_mode,
+        'ticks_count': len(prices),
+        # Skipped IVs of the last tick, both must be within epsilon
+        'final_estimated_iv_change_max': float(np.max(np.concatenate(estimated_changes))),
+        'final_iv_deviation_max': float(np.max(np.concatenate(deviations))),
+        'final_nan_mismatches_count': nan_mismatches_count,
+    }
+
+
+# Raises RuntimeError if IVs of incremental recalculation are stale after all jobs are applied
+def check_executor_modes(solver: str = implied_volatility.SOLVER_NEWTON) -> list:
+    chain = load_option_chain()
+    random_generator = np.random.default_rng(2)
+    price_moves = np.round(random_generator.normal(0, _CHECK_TICK_STD_STEPS, _CHECK_TICKS_COUNT)) * _PRICE_STEP
+    prices = (chain['base_asset_last_price'] + np.cumsum(price_moves)).tolist()
+
+    results = []
+    for executor_mode in iv_executor.MODES:
+        result = asyncio.run(_check_executor_mode(chain, prices, executor_mode, solver))
+        if (result['final_estimated_iv_change_max'] > _EPSILON or result['final_iv_deviation_max'] > _EPSILON or
+                result['final_nan_mismatches_count']):
+            raise RuntimeError(f'Stale IVs left by incremental recalculation: {result}')
+        results.append(result)
+    return results
+
+
+def main():
+    for solver in implied_volatility.SOLVERS:
+        print(run(solver))
+    for solver in implied_volatility.SOLVERS:
+        for result in check_executor_modes(solver):
+            print(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+# Measures startup loading of the model from a local ISS stub with a fixed delay of every response,
+# with sequential requests and with requests fanned out across base assets and expirations.
+# Run from the src directory: python -m benchmark.iss_bootstrap
+import time
+
+from app import supported_base_asset
+from app.model_loader import ModelLoader
+from benchmark.iss_stub_server import IssStubServer
+from benchmark.option_chain_fixture import load_option_chain
+from infrastructure import moex_api
+from model.option_model import OptionModel
+
+_LATENCY = 0.05  # seconds
+_MAX_CONCURRENCIES = (1, 4, 8, 16)
+
+
+def run(max_concurrency: int, latency: float = _LATENCY) -> dict:
+    stub_server = IssStubServer(load_option_chain(), supported_base_asset.MAP.keys(), latency)
+    moex_api.set_api_url(stub_server.start())
+    model = OptionModel()
+    started_at = time.perf_counter()
+    ModelLoader(model, max_concurrency).load(supported_base_asset.MAP.keys())
+    elapsed_time = time.perf_counter() - started_at
+    stub_server.stop()
+    moex_api.set_api_url(moex_api.DEFAULT_API_URL)
+    return {
+        'max_concurrency': max_concurrency,
+        'latency_ms': latency * 1000,
+        'requests_count': stub_server.requests_count,
+        'options_count': len(model.option_repository.store),
+        'load_time_ms': elapsed_time * 1000,
+    }
+
+
+def main():
+    for max_concurrency in _MAX_CONCURRENCIES:
+        print(run(max_concurrency))
+
+
+if __name__ == '__main__':
+    main()
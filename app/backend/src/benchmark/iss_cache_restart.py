@@ -0,0 +1,61 @@
+# Measures startup loading of the model with the on-disk ISS cache: a cold start with an empty cache
+# and warm restarts on the same trading day, with and without background revalidation.
+# Run from the src directory: python -m benchmark.iss_cache_restart
+import tempfile
+import time
+
+from app import supported_base_asset, trading_session_time
+from app.model_loader import ModelLoader
+from benchmark.iss_stub_server import IssStubServer
+from benchmark.option_chain_fixture import load_option_chain
+from infrastructure import moex_api
+from infrastructure.iss_cache import IssCache
+from model.option_model import OptionModel
+
+_LATENCY = 0.05  # seconds
+
+
+def _load(cache_directory: str, revalidate_in_background: bool, stub_server: IssStubServer) -> dict:
+    cache = IssCache(cache_directory, trading_session_time.get_next_trading_day_start_datetime,
+                     revalidate_in_background)
+    moex_api.set_cache(cache)
+    requests_count_before_load = stub_server.requests_count
+    model = OptionModel()
+    started_at = time.perf_counter()
+    ModelLoader(model).load(supported_base_asset.MAP.keys())
+    load_time = time.perf_counter() - started_at
+    requests_count_during_load = stub_server.requests_count - requests_count_before_load
+    cache.wait_for_background_revalidations()
+    moex_api.set_cache(None)
+    return {
+        'revalidate_in_background': revalidate_in_background,
+        'options_count': len(model.option_repository.store),
+        'load_time_ms': load_time * 1000,
+        'requests_count_during_load': requests_count_during_load,
+        'requests_count_in_background': stub_server.requests_count - requests_count_before_load
+                                        - requests_count_during_load,
+        **cache.get_stats(),
+    }
+
+
+def run() -> list:
+    stub_server = IssStubServer(load_option_chain(), supported_base_asset.MAP.keys(), _LATENCY)
+    moex_api.set_api_url(stub_server.start())
+    with tempfile.TemporaryDirectory() as cache_directory:
+        results = [
+            {'start': 'cold', **_load(cache_directory, False, stub_server)},
+            {'start': 'warm', **_load(cache_directory, False, stub_server)},
+            {'start': 'warm', **_load(cache_directory, True, stub_server)},
+        ]
+    stub_server.stop()
+    moex_api.set_api_url(moex_api.DEFAULT_API_URL)
+    return results
+
+
+def main():
+    for result in run():
+        print(result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Compares parsing of the option boards requested on startup: full boards decoded by the standard json module
+# into a dict per row, as before, and boards with only SECID and STRIKE columns decoded by the fast decoder
+# into tables. Responses are taken from the local ISS stub once, only parsing is measured.
+# Run from the src directory: python -m benchmark.iss_parsing
+import json
+import time
+import tracemalloc
+
+from app import supported_base_asset
+from benchmark.iss_stub_server import IssStubServer
+from benchmark.option_chain_fixture import load_option_chain
+from infrastructure import api_utils, json_decoder, moex_api
+from infrastructure.iss_table import IssTable
+
+_REPEATS_COUNT = 20
+_FULL_BOARD_PARAMS = {}
+_PROJECTED_BOARD_PARAMS = moex_api._OPTION_BOARD_PARAMS
+
+
+# Bodies of all option boards of the ISS stub, as they come from the server
+def get_option_board_bodies(api_url: str, params: dict, base_asset_tickers=None) -> list:
+    bodies = []
+    for ticker in base_asset_tickers or supported_base_asset.MAP.keys():
+        expirations_url = f'{api_url}/iss/statistics/engines/futures/markets/options/assets/{ticker}.json'
+        expirations = json.loads(api_utils.get_response(expirations_url).content)['expirations']
+        board_url = f'{api_url}/iss/statistics/engines/futures/markets/options/assets/{ticker}/optionboard.json'
+        for expiration_date, *_ in expirations['data']:
+            response = api_utils.get_response(board_url, params={**params, 'expiration_date': expiration_date})
+            bodies.append(response.content)
+    return bodies
+
+
+def _convert_to_list_of_dicts(moex_data_structure) -> list:
+    list_of_dicts = []
+    columns = moex_data_structure['columns']
+    for row in moex_data_structure['data']:
+        row_dict = {}
+        for i in range(len(columns)):
+            row_dict[columns[i]] = row[i]
+        list_of_dicts.append(row_dict)
+    return list_of_dicts
+
+
+def _parse_to_dicts(body: bytes):
+    response = json.loads(body)
+    return [(option_data['SECID'], option_data['STRIKE'])
+            for block_name in ('call', 'put')
+            for option_data in _convert_to_list_of_dicts(response[block_name])]
+
+
+def _parse_to_tables(body: bytes):
+    response = json_decoder.decode(body)
+    return [pair
+            for block_name in ('call', 'put')
+            for table in (IssTable.from_moex_data_structure(response[block_name]),)
+            for pair in zip(table.column('SECID'), table.column('STRIKE'))]
+
+
+def run(name: str, bodies: list, parse_function) -> dict:
+    started_at = time.perf_counter()
+    for _ in range(_REPEATS_COUNT):
+        for body in bodies:
+            parse_function(body)
+    elapsed_time = (time.perf_counter() - started_at) / _REPEATS_COUNT
+
+    tracemalloc.start()
+    results = [parse_function(body) for body in bodies]
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'name': name,
+        'boards_count': len(bodies),
+        'options_count': sum(len(result) for result in results),
+        'bytes_count': sum(len(body) for body in bodies),
+        'parse_time_ms': elapsed_time * 1000,
+        'peak_memory_kb': peak_memory / 1024,
+    }
+
+
+def main():
+    stub_server = IssStubServer(load_option_chain(), supported_base_asset.MAP.keys(), latency=0)
+    api_url = stub_server.start()
+    full_bodies = get_option_board_bodies(api_url, _FULL_BOARD_PARAMS)
+    projected_bodies = get_option_board_bodies(api_url, _PROJECTED_BOARD_PARAMS)
+    stub_server.stop()
+
+    print(run('full_json_dicts', full_bodies, _parse_to_dicts))
+    print(run('full_fast_tables', full_bodies, _parse_to_tables))
+    print(run('projected_fast_tables', projected_bodies, _parse_to_tables))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+# Local stand-in for the MOEX ISS endpoints requested on startup, built from the option chain fixture
+# or from any option boards, e.g. of the synthetic market.
+# Every base asset given with the fixture chain gets a copy of it with its own tickers.
+# Responses are delayed to imitate the round trip to the real server, ETags are sent and checked.
+# Like ISS, iss.only selects blocks of the response and <block>.columns selects columns of a block
+import hashlib
+import json
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from model import option_series_type, option_type
+
+_SECURITY_DESCRIPTION_PATH_PREFIX = '/iss/securities/'
+_OPTION_ASSETS_PATH_PREFIX = '/iss/statistics/engines/futures/markets/options/assets/'
+_OPTION_BOARD_PATH_SUFFIX = '/optionboard.json'
+
+_DESCRIPTION_COLUMNS = ['name', 'title', 'value', 'type', 'sort_order', 'is_hidden', 'precision']
+_EXPIRATION_COLUMNS = ['expiration_date', 'series_type', 'underlying_asset', 'is_traded']
+# Columns of the real option board, only SECID and STRIKE are used by the app
+_OPTION_BOARD_COLUMNS = ['SECID', 'SHORTNAME', 'PREVSETTLEPRICE', 'DECIMALS', 'MINSTEP', 'LASTTRADEDATE',
+                         'LASTDELDATE', 'PREVOPENPOSITION', 'STRIKE', 'OPTIONTYPE', 'UNDERLYINGASSET',
+                         'UNDERLYINGSETTLEPRICE', 'VOLATILITY', 'THEORPRICE', 'OPENPOSITION', 'BID', 'OFFER',
+                         'LAST', 'UPDATETIME', 'NUMTRADES', 'VOLTODAY', 'VALTODAY']
+_ASSET_CODES = {'RI': 'RTS', 'Si': 'Si', 'SR': 'SBRF'}
+
+
+# Ticker of the copy of a fixture option for the base asset
+def get_option_ticker(base_asset_ticker: str, fixture_option_ticker: str) -> str:
+    return base_asset_ticker[:2] + fixture_option_ticker[2:] + base_asset_ticker[2:]
+
+
+class IssStubServer:
+    # Base assets are copies of the chain, others may be added with add_base_asset before start
+    def __init__(self, chain: dict = None, base_asset_tickers=(), latency: float = 0.05):
+        self._latency = latency  # seconds
+        self._responses = {}     # (path, expiration date) -> response
+        for base_asset_ticker in base_asset_tickers:
+            self._add_chain_copy(chain, base_asset_ticker)
+        self._requests_count = 0
+        self._server = None
+
+    @property
+    def requests_count(self) -> int:
+        return self._requests_count
+
+    # Starts serving in a background thread, returns the URL to pass to moex_api.set_api_url
+    def start(self) -> str:
+        stub_server = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                stub_server._requests_count += 1
+                time.sleep(stub_server._latency)
+                url = urlparse(self.path)
+                query = {name: values[0] for name, values in parse_qs(url.query).items()}
+                response = stub_server._responses.get((url.path, query.get('expiration_date')))
+                if response is None:
+                    self.send_response(404)
+                    body = b'{}'
+                else:
+                    body = json.dumps(_project_response(response, query), ensure_ascii=False).encode()
+                    etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+                    if self.headers.get('If-None-Match') == etag:
+                        self.send_response(304)
+                        body = b''
+                    else:
+                        self.send_response(200)
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), RequestHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f'http://127.0.0.1:{self._server.server_port}'
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    # options - dicts with ticker, type, strike, expiration_date (ISO string), bid, ask, last_price
+    def add_base_asset(self, base_asset_ticker: str, asset_code: str, last_price: float, options: list,
+                       series_type: str = option_series_type.WEEK):
+        description = [
+            ['SECID', 'Код ценной бумаги', base_asset_ticker, 'string', 1, 0, None],
+            ['NAME', 'Полное наименование', f'Фьючерсный контракт {base_asset_ticker}', 'string', 3, 0, None],
+            ['SHORTNAME', 'Краткое наименование', base_asset_ticker, 'string', 4, 0, None],
+            ['ASSETCODE', 'Код базового актива', asset_code, 'string', 5, 0, None],
+        ]
+        self._add_response(f'{_SECURITY_DESCRIPTION_PATH_PREFIX}{base_asset_ticker}.json', None,
+                           {'description': {'columns': _DESCRIPTION_COLUMNS, 'data': description}})
+
+        option_boards = {}
+        for option_data in options:
+            expiration_date = option_data['expiration_date']
+            option_board = option_boards.setdefault(expiration_date, {'call': [], 'put': []})
+            ticker = option_data['ticker']
+            option_board['call' if option_data['type'] == option_type.CALL else 'put'].append([
+                ticker, ticker, option_data['last_price'], 0, 10, expiration_date, expiration_date, 0,
+                option_data['strike'], option_data['type'], base_asset_ticker, last_price, 40.0,
+                option_data['ask'], 0, option_data['bid'], option_data['ask'], option_data['last_price'], '10:00:00',
+                0, 0, 0,
+            ])
+
+        expirations = [[expiration_date, series_type, base_asset_ticker, 1]
+                       for expiration_date in sorted(option_boards)]
+        self._add_response(f'{_OPTION_ASSETS_PATH_PREFIX}{base_asset_ticker}.json', None,
+                           {'expirations': {'columns': _EXPIRATION_COLUMNS, 'data': expirations}})
+        for expiration_date, option_board in option_boards.items():
+            self._add_response(f'{_OPTION_ASSETS_PATH_PREFIX}{base_asset_ticker}{_OPTION_BOARD_PATH_SUFFIX}',
+                               expiration_date, {
+                                   'call': {'columns': _OPTION_BOARD_COLUMNS, 'data': option_board['call']},
+                                   'put': {'columns': _OPTION_BOARD_COLUMNS, 'data': option_board['put']},
+                               })
+
+    def _add_chain_copy(self, chain: dict, base_asset_ticker: str):
+        options = [dict(option_data, ticker=get_option_ticker(base_asset_ticker, option_data['ticker']),
+                        expiration_date=option_data['expiration_datetime'].date().isoformat())
+                   for option_data in chain['options']]
+        self.add_base_asset(base_asset_ticker, _ASSET_CODES.get(base_asset_ticker[:2], base_asset_ticker[:2]),
+                            chain['base_asset_last_price'], options)
+
+    def _add_response(self, path: str, expiration_date, response: dict):
+        self._responses[(path, expiration_date)] = response
+
+
+def _project_response(response: dict, query: dict) -> dict:
+    block_names = query['iss.only'].split(',') if 'iss.only' in query else list(response)
+    projected_response = {}
+    for block_name in block_names:
+        block = response[block_name]
+        columns_param = query.get(f'{block_name}.columns')
+        if columns_param is None:
+            projected_response[block_name] = block
+            continue
+        columns = columns_param.split(',')
+        indexes = [block['columns'].index(column) for column in columns]
+        projected_response[block_name] = {
+            'columns': columns,
+            'data': [[row[i] for i in indexes] for row in block['data']],
+        }
+    return projected_response
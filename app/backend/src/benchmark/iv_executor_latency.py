@@ -0,0 +1,98 @@
+# Measures how long websocket messages wait to be read while every message triggers IV recalculation
+# of a growing count of options, for each IV executor mode.
+# A local websocket server sends timestamped messages at a fixed rate, the read lag is the time between sending
+# and reading of a message.
+# Run from the src directory: python -m benchmark.iv_executor_latency
+import asyncio
+import json
+import time
+
+import numpy as np
+import websockets
+
+from app import implied_volatility, iv_executor
+from app.iv_executor import IvExecutor
+from app.iv_recalculator import IvRecalculator
+from benchmark.option_chain_fixture import load_option_chain, fill_option_repository
+from model import option_store
+from model.option_repository import OptionRepository
+from model.option_store import OptionStore
+
+_MESSAGES_PER_SECOND = 50
+_DURATION = 3             # seconds
+_OPTIONS_COUNTS = (500, 5000, 20000)
+_PRICE_STEP = 10          # RTS futures price step
+_MAX_WORKERS = 2
+
+
+def _create_store(chain: dict, options_count: int) -> OptionStore:
+    option_repository = OptionRepository()
+    fill_option_repository(option_repository, chain)
+    store = OptionStore(options_count)
+    for i in range(options_count):
+        store.copy_row(option_repository.store, i % len(chain['options']))
+    return store
+
+
+async def _send_messages(websocket):
+    interval = 1 / _MESSAGES_PER_SECOND
+    started_at = time.monotonic()
+    for i in range(_MESSAGES_PER_SECOND * _DURATION):
+        await asyncio.sleep(max(0., started_at + i * interval - time.monotonic()))
+        await websocket.send(json.dumps({'sent_at': time.monotonic(), 'price_move': (i % 3 - 1) * _PRICE_STEP}))
+
+
+async def _read_messages(port: int, chain: dict, store: OptionStore, executor: IvExecutor):
+    recalculator = IvRecalculator(store, implied_volatility.SOLVER_NEWTON, executor=executor)
+    rows = np.arange(len(store))
+    base_asset_price = chain['base_asset_last_price']
+    read_lags = []
+    max_pending_jobs_count = 0
+    async with websockets.connect(f'ws://127.0.0.1:{port}') as websocket:
+        async for message in websocket:
+            data = json.loads(message)
+            read_lags.append(time.monotonic() - data['sent_at'])
+            base_asset_price += data['price_move']
+            recalculator.recalculate(chain['base_asset_ticker'], base_asset_price, rows)
+            max_pending_jobs_count = max(max_pending_jobs_count, executor.pending_jobs_count)
+
+    applied_at = time.monotonic()
+    while executor.pending_jobs_count:
+        await asyncio.sleep(0.001)
+    return read_lags, max_pending_jobs_count, time.monotonic() - applied_at
+
+
+async def _run_async(mode: str, chain: dict, options_count: int) -> dict:
+    store = _create_store(chain, options_count)
+    executor = IvExecutor(mode, _MAX_WORKERS)
+    async with websockets.serve(_send_messages, '127.0.0.1', 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        read_lags, max_pending_jobs_count, drain_time = await _read_messages(port, chain, store, executor)
+    executor.shutdown()
+
+    read_lags = np.array(read_lags) * 1000
+    return {
+        'executor_mode': mode,
+        'options_count': options_count,
+        'messages_count': int(read_lags.size),
+        'read_lag_p50_ms': float(np.percentile(read_lags, 50)),
+        'read_lag_p99_ms': float(np.percentile(read_lags, 99)),
+        'read_lag_max_ms': float(np.max(read_lags)),
+        'max_pending_jobs_count': max_pending_jobs_count,
+        'drain_time_ms': drain_time * 1000,
+        'solved_ask_ivs_count': int(np.count_nonzero(~np.isnan(store.column(option_store.COLUMN_ASK_IV)))),
+    }
+
+
+def run(mode: str, options_count: int) -> dict:
+    return asyncio.run(_run_async(mode, load_option_chain(), options_count))
+
+
+def main():
+    for options_count in _OPTIONS_COUNTS:
+        for mode in iv_executor.MODES:
+            print(run(mode, options_count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# Compares IV solvers on a snapshot of the option chain: iterations count, failure reasons and time.
+# Run from the src directory: python -m benchmark.iv_solver_iterations
+import time
+from datetime import datetime
+
+import numpy as np
+
+from app import implied_volatility
+from benchmark.option_chain_fixture import load_option_chain
+from model import option_type
+
+_PRICE_FIELDS = ('bid', 'ask', 'last_price')
+_SECONDS_IN_YEAR = 365 * 24 * 60 * 60
+_REPEATS_COUNT = 20
+
+
+def get_option_chain_quotes(chain: dict):
+    now = datetime.utcnow()
+    strikes, prices, times_to_maturity, is_call = [], [], [], []
+    for option_data in chain['options']:
+        for price_field in _PRICE_FIELDS:
+            if option_data[price_field] is None:
+                continue
+            strikes.append(option_data['strike'])
+            prices.append(option_data[price_field])
+            times_to_maturity.append((option_data['expiration_datetime'] - now).total_seconds() / _SECONDS_IN_YEAR)
+            is_call.append(option_data['type'] == option_type.CALL)
+
+    return chain['base_asset_last_price'], np.array(strikes), np.array(prices), np.array(times_to_maturity), np.array(is_call)
+
+
+def run_solver(solver, asset_price, strikes, prices, times_to_maturity, is_call):
+    started_at = time.perf_counter()
+    for _ in range(_REPEATS_COUNT):
+        solution = implied_volatility.solve_ivs(asset_price, strikes, prices, times_to_maturity, is_call, solver)
+    elapsed_time = (time.perf_counter() - started_at) / _REPEATS_COUNT
+
+    iterations = solution.iterations
+    failure_reasons = solution.failure_reasons
+    return {
+        'solver': solver,
+        'quotes_count': int(iterations.size),
+        'time_ms': elapsed_time * 1000,
+        'iterations_mean': float(np.mean(iterations)),
+        'iterations_p50': float(np.percentile(iterations, 50)),
+        'iterations_p90': float(np.percentile(iterations, 90)),
+        'iterations_p99': float(np.percentile(iterations, 99)),
+        'iterations_max': int(np.max(iterations)),
+        'failures': {
+            name: int(np.count_nonzero(failure_reasons == reason))
+            for reason, name in implied_volatility.FAILURE_REASON_NAMES.items()
+            if reason != implied_volatility.FAILURE_REASON_NONE
+        },
+    }
+
+
+def main():
+    quotes = get_option_chain_quotes(load_option_chain())
+    for solver in implied_volatility.SOLVERS:
+        print(run_solver(solver, *quotes))
+
+
+if __name__ == '__main__':
+    main()
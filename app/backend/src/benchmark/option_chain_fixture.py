@@ -0,0 +1,33 @@
+import json
+import os
+from datetime import datetime
+
+from model.option import Option
+from model.option_repository import OptionRepository
+
+_FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'option_chain_rih5.json')
+
+
+# Loads the snapshot of the option chain. Expiration datetimes are shifted to the current moment,
+# so that times to maturity are the same as they were at the snapshot moment
+def load_option_chain(path=_FIXTURE_PATH) -> dict:
+    with open(path) as fixture_file:
+        chain = json.load(fixture_file)
+
+    time_shift = datetime.utcnow() - datetime.fromisoformat(chain['snapshot_datetime'])
+    for option_data in chain['options']:
+        option_data['expiration_datetime'] = datetime.fromisoformat(option_data['expiration_datetime']) + time_shift
+    return chain
+
+
+def fill_option_repository(option_repository: OptionRepository, chain: dict) -> [Option]:
+    options = []
+    for option_data in chain['options']:
+        option = option_repository.create_option(option_data['ticker'], chain['base_asset_ticker'],
+                                                 option_data['expiration_datetime'], option_data['strike'],
+                                                 option_data['type'])
+        option.bid = option_data['bid']
+        option.ask = option_data['ask']
+        option.last_price = option_data['last_price']
+        options.append(option)
+    return options
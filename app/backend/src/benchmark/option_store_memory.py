@@ -0,0 +1,140 @@
+# Compares memory footprint of options kept as plain objects with attributes
+# and options kept in the columnar OptionStore behind __slots__ views,
+# both bare and with the secondary indexes of OptionRepository.
+# Run from the src directory: python -m benchmark.option_store_memory
+import bisect
+import gc
+import tracemalloc
+from datetime import datetime, timedelta
+
+from model import option_type
+from model.option import Option
+from model.option_repository import OptionRepository
+from model.option_store import OptionStore
+
+_OPTIONS_COUNT = 50_000
+_STRIKES_COUNT = 250
+_BASE_ASSET_TICKERS = ('RIH5', 'SiH5', 'RIM5', 'SiM5', 'SRH5')
+
+
+# Option as it was before the columnar store: every field is an attribute in the instance __dict__
+class _ObjectOption:
+    def __init__(self, ticker, base_asset_ticker, expiration_datetime, strike, opt_type):
+        self._ticker = ticker
+        self._base_asset_ticker = base_asset_ticker
+        self._expiration_datetime = expiration_datetime
+        self._strike = strike
+        self._type = opt_type
+        self._bid = None
+        self._ask = None
+        self._last_price = None
+        self._last_price_timestamp = None
+        self._volatility = None
+        self._bid_iv = None
+        self._ask_iv = None
+        self._last_price_iv = None
+
+
+def _generate_option_fields(options_count: int):
+    expiration_datetimes = [datetime(2025, 3, 20, 15, 50) + timedelta(weeks=i) for i in range(12)]
+    options_fields = []
+    for i in range(options_count):
+        base_asset_ticker = _BASE_ASSET_TICKERS[i % len(_BASE_ASSET_TICKERS)]
+        strike = 50000 + (i // 2 % _STRIKES_COUNT) * 500
+        opt_type = option_type.CALL if i % 2 == 0 else option_type.PUT
+        expiration_datetime = expiration_datetimes[i // (2 * _STRIKES_COUNT) % len(expiration_datetimes)]
+        options_fields.append((f'{base_asset_ticker[:2]}{strike}{opt_type}{i}', base_asset_ticker,
+                               expiration_datetime, float(strike), opt_type))
+    return options_fields
+
+
+# Secondary indexes OptionRepository kept over plain objects before the columnar store
+def _index_objects(options) -> dict:
+    options_by_ticker, insertion_positions, options_by_strike, options_by_expiration_date = {}, {}, {}, {}
+    sorted_strikes = {}
+    for position, option in enumerate(options):
+        insertion_positions.setdefault(option._ticker, position)
+        options_by_ticker.setdefault(option._ticker, option)
+        strike_key = (option._base_asset_ticker, option._strike)
+        if strike_key not in options_by_strike:
+            options_by_strike[strike_key] = []
+            bisect.insort(sorted_strikes.setdefault(option._base_asset_ticker, []), option._strike)
+        options_by_strike[strike_key].append(option)
+        expiration_date_key = (option._base_asset_ticker, option._expiration_datetime.date())
+        options_by_expiration_date.setdefault(expiration_date_key, []).append(option)
+    return {
+        'options_by_ticker': options_by_ticker,
+        'insertion_positions': insertion_positions,
+        'options_by_strike': options_by_strike,
+        'options_by_expiration_date': options_by_expiration_date,
+        'sorted_strikes': sorted_strikes,
+    }
+
+
+def _fill_quotes(options):
+    for i, option in enumerate(options):
+        option_fields = vars(option) if isinstance(option, _ObjectOption) else None
+        for field, value in (('bid', 100.0 + i), ('ask', 110.0 + i), ('last_price', 105.0 + i), ('volatility', 35.5),
+                             ('bid_iv', 34.1), ('ask_iv', 36.2), ('last_price_iv', 35.3)):
+            if option_fields is not None:
+                option_fields[f'_{field}'] = value
+            else:
+                setattr(option, field, value)
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    holder = build()
+    gc.collect()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return holder, size, peak
+
+
+def main():
+    options_fields = _generate_option_fields(_OPTIONS_COUNT)
+
+    def build_objects():
+        options = [_ObjectOption(*fields) for fields in options_fields]
+        _fill_quotes(options)
+        return options
+
+    def build_indexed_objects():
+        options = build_objects()
+        return options, _index_objects(options)
+
+    def build_store():
+        store = OptionStore()
+        options = [Option(*fields, store=store) for fields in options_fields]
+        _fill_quotes(options)
+        return store, options
+
+    def build_repository():
+        repository = OptionRepository()
+        for fields in options_fields:
+            repository.create_option(*fields)
+        _fill_quotes(repository.get_all())
+        return repository
+
+    _, objects_size, objects_peak = _measure(build_objects)
+    _, indexed_objects_size, indexed_objects_peak = _measure(build_indexed_objects)
+    (store, _), store_size, store_peak = _measure(build_store)
+    # repository adds secondary indexes on top of the store
+    _, repository_size, repository_peak = _measure(build_repository)
+    print({
+        'options_count': _OPTIONS_COUNT,
+        'objects_bytes': objects_size,
+        'objects_peak_bytes': objects_peak,
+        'indexed_objects_bytes': indexed_objects_size,
+        'indexed_objects_peak_bytes': indexed_objects_peak,
+        'store_bytes': store_size,
+        'store_peak_bytes': store_peak,
+        'store_columns_bytes': store.nbytes(),
+        'repository_bytes': repository_size,
+        'repository_peak_bytes': repository_peak,
+    })
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# Runs OptionApp end to end offline: ISS requests go to the ISS stub, the Alor websocket API and its token
+# endpoint are replaced by the Alor stub, both configured through the same environment variables as in production.
+# When the app is subscribed, ticks recorded by the tick journal or scripted ones are replayed, then
+# tick-to-IV throughput is measured until every tick is handled and all IVs are applied.
+# Other settings (IV_EXECUTOR_MODE, ALOR_CONFLATION_INTERVAL...) are taken from the environment as usual.
+# Run from the src directory:
+#   python -m benchmark.replay_harness [--journal DIR] [--ticks COUNT] [--speed 1|10|0]
+# where speed 0 replays as fast as possible
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+from app import supported_base_asset
+from benchmark import tick_replay
+from benchmark.alor_stub_server import AlorStubServer
+from benchmark.iss_stub_server import IssStubServer
+from benchmark.option_chain_fixture import load_option_chain
+from infrastructure import alor_api
+
+_DEFAULT_TICKS_COUNT = 20000
+_READY_TIMEOUT = 30       # seconds
+_DRAIN_TIMEOUT = 600      # seconds
+_POLL_INTERVAL = 0.005    # seconds
+
+
+def _wait_for(condition: callable, timeout: float):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError()
+        time.sleep(_POLL_INTERVAL)
+
+
+# OptionApp running against the stubs in this process, the app and the stubs have their own threads
+class ReplayHarness:
+    def __init__(self, iss_stub_server: IssStubServer, alor_stub_server: AlorStubServer):
+        self._iss_stub_server = iss_stub_server
+        self._alor_stub_server = alor_stub_server
+        self._stub_loop = None
+        self._option_app = None
+
+    @property
+    def option_app(self):
+        return self._option_app
+
+    # Starts the stubs and the app, waits until the app is subscribed.
+    # environment - variables set for the app in addition to the URLs of the stubs
+    def start(self, environment: dict = None):
+        self._stub_loop = asyncio.new_event_loop()
+        threading.Thread(target=self._stub_loop.run_forever, daemon=True).start()
+        asyncio.run_coroutine_threadsafe(self._alor_stub_server.start(), self._stub_loop).result()
+        os.environ.update({
+            'MOEX_ISS_URL': self._iss_stub_server.start(),
+            'ALOR_WEBSOCKET_URL': self._alor_stub_server.websocket_url,
+            'ALOR_REFRESH_TOKEN_URL': self._alor_stub_server.refresh_token_url,
+            'ALOR_CLIENT_TOKEN': 'replay',
+            'WEB_SERVER': 'none',
+            **(environment or {}),
+        })
+
+        from app.option_app import OptionApp  # imported after the environment is set up
+        self._option_app = OptionApp()
+        threading.Thread(target=self._option_app.start, daemon=True).start()
+        # Subscriptions to options follow the first quotes of base assets
+        _wait_for(self._is_subscribed, _READY_TIMEOUT)
+
+    def stop(self):
+        self._iss_stub_server.stop()
+
+    # Replays the ticks and waits until every tick is handled and all IVs are applied
+    def replay(self, ticks: list, speed: float) -> dict:
+        option_app = self._option_app
+        alor_stats_before = option_app.get_alor_stats()
+        iv_stats_before = option_app.get_iv_stats()
+        stub_stats_before = self._alor_stub_server.get_stats()
+        started_at = time.perf_counter()
+        asyncio.run_coroutine_threadsafe(self._alor_stub_server.replay(ticks, speed), self._stub_loop).result()
+        replayed_at = time.perf_counter()
+        replayed_ticks_count = self._alor_stub_server.get_stats()['replayed_ticks_count'] - \
+                               stub_stats_before['replayed_ticks_count']
+
+        def is_drained():
+            received_messages_count = option_app.get_alor_stats()['received_messages_count'] - \
+                                      alor_stats_before['received_messages_count']
+            return received_messages_count >= replayed_ticks_count and option_app.get_iv_stats()['is_idle']
+
+        _wait_for(is_drained, _DRAIN_TIMEOUT)
+        drained_at = time.perf_counter()
+        alor_stats = option_app.get_alor_stats()
+        iv_stats = option_app.get_iv_stats()
+        stub_stats = self._alor_stub_server.get_stats()
+        applied_ivs_count = iv_stats['applied_ivs_count'] - iv_stats_before['applied_ivs_count']
+        return {
+            'speed': speed,
+            'ticks_count': len(ticks),
+            'replayed_ticks_count': replayed_ticks_count,
+            'skipped_ticks_count': stub_stats['skipped_ticks_count'] - stub_stats_before['skipped_ticks_count'],
+            'dispatched_ticks_count': alor_stats['dispatched_messages_count'] -
+                                      alor_stats_before['dispatched_messages_count'],
+            'requested_ivs_count': iv_stats['requested_ivs_count'] - iv_stats_before['requested_ivs_count'],
+            'applied_ivs_count': applied_ivs_count,
+            'replay_time_ms': (replayed_at - started_at) * 1000,
+            'drain_time_ms': (drained_at - replayed_at) * 1000,
+            'ticks_per_second': replayed_ticks_count / (drained_at - started_at),
+            'applied_ivs_per_second': applied_ivs_count / (drained_at - started_at),
+        }
+
+    def _is_subscribed(self) -> bool:
+        alor_api = self._option_app._alorApi
+        subscriptions_count = sum(shard_stats['subscriptions_count'] for shard_stats in alor_api.get_shard_stats())
+        return alor_api.is_ready and self._alor_stub_server.get_stats()['subscriptions_count'] == subscriptions_count
+
+
+def run(ticks: list, speed: float) -> dict:
+    chain = load_option_chain()
+    harness = ReplayHarness(IssStubServer(chain, supported_base_asset.MAP.keys(), latency=0),
+                            AlorStubServer(tick_replay.make_chain_data_function(chain)))
+    harness.start()
+    try:
+        return harness.replay(ticks, speed)
+    finally:
+        harness.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--journal', help='directory of the tick journal to replay, scripted ticks otherwise')
+    parser.add_argument('--ticks', type=int, default=_DEFAULT_TICKS_COUNT, help='count of scripted ticks')
+    parser.add_argument('--speed', type=float, default=tick_replay.SPEED_MAX,
+                        help='1 - real time, 10 - ten times faster, 0 - as fast as possible')
+    args = parser.parse_args()
+
+    if args.journal:
+        ticks = tick_replay.load_journal_ticks(args.journal)
+    else:
+        wire_format = os.environ.get('ALOR_WIRE_FORMAT', alor_api.WIRE_FORMAT_SIMPLE)
+        ticks = tick_replay.make_scripted_ticks(load_option_chain(), args.ticks, wire_format)
+    print(run(ticks, args.speed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,411 @@
+# Offline benchmark suite of the hot paths, to track regressions across releases.
+# Micro benchmarks: IV of a single option by moneyness and maturity, lookups of OptionRepository,
+# building and publishing of chart data, conversion of ISS tables to dicts.
+# Macro benchmarks: messages per second through the consumer of AlorApi from the local Alor stub,
+# ticks of the synthetic market through the whole OptionApp.
+# Results are written as JSON with the environment they were taken in; with a baseline file
+# the relative change of every metric is reported and metrics worse than the threshold are listed as regressions.
+# Run from the src directory:
+#   python -m benchmark.suite [--groups iv,repository,...] [--output FILE] [--baseline FILE] [--threshold 0.1]
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import timeit
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import implied_volatility
+from benchmark import iss_parsing, synthetic_load, tick_replay
+from benchmark.alor_stub_server import AlorStubServer
+from benchmark.iss_stub_server import IssStubServer
+from benchmark.option_chain_fixture import load_option_chain
+from benchmark.synthetic_market import SyntheticMarket
+from infrastructure import alor_api, json_decoder, moex_api
+from infrastructure.alor_api import AlorApi
+from model import option_store, option_type
+from model.option_repository import OptionRepository
+
+GROUP_IV = 'iv'
+GROUP_REPOSITORY = 'repository'
+GROUP_CHART = 'chart'
+GROUP_ISS_PARSING = 'iss_parsing'
+GROUP_ALOR_CONSUMER = 'alor_consumer'
+GROUP_APP = 'app'
+GROUPS = (GROUP_IV, GROUP_REPOSITORY, GROUP_CHART, GROUP_ISS_PARSING, GROUP_ALOR_CONSUMER, GROUP_APP)
+
+_FORMAT_VERSION = 1
+_REPEATS_COUNT = 5  # the best repeat is taken, others are disturbed by GC and the machine
+_DEFAULT_THRESHOLD = 0.1
+
+_IV_LOG_MONEYNESSES = (-0.2, -0.05, 0, 0.05, 0.2)  # ln(K / S), out of the money options are priced
+_IV_MATURITIES = (7, 30, 90, 365)                    # days
+_IV_VOLATILITY = 0.35
+_IV_ASSET_PRICE = 100000
+_IV_TOLERANCE = 10 ** -8
+_IV_CALLS_COUNT = 200
+
+_REPOSITORY_OPTIONS_COUNTS = (1000, 10000, 100000)
+_REPOSITORY_BASE_ASSETS_COUNT = 10
+_REPOSITORY_EXPIRATIONS_COUNT = 10
+_REPOSITORY_WINDOW_STRIKES_COUNT = 11
+_REPOSITORY_CALLS_COUNT = 1000
+
+_CHART_SHAPES = ((11, 1), (11, 4), (41, 4), (101, 4), (41, 12), (101, 12))  # strikes and expirations
+_CHART_CALLS_COUNT = 20
+
+_ISS_SYNTHETIC_STRIKES_COUNT = 500
+_ISS_CALLS_COUNT = 20
+
+_ALOR_TICKERS_COUNT = 500
+_ALOR_MESSAGES_COUNT = 50000
+_ALOR_TIMEOUT = 120  # seconds
+
+_APP_BASE_ASSETS_COUNT = 5
+_APP_DURATION = 2           # seconds of the synthetic market
+_APP_BASE_ASSET_RATE = 2    # ticks per second
+_APP_OPTION_RATE = 20       # ticks per second
+
+
+def _get_time_per_call(function: callable, calls_count: int) -> float:
+    return min(timeit.repeat(function, number=calls_count, repeat=_REPEATS_COUNT)) / calls_count
+
+
+def _make_result(group: str, name: str, params: dict, metrics: dict) -> dict:
+    return {'group': group, 'name': name, 'params': params, 'metrics': metrics}
+
+
+def _run_iv_benchmarks() -> list:
+    repository = OptionRepository()
+    results = []
+    for days in _IV_MATURITIES:
+        expiration_datetime = datetime.utcnow() + timedelta(days=days)
+        time_to_maturity = days / 365
+        for log_moneyness in _IV_LOG_MONEYNESSES:
+            strike = round(_IV_ASSET_PRICE * np.exp(log_moneyness))
+            opt_type = option_type.CALL if log_moneyness >= 0 else option_type.PUT
+            price = float(implied_volatility._option_price(_IV_ASSET_PRICE, _IV_VOLATILITY, strike, time_to_maturity,
+                                                           0, opt_type == option_type.CALL))
+            option = repository.create_option(f'{days}-{log_moneyness}', 'BENCH', expiration_datetime, strike,
+                                              opt_type)
+            params = {'maturity_days': days, 'log_moneyness': log_moneyness, 'type': opt_type}
+            for solver in implied_volatility.SOLVERS:
+                seconds = _get_time_per_call(
+                    lambda: implied_volatility.get_iv_for_option_price(_IV_ASSET_PRICE, option, price, solver),
+                    _IV_CALLS_COUNT)
+                results.append(_make_result(GROUP_IV, 'get_iv_for_option_price', dict(params, solver=solver),
+                                            {'time_per_call_us': seconds * 10 ** 6}))
+            seconds = _get_time_per_call(
+                lambda: implied_volatility._implied_vol(price, _IV_ASSET_PRICE, strike, 0, time_to_maturity,
+                                                        _IV_TOLERANCE, opt_type),
+                _IV_CALLS_COUNT)
+            results.append(_make_result(GROUP_IV, '_implied_vol', params, {'time_per_call_us': seconds * 10 ** 6}))
+    return results
+
+
+def _fill_repository(options_count: int) -> OptionRepository:
+    repository = OptionRepository()
+    strikes_count = max(options_count // (_REPOSITORY_BASE_ASSETS_COUNT * _REPOSITORY_EXPIRATIONS_COUNT * 2), 1)
+    expiration_datetimes = [datetime.utcnow() + timedelta(days=7 * (i + 1))
+                            for i in range(_REPOSITORY_EXPIRATIONS_COUNT)]
+    for i in range(_REPOSITORY_BASE_ASSETS_COUNT):
+        for expiration_index, expiration_datetime in enumerate(expiration_datetimes):
+            for strike in range(strikes_count):
+                for opt_type in (option_type.CALL, option_type.PUT):
+                    repository.create_option(f'B{i}-{expiration_index}-{strike}-{opt_type}', f'B{i}',
+                                             expiration_datetime, strike, opt_type)
+    return repository
+
+
+def _run_repository_benchmarks() -> list:
+    results = []
+    for options_count in _REPOSITORY_OPTIONS_COUNTS:
+        repository = _fill_repository(options_count)
+        options = repository.get_all()
+        tickers = [option.ticker for option in options]
+        strikes = repository.get_strikes('B0')
+        central_strike = strikes[len(strikes) // 2]
+        min_strike = central_strike - _REPOSITORY_WINDOW_STRIKES_COUNT // 2
+        max_strike = central_strike + _REPOSITORY_WINDOW_STRIKES_COUNT // 2
+        # Tickers watched by the app: options of the strike window of every base asset
+        watched_tickers = [option.ticker for option in options if min_strike <= option.strike <= max_strike]
+        expiration_datetimes = sorted({option.expiration_datetime for option in options})
+
+        lookups = {
+            'get_by_ticker': lambda: repository.get_by_ticker(tickers[len(tickers) // 2]),
+            'get_by_strike_range': lambda: repository.get_by_strike_range('B0', min_strike, max_strike),
+            'get_by_tickers_for_base_asset': lambda: repository.get_by_tickers_for_base_asset('B0', watched_tickers),
+            'get_by_tickers_and_expiration_dates_for_base_asset':
+                lambda: repository.get_by_tickers_and_expiration_dates_for_base_asset('B0', watched_tickers,
+                                                                                      expiration_datetimes),
+        }
+        for name, lookup in lookups.items():
+            seconds = _get_time_per_call(lookup, _REPOSITORY_CALLS_COUNT)
+            found = lookup()
+            results.append(_make_result(GROUP_REPOSITORY, name,
+                                        {'options_count': len(options), 'watched_options_count': len(watched_tickers)},
+                                        {'time_per_call_us': seconds * 10 ** 6,
+                                         'found_options_count': len(found) if isinstance(found, list) else 1}))
+    return results
+
+
+def _run_chart_benchmarks() -> list:
+    os.environ.setdefault('ALOR_CLIENT_TOKEN', 'benchmark')
+    from app.option_app import OptionApp  # imported after the environment is set up
+
+    results = []
+    for strikes_count, expirations_count in _CHART_SHAPES:
+        market = SyntheticMarket(1, expirations_count, strikes_count, window_strikes_count=strikes_count)
+        option_app = OptionApp()
+        market.fill_model(option_app._model, option_app._watchedInstrumentsFilter)
+        base_asset_ticker = market.base_asset_tickers[0]
+        _fill_quote_ivs(option_app, base_asset_ticker)
+
+        build_seconds = _get_time_per_call(lambda: option_app._build_diagram_data(base_asset_ticker),
+                                           _CHART_CALLS_COUNT)
+
+        def publish():
+            option_app._chart_snapshot_publisher.mark_changed(base_asset_ticker)
+            return option_app.get_diagram_data(base_asset_ticker)
+
+        publish_seconds = _get_time_per_call(publish, _CHART_CALLS_COUNT)
+        snapshot = option_app.get_chart_snapshot(base_asset_ticker)
+        results.append(_make_result(GROUP_CHART, 'get_diagram_data',
+                                    {'strikes_count': strikes_count, 'expirations_count': expirations_count},
+                                    {'build_time_ms': build_seconds * 1000,
+                                     'build_and_publish_time_ms': publish_seconds * 1000,
+                                     'labels_count': len(snapshot.data['labels']),
+                                     'json_bytes': len(snapshot.data_json)}))
+    return results
+
+
+# IVs by bid and ask, as the first quotes would leave them
+def _fill_quote_ivs(option_app, base_asset_ticker: str):
+    option_repository = option_app._model.option_repository
+    store = option_repository.store
+    rows = option_repository.get_rows(option_repository.get_all())
+    base_asset_price = option_app._model.base_asset_repository.get_by_ticker(base_asset_ticker).last_price
+    for price_column, iv_column in ((option_store.COLUMN_BID, option_store.COLUMN_BID_IV),
+                                    (option_store.COLUMN_ASK, option_store.COLUMN_ASK_IV)):
+        store.column(iv_column)[rows] = implied_volatility.get_iv_for_option_prices_array(
+            base_asset_price, store.column(option_store.COLUMN_STRIKE)[rows], store.column(price_column)[rows],
+            store.get_times_to_maturity(rows), store.column(option_store.COLUMN_IS_CALL)[rows])
+
+
+def _run_iss_parsing_benchmarks() -> list:
+    chain = load_option_chain()
+    market = SyntheticMarket(1, 1, _ISS_SYNTHETIC_STRIKES_COUNT)
+    payloads = {}
+    for name, stub_server, base_asset_tickers in (
+            ('fixture', IssStubServer(chain, [chain['base_asset_ticker']], latency=0), [chain['base_asset_ticker']]),
+            ('synthetic', market.make_iss_stub_server(), market.base_asset_tickers)):
+        api_url = stub_server.start()
+        try:
+            # Boards with all columns, as they are returned without projection
+            payloads[name] = json_decoder.decode(iss_parsing.get_option_board_bodies(api_url, {},
+                                                                                     base_asset_tickers)[0])
+        finally:
+            stub_server.stop()
+
+    results = []
+    for name, payload in payloads.items():
+        board = payload['call']
+        seconds = _get_time_per_call(lambda: moex_api._convert_moex_data_structure_to_list_of_dicts(board),
+                                     _ISS_CALLS_COUNT)
+        results.append(_make_result(GROUP_ISS_PARSING, '_convert_moex_data_structure_to_list_of_dicts',
+                                    {'payload': name, 'rows_count': len(board['data']),
+                                     'columns_count': len(board['columns'])},
+                                    {'time_per_call_us': seconds * 10 ** 6}))
+    return results
+
+
+async def _measure_alor_consumer(wire_format: str, stub_server: AlorStubServer, stub_loop, ticks: list) -> dict:
+    received = {'count': 0, 'last_price': None}
+    ready_event = asyncio.Event()
+    api = AlorApi('client token', wire_format=wire_format,
+                  on_ready_changed=lambda is_ready: ready_event.set() if is_ready else None,
+                  websocket_url=stub_server.websocket_url, refresh_token_url=stub_server.refresh_token_url)
+
+    def handle_quotes(ticker, data):
+        received['count'] += 1
+        received['last_price'] = data['last_price']
+
+    for i in range(_ALOR_TICKERS_COUNT):
+        api.subscribe_to_quotes(f'RI{i}BB5', handle_quotes)
+    metrics = {}
+
+    async def measure():
+        await asyncio.wait_for(ready_event.wait(), _ALOR_TIMEOUT)
+        while stub_server.get_stats()['subscriptions_count'] < _ALOR_TICKERS_COUNT:
+            await asyncio.sleep(0.01)
+        received_count_before = received['count']
+        started_at = time.perf_counter()
+        replay_future = asyncio.run_coroutine_threadsafe(stub_server.replay(ticks, tick_replay.SPEED_MAX), stub_loop)
+        deadline = started_at + _ALOR_TIMEOUT
+        while received['count'] - received_count_before < len(ticks) and time.perf_counter() < deadline:
+            await asyncio.sleep(0.001)
+        elapsed_time = time.perf_counter() - started_at
+        replay_future.result()
+        metrics['messages_per_second'] = (received['count'] - received_count_before) / elapsed_time
+        metrics['received_messages_count'] = received['count'] - received_count_before
+
+    await api.run_connection(measure())
+    if 'messages_per_second' not in metrics:
+        raise RuntimeError(f'Messages in the {wire_format} format are not received from the Alor stub')
+    return metrics
+
+
+def _run_alor_consumer_benchmarks() -> list:
+    stub_loop = asyncio.new_event_loop()
+    threading.Thread(target=stub_loop.run_forever, daemon=True).start()
+    results = []
+    for wire_format in alor_api.WIRE_FORMATS:
+        stub_server = AlorStubServer()
+        asyncio.run_coroutine_threadsafe(stub_server.start(), stub_loop).result()
+        ticks = [tick_replay.make_quote_tick(0, f'RI{i % _ALOR_TICKERS_COUNT}BB5', {
+            'last_price': 1000 + i % 100, 'last_price_timestamp': 1700000000 + i, 'ask': 1010, 'bid': 990,
+        }, wire_format) for i in range(_ALOR_MESSAGES_COUNT)]
+        metrics = asyncio.run(_measure_alor_consumer(wire_format, stub_server, stub_loop, ticks))
+        asyncio.run_coroutine_threadsafe(stub_server.stop(), stub_loop).result()
+        results.append(_make_result(GROUP_ALOR_CONSUMER, 'AlorApi._consumer_handler',
+                                    {'wire_format': wire_format, 'json_decoder': json_decoder.DEFAULT_DECODER,
+                                     'messages_count': len(ticks)}, metrics))
+    return results
+
+
+# Must be the last group, replaces supported_base_asset.MAP and the environment of the process
+def _run_app_benchmarks() -> list:
+    market = SyntheticMarket(_APP_BASE_ASSETS_COUNT)
+    ticks = market.make_ticks(_APP_DURATION, _APP_BASE_ASSET_RATE, _APP_OPTION_RATE)
+    stats = synthetic_load.run(market, ticks, tick_replay.SPEED_MAX, _APP_DURATION)
+    return [_make_result(GROUP_APP, 'synthetic_load', {
+        'base_assets_count': stats['base_assets_count'],
+        'options_count': stats['options_count'],
+        'ticks_count': len(ticks),
+    }, {
+        'startup_time_ms': stats['startup_time_ms'],
+        'ticks_per_second': stats['replay']['ticks_per_second'],
+        'applied_ivs_per_second': stats['replay']['applied_ivs_per_second'],
+        'chart_json_requests_per_second': stats['chart_json']['requests_per_second'],
+        'chart_json_latency_p99_ms': stats['chart_json']['latency_p99_ms'],
+    })]
+
+
+_GROUP_FUNCTIONS = {
+    GROUP_IV: _run_iv_benchmarks,
+    GROUP_REPOSITORY: _run_repository_benchmarks,
+    GROUP_CHART: _run_chart_benchmarks,
+    GROUP_ISS_PARSING: _run_iss_parsing_benchmarks,
+    GROUP_ALOR_CONSUMER: _run_alor_consumer_benchmarks,
+    GROUP_APP: _run_app_benchmarks,
+}
+
+
+def _get_git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(__file__)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(groups=GROUPS) -> dict:
+    started_at = datetime.utcnow()
+    results = []
+    for group in groups:
+        group_started_at = time.perf_counter()
+        results.extend(_GROUP_FUNCTIONS[group]())
+        sys.stderr.write(f'{group}: {time.perf_counter() - group_started_at:.1f} s\n')
+    return {
+        'format_version': _FORMAT_VERSION,
+        'started_at': started_at.isoformat(),
+        'git_commit': _get_git_commit(),
+        'python_version': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'environment': {name: os.environ[name] for name in ('IV_SOLVER', 'IV_EXECUTOR_MODE', 'JSON_DECODER')
+                        if name in os.environ},
+        'results': results,
+    }
+
+
+# Lower is better for times, higher is better for rates, other metrics are only reported
+def _get_change_sign(metric_name: str) -> int:
+    if metric_name.endswith(('_us', '_ms')):
+        return 1
+    if metric_name.endswith('_per_second'):
+        return -1
+    return 0
+
+
+# Relative changes of metrics present in both runs, positive changes are regressions
+def compare(baseline: dict, current: dict) -> list:
+    def get_key(result: dict):
+        return result['group'], result['name'], json.dumps(result['params'], sort_keys=True)
+
+    baseline_results = {get_key(result): result for result in baseline['results']}
+    changes = []
+    for result in current['results']:
+        baseline_result = baseline_results.get(get_key(result))
+        if baseline_result is None:
+            continue
+        for metric_name, value in result['metrics'].items():
+            baseline_value = baseline_result['metrics'].get(metric_name)
+            sign = _get_change_sign(metric_name)
+            if sign == 0 or not baseline_value:
+                continue
+            changes.append({
+                'group': result['group'],
+                'name': result['name'],
+                'params': result['params'],
+                'metric': metric_name,
+                'baseline': baseline_value,
+                'current': value,
+                'change': sign * (value - baseline_value) / baseline_value,
+            })
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--groups', default=','.join(GROUPS), help=f'comma-separated groups of {", ".join(GROUPS)}')
+    parser.add_argument('--output', help='file to write the results to, standard output otherwise')
+    parser.add_argument('--baseline', help='results of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=_DEFAULT_THRESHOLD,
+                        help='relative change of a metric considered a regression')
+    args = parser.parse_args()
+
+    groups = args.groups.split(',')
+    for group in groups:
+        if group not in GROUPS:
+            parser.error(f'unknown group {group}')
+    # The app group replaces the base assets and the environment, so it is run last
+    report = run(sorted(groups, key=lambda group: group == GROUP_APP))
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        changes = compare(baseline, report)
+        report['baseline_git_commit'] = baseline.get('git_commit')
+        report['regressions'] = [change for change in changes if change['change'] > args.threshold]
+        for change in report['regressions']:
+            sys.stderr.write(f'Regression of {change["group"]}.{change["name"]} {change["params"]} '
+                             f'{change["metric"]}: {change["baseline"]:.4g} -> {change["current"]:.4g} '
+                             f'({change["change"]:+.0%})\n')
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# Scale test of OptionApp on the synthetic market: the base assets of supported_base_asset.MAP are replaced
+# by the given count of synthetic ones, reference data is served by the ISS stub and quotes are replayed
+# through the Alor stub at the given rates, see synthetic_market and replay_harness.
+# Ticks are replayed as fast as possible by default to find the ceiling of the tick-to-IV pipeline,
+# meanwhile chart.json of random base assets is requested from the ASGI app by a separate process.
+# Other settings (IV_EXECUTOR_MODE, ALOR_SHARDS_COUNT...) are taken from the environment as usual.
+# Run from the src directory:
+#   python -m benchmark.synthetic_load [--base-assets 50] [--expirations 4] [--strikes 41]
+#       [--base-asset-rate 2] [--option-rate 20] [--duration 10] [--speed 0]
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import socket
+import time
+
+import numpy as np
+
+from app import supported_base_asset
+from benchmark import tick_replay
+from benchmark.alor_stub_server import AlorStubServer
+from benchmark.replay_harness import ReplayHarness
+from benchmark.synthetic_market import SyntheticMarket
+from infrastructure import alor_api
+
+_CHART_CONCURRENCY = 20
+_CHART_LOAD_DURATION = 5  # seconds
+
+
+async def _request_chart(port: int, base_asset_ticker: str) -> (int, float):
+    started_at = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET /chart.json?base_asset_ticker={base_asset_ticker} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+                 f'Connection: close\r\n\r\n'.encode())
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b' ', 2)[1]), time.perf_counter() - started_at
+
+
+async def _generate_chart_load(port: int, base_asset_tickers: list, duration: float) -> dict:
+    statuses, latencies = [], []
+    started_at = time.perf_counter()
+    deadline = started_at + duration
+
+    async def run_connection(random_generator: random.Random):
+        while time.perf_counter() < deadline:
+            status, latency = await _request_chart(port, random_generator.choice(base_asset_tickers))
+            statuses.append(status)
+            latencies.append(latency)
+
+    await asyncio.gather(*(run_connection(random.Random(i)) for i in range(_CHART_CONCURRENCY)))
+    elapsed_time = time.perf_counter() - started_at  # longer than the duration if the app is overloaded
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests_per_second': len(latencies) / elapsed_time,
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p99_ms': float(np.percentile(latencies, 99)),
+        'statuses': {str(status): statuses.count(status) for status in set(statuses)},
+    }
+
+
+def _run_chart_load_process(port: int, base_asset_tickers: list, duration: float, results):
+    results.put(asyncio.run(_generate_chart_load(port, base_asset_tickers, duration)))
+
+
+def _get_free_port() -> int:
+    with socket.socket() as free_socket:
+        free_socket.bind(('127.0.0.1', 0))
+        return free_socket.getsockname()[1]
+
+
+def run(market: SyntheticMarket, ticks: list, speed: float, chart_load_duration: float = _CHART_LOAD_DURATION) -> dict:
+    supported_base_asset.MAP.clear()
+    supported_base_asset.MAP.update(market.supported_base_assets)
+    port = _get_free_port()
+    harness = ReplayHarness(market.make_iss_stub_server(), AlorStubServer(market.get_data))
+    started_at = time.perf_counter()
+    harness.start({'WEB_SERVER': 'asgi', 'BACKEND_PORT': str(port)})
+    startup_time = time.perf_counter() - started_at
+
+    chart_results = multiprocessing.Queue()
+    chart_load_process = multiprocessing.Process(target=_run_chart_load_process,
+                                                 args=(port, market.base_asset_tickers, chart_load_duration,
+                                                       chart_results))
+    chart_load_process.start()
+    try:
+        replay_stats = harness.replay(ticks, speed)
+        chart_stats = chart_results.get()
+    finally:
+        chart_load_process.join()
+        harness.stop()
+    return {
+        'base_assets_count': len(market.base_asset_tickers),
+        'options_count': market.options_count,
+        'subscribed_options_count': harness.option_app.watched_options_count,
+        'startup_time_ms': startup_time * 1000,
+        'replay': replay_stats,
+        'chart_json': chart_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--base-assets', type=int, default=50, help='count of base assets')
+    parser.add_argument('--expirations', type=int, default=4, help='count of expirations of every base asset')
+    parser.add_argument('--strikes', type=int, default=41, help='count of strikes of every expiration')
+    parser.add_argument('--base-asset-rate', type=float, default=2, help='ticks per second of every base asset')
+    parser.add_argument('--option-rate', type=float, default=20,
+                        help='ticks per second of options of every base asset')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of the market to generate')
+    parser.add_argument('--speed', type=float, default=tick_replay.SPEED_MAX,
+                        help='1 - real time, 10 - ten times faster, 0 - as fast as possible')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    market = SyntheticMarket(args.base_assets, args.expirations, args.strikes, seed=args.seed)
+    wire_format = os.environ.get('ALOR_WIRE_FORMAT', alor_api.WIRE_FORMAT_SIMPLE)
+    ticks = market.make_ticks(args.duration, args.base_asset_rate, args.option_rate, wire_format)
+    print(run(market, ticks, args.speed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+# Synthetic market for scale testing: any count of base assets with option boards of several expirations.
+# Prices of base assets follow a geometric random walk, options are quoted at Black-Scholes prices
+# for the volatility smile of the expiration with a spread around them, trades happen at the mid price.
+# The market serves the ISS stub (reference data) and the Alor stub (data sent on subscription),
+# quotes are produced as ticks for replay, see tick_replay. The same seed gives the same market and ticks
+import math
+import random
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+from app import implied_volatility, trading_session_time
+from benchmark import tick_replay
+from benchmark.iss_stub_server import IssStubServer
+from infrastructure import alor_api
+from model import option_series_type, option_type
+from model.base_asset import BaseAsset
+from model.option_model import OptionModel
+from model.watched_instruments_filter import WatchedInstrumentsFilter
+
+_DAYS_IN_YEAR = 365
+_EXPIRATION_INTERVAL = 7   # days
+_PRICE_STEP_SHARE = 0.01   # of the strike step
+_MIN_VOLATILITY = 0.05
+_TICKER_SUFFIX = 'Z6'
+
+
+class SyntheticMarket:
+    # strikes_count - strikes of every expiration, centered at the initial price of the base asset.
+    # window_strikes_count - strikes around the price subscribed by the app, see supported_base_asset.MAP.
+    # Volatility of the expiration with time to maturity T for the strike K and the base asset price S is
+    #   atm_volatility + smile_skew * x + smile_curvature * x^2, where x = ln(K / S) / sqrt(T)
+    # price_volatility - standard deviation of the log return of the base asset price per its tick
+    def __init__(self, base_assets_count: int = 5, expirations_count: int = 4, strikes_count: int = 41,
+                 window_strikes_count: int = 11, seed: int = 1, atm_volatility: float = 0.35,
+                 smile_skew: float = -0.1, smile_curvature: float = 0.3, spread: float = 0.05,
+                 price_volatility: float = 0.0005, trade_share: float = 0.2):
+        self._random_generator = random.Random(seed)
+        self._window_strikes_count = window_strikes_count
+        self._smile = (atm_volatility, smile_skew, smile_curvature)
+        self._spread = spread
+        self._price_volatility = price_volatility
+        self._trade_share = trade_share
+        expiration_dates = [date.today() + timedelta(days=_EXPIRATION_INTERVAL * (i + 1))
+                            for i in range(expirations_count)]
+        self._base_assets = [self._create_base_asset(i, expiration_dates, strikes_count)
+                             for i in range(base_assets_count)]
+        self._initial_quotes = {}  # ticker -> data sent on subscription
+        for base_asset in self._base_assets:
+            self._initial_quotes[base_asset['ticker']] = {'last_price': base_asset['last_price']}
+            for option, quote in zip(base_asset['options'], self._get_option_quotes(base_asset,
+                                                                                   base_asset['last_price'])):
+                self._initial_quotes[option['ticker']] = dict(quote, last_price=None, last_price_timestamp=None)
+        self._volatilities = {option['ticker']: option['volatility'] * 100
+                              for base_asset in self._base_assets for option in base_asset['options']}
+
+    @property
+    def base_asset_tickers(self) -> list:
+        return [base_asset['ticker'] for base_asset in self._base_assets]
+
+    @property
+    def options_count(self) -> int:
+        return sum(len(base_asset['options']) for base_asset in self._base_assets)
+
+    # Replacement of supported_base_asset.MAP
+    @property
+    def supported_base_assets(self) -> dict:
+        return {base_asset['ticker']: {
+            'strike_step': base_asset['strike_step'],
+            'max_strikes_count': self._window_strikes_count,
+        } for base_asset in self._base_assets}
+
+    # Fills the model as ModelLoader and the first quotes would do, all options are watched
+    def fill_model(self, model: OptionModel, watched_instruments_filter: WatchedInstrumentsFilter):
+        for base_asset_data in self._base_assets:
+            base_asset = BaseAsset(base_asset_data['ticker'])
+            base_asset.short_name = base_asset_data['ticker']
+            base_asset.base_asset_code = base_asset_data['asset_code']
+            base_asset.last_price = base_asset_data['last_price']
+            model.base_asset_repository.insert_base_asset(base_asset)
+            for option_data in base_asset_data['options']:
+                expiration_datetime = trading_session_time.get_option_expiration_datetime(
+                    base_asset.base_asset_code, option_series_type.WEEK, option_data['expiration_date'])
+                if expiration_datetime not in base_asset.expiration_datetimes:
+                    base_asset.add_expiration_datetime(expiration_datetime)
+                option = model.option_repository.create_option(option_data['ticker'], base_asset.ticker,
+                                                               expiration_datetime, option_data['strike'],
+                                                               option_data['type'])
+                quote = self._initial_quotes[option.ticker]
+                option.bid = quote['bid']
+                option.ask = quote['ask']
+                option.volatility = self._volatilities[option.ticker]
+                watched_instruments_filter.add_option_ticker(option.ticker)
+
+    def make_iss_stub_server(self, latency: float = 0) -> IssStubServer:
+        iss_stub_server = IssStubServer(latency=latency)
+        for base_asset in self._base_assets:
+            options = [dict(option, **self._initial_quotes[option['ticker']]) for option in base_asset['options']]
+            iss_stub_server.add_base_asset(base_asset['ticker'], base_asset['asset_code'], base_asset['last_price'],
+                                           options)
+        return iss_stub_server
+
+    # Data sent by the Alor stub on subscription, see AlorStubServer
+    def get_data(self, api_method: str, ticker: str) -> dict:
+        if api_method == alor_api.API_METHOD_QUOTES_SUBSCRIBE:
+            return dict(self._initial_quotes.get(ticker, {}), symbol=ticker)
+        return {'symbol': ticker, 'volatility': self._volatilities.get(ticker)}
+
+    # Ticks of the given duration starting from the initial state of the market, arrivals are Poisson.
+    # Rates are per base asset per second: ticks of the base asset and ticks of its options
+    # in the window around the current price
+    def make_ticks(self, duration: float, base_asset_ticks_rate: float, option_ticks_rate: float,
+                   wire_format: str = alor_api.WIRE_FORMAT_SIMPLE) -> list:
+        random_generator = random.Random(self._random_generator.random())
+        prices = {base_asset['ticker']: base_asset['last_price'] for base_asset in self._base_assets}
+        last_trades = {}  # option ticker -> last price and its timestamp
+        total_rate = len(self._base_assets) * (base_asset_ticks_rate + option_ticks_rate)
+        base_asset_tick_share = base_asset_ticks_rate / (base_asset_ticks_rate + option_ticks_rate)
+        started_at = time.time()
+
+        ticks = []
+        offset = random_generator.expovariate(total_rate)
+        while offset < duration:
+            base_asset = random_generator.choice(self._base_assets)
+            ticker = base_asset['ticker']
+            if random_generator.random() < base_asset_tick_share:
+                prices[ticker] *= math.exp(random_generator.gauss(0, self._price_volatility) -
+                                           self._price_volatility ** 2 / 2)
+                last_price = _round_to_step(prices[ticker], base_asset['price_step'], round)
+                ticks.append(tick_replay.make_quote_tick(offset, ticker, {'last_price': last_price}, wire_format))
+            else:
+                option = random_generator.choice(self._get_window_options(base_asset, prices[ticker]))
+                data = self._get_option_quotes(base_asset, prices[ticker], [option])[0]
+                if random_generator.random() < self._trade_share and data['bid'] is not None:
+                    last_trades[option['ticker']] = (_round_to_step((data['bid'] + data['ask']) / 2,
+                                                                    base_asset['price_step'], round),
+                                                     int(started_at + offset))
+                data['last_price'], data['last_price_timestamp'] = last_trades.get(option['ticker'], (None, None))
+                ticks.append(tick_replay.make_quote_tick(offset, option['ticker'], data, wire_format))
+            offset += random_generator.expovariate(total_rate)
+        return ticks
+
+    def _create_base_asset(self, index: int, expiration_dates: list, strikes_count: int) -> dict:
+        random_generator = self._random_generator
+        last_price = 10 ** random_generator.uniform(2, 5)
+        strike_step = _round_to_nice_step(last_price / strikes_count)
+        price_step = strike_step * _PRICE_STEP_SHARE
+        last_price = _round_to_step(last_price, price_step, round)
+        central_strike = _round_to_step(last_price, strike_step, round)
+        strikes = [central_strike + strike_step * (i - strikes_count // 2) for i in range(strikes_count)]
+
+        asset_code = f'SY{index:03d}'
+        ticker = f'{asset_code}{_TICKER_SUFFIX}'
+        options = []
+        for expiration_index, expiration_date in enumerate(expiration_dates):
+            time_to_maturity = (expiration_date - date.today()).days / _DAYS_IN_YEAR
+            for strike in strikes:
+                if strike <= 0:
+                    continue
+                for opt_type, type_code in ((option_type.CALL, 'C'), (option_type.PUT, 'P')):
+                    options.append({
+                        'ticker': f'{asset_code}{strike:g}{type_code}{expiration_index}{_TICKER_SUFFIX}',
+                        'type': opt_type,
+                        'strike': strike,
+                        'expiration_date': expiration_date.isoformat(),
+                        'time_to_maturity': time_to_maturity,
+                        'volatility': self._get_volatility(strike, last_price, time_to_maturity),
+                    })
+        return {
+            'ticker': ticker,
+            'asset_code': asset_code,
+            'last_price': last_price,
+            'strike_step': strike_step,
+            'price_step': price_step,
+            'options': options,
+        }
+
+    def _get_window_options(self, base_asset: dict, price: float) -> list:
+        half_width = base_asset['strike_step'] * (self._window_strikes_count // 2 + 0.5)
+        return [option for option in base_asset['options'] if abs(option['strike'] - price) <= half_width] or \
+            base_asset['options']
+
+    def _get_volatility(self, strike: float, price: float, time_to_maturity: float) -> float:
+        atm_volatility, smile_skew, smile_curvature = self._smile
+        x = math.log(strike / price) / math.sqrt(time_to_maturity)
+        return max(atm_volatility + smile_skew * x + smile_curvature * x ** 2, _MIN_VOLATILITY)
+
+    # Bid and ask for the base asset price, prices below the price step are not quoted
+    def _get_option_quotes(self, base_asset: dict, price: float, options: list = None) -> list:
+        options = base_asset['options'] if options is None else options
+        strikes = np.array([option['strike'] for option in options], dtype=float)
+        times_to_maturity = np.array([option['time_to_maturity'] for option in options])
+        volatilities = np.array([self._get_volatility(option['strike'], price, option['time_to_maturity'])
+                                 for option in options])
+        is_call = np.array([option['type'] == option_type.CALL for option in options])
+        theoretical_prices = implied_volatility.get_option_prices_array(price, strikes, volatilities * 100,
+                                                                        times_to_maturity, is_call)
+
+        price_step = base_asset['price_step']
+        quotes = []
+        for theoretical_price in theoretical_prices.tolist():
+            bid = _round_to_step(theoretical_price * (1 - self._spread / 2), price_step, math.floor)
+            ask = max(_round_to_step(theoretical_price * (1 + self._spread / 2), price_step, math.ceil), price_step)
+            quotes.append({'bid': bid if bid > 0 else None, 'ask': ask})
+        return quotes
+
+
+# rounding - round, math.floor or math.ceil
+def _round_to_step(value: float, step: float, rounding: callable) -> float:
+    return round(rounding(value / step) * step, 6)
+
+
+# 1, 2 or 5 multiplied by a power of 10, the closest to the value
+def _round_to_nice_step(value: float) -> float:
+    magnitude = 10 ** math.floor(math.log10(value))
+    return min((multiplier * magnitude for multiplier in (1, 2, 5, 10)), key=lambda step: abs(step - value))
@@ -0,0 +1,82 @@
+# Measures the tick journal: cost of append() on the consumer side, time for the writer to put all messages
+# to disk and speed of sequential read-back, with quote messages of the option chain fixture.
+# Then checks that records read from live segments are read the same after closing, see check_read_back_across_close.
+# Run from the src directory: python -m benchmark.tick_journal_throughput
+import os
+import tempfile
+import time
+
+from benchmark.alor_message_decoding import _make_messages
+from benchmark.option_chain_fixture import load_option_chain
+from infrastructure import alor_api, tick_journal
+from infrastructure.tick_journal import TickJournal
+
+_SEGMENT_SIZE = 8 * 1024 * 1024  # bytes, small enough to rotate segments several times
+_CHECK_SEGMENT_SIZE = 1000          # bytes
+# Messages fitting the segment, larger than it and filling the rest of a segment to its end
+_CHECK_MESSAGE_SIZES = (100, 3000, 500, 10, 5000, 900, 200)
+
+
+def run(messages: list) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        journal = TickJournal(directory, _SEGMENT_SIZE)
+        started_at = time.perf_counter()
+        for message in messages:
+            journal.append(message, time.time())
+        append_time = time.perf_counter() - started_at
+        journal.close()
+        write_time = time.perf_counter() - started_at
+        stats = journal.get_stats()
+
+        started_at = time.perf_counter()
+        read_messages_count = 0
+        read_bytes_count = 0
+        for received_time, shard_id, message in tick_journal.read_journal(directory):
+            read_messages_count += 1
+            read_bytes_count += len(message)
+        read_time = time.perf_counter() - started_at
+        assert read_messages_count == len(messages)
+
+    return {
+        'messages_count': len(messages),
+        'segments_count': stats['segments_count'],
+        'written_mb': stats['written_bytes_count'] / 1024 / 1024,
+        'append_time_ns_per_message': append_time / len(messages) * 1e9,
+        'write_messages_per_second': len(messages) / write_time,
+        'read_messages_per_second': read_messages_count / read_time,
+        'read_mb_per_second': read_bytes_count / 1024 / 1024 / read_time,
+    }
+
+
+# Raises RuntimeError if records of the live journal differ from the records of the closed one
+def check_read_back_across_close() -> dict:
+    messages = [bytes([ord('a') + i]) * size for i, size in enumerate(_CHECK_MESSAGE_SIZES)]
+    with tempfile.TemporaryDirectory() as directory:
+        journal = TickJournal(directory, _CHECK_SEGMENT_SIZE, flush_interval=0.01)
+        for i, message in enumerate(messages):
+            journal.append(message, 1_700_000_000 + i, i % 2)
+        while journal.get_stats()['written_messages_count'] < len(messages):
+            time.sleep(0.01)
+        live_records = list(tick_journal.read_journal(directory))
+        journal.close()
+        closed_records = list(tick_journal.read_journal(directory))
+        segment_sizes = [os.path.getsize(path) for path in tick_journal.get_segment_paths(directory)]
+
+    result = {
+        'messages_count': len(messages),
+        'live_records_count': len(live_records),
+        'closed_records_count': len(closed_records),
+        'closed_segment_sizes': segment_sizes,
+    }
+    if [record[2] for record in live_records] != messages or closed_records != live_records:
+        raise RuntimeError(f'Tick journal records differ after closing: {result}')
+    return result
+
+
+def main():
+    print(run(_make_messages(load_option_chain(), alor_api.WIRE_FORMAT_SIMPLE)))
+    print(check_read_back_across_close())
+
+
+if __name__ == '__main__':
+    main()
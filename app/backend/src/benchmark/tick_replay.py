@@ -0,0 +1,126 @@
+# Ticks to replay through the Alor stub: recorded by the tick journal or scripted from the option chain fixture.
+# Replay keeps the order of ticks and their relative timing scaled by the speed, or sends ticks
+# as fast as the connection takes them
+import asyncio
+import json
+import random
+import time
+
+from app import supported_base_asset
+from benchmark.iss_stub_server import get_option_ticker
+from infrastructure import alor_api, json_decoder, tick_journal
+
+SPEED_REAL_TIME = 1.0
+SPEED_MAX = 0  # as fast as possible, timing of ticks is ignored
+
+_SCRIPTED_TICK_INTERVAL = 0.001  # seconds
+_BASE_ASSET_TICK_SHARE = 0.05
+_BASE_ASSET_PRICE_STEP_SHARE = 0.02  # of the strike step, per base asset tick
+_QUOTE_JITTER = 0.01                 # share of the price
+_WINDOW_STRIKES_COUNT = 5            # strikes on each side of the central one to quote
+
+
+class ReplayTick:
+    __slots__ = ('offset', 'guid', 'message')
+
+    # offset - seconds since the first tick
+    def __init__(self, offset: float, guid: str, message):
+        self.offset = offset
+        self.guid = guid
+        self.message = message
+
+
+# Data messages of the journal, other messages (e.g. responses to subscriptions) are skipped
+def load_journal_ticks(directory: str, from_time: float = None) -> list:
+    ticks = []
+    first_received_time = None
+    for received_time, shard_id, message in tick_journal.read_journal(directory, from_time):
+        message_dict = json_decoder.decode(message)
+        if 'data' not in message_dict or 'guid' not in message_dict:
+            continue
+        if first_received_time is None:
+            first_received_time = received_time
+        ticks.append(ReplayTick(received_time - first_received_time, message_dict['guid'], message.decode()))
+    return ticks
+
+
+# Random walk of base asset prices with option quotes around the fixture ones, for strikes around the price.
+# The same seed gives the same ticks
+def make_scripted_ticks(chain: dict, ticks_count: int, wire_format: str = alor_api.WIRE_FORMAT_SIMPLE,
+                        seed: int = 1, tick_interval: float = _SCRIPTED_TICK_INTERVAL) -> list:
+    random_generator = random.Random(seed)
+    base_asset_tickers = list(supported_base_asset.MAP)
+    base_asset_prices = {ticker: chain['base_asset_last_price'] for ticker in base_asset_tickers}
+    options_by_strike = {}
+    for option_data in chain['options']:
+        options_by_strike.setdefault(option_data['strike'], []).append(option_data)
+    strikes = sorted(options_by_strike)
+    now = int(time.time())
+
+    ticks = []
+    for i in range(ticks_count):
+        base_asset_ticker = random_generator.choice(base_asset_tickers)
+        strike_step = supported_base_asset.MAP[base_asset_ticker]['strike_step']
+        if random_generator.random() < _BASE_ASSET_TICK_SHARE:
+            base_asset_prices[base_asset_ticker] += random_generator.choice((-1, 1)) * \
+                                                   strike_step * _BASE_ASSET_PRICE_STEP_SHARE
+            ticker = base_asset_ticker
+            data = {'last_price': base_asset_prices[base_asset_ticker]}
+        else:
+            base_asset_price = base_asset_prices[base_asset_ticker]
+            window_strikes = [strike for strike in strikes
+                              if abs(strike - base_asset_price) <= strike_step * _WINDOW_STRIKES_COUNT]
+            option_data = random_generator.choice(options_by_strike[random_generator.choice(window_strikes or strikes)])
+            ticker = get_option_ticker(base_asset_ticker, option_data['ticker'])
+            data = {
+                'last_price': option_data['last_price'],
+                'last_price_timestamp': now,
+                'ask': _jitter(random_generator, option_data['ask']),
+                'bid': _jitter(random_generator, option_data['bid']),
+            }
+        ticks.append(make_quote_tick(i * tick_interval, ticker, data, wire_format))
+    return ticks
+
+
+# Function returning the data sent by the Alor stub on subscription: fixture quotes of options
+# and the fixture price for every base asset, see AlorStubServer
+def make_chain_data_function(chain: dict, volatility: float = 40.0) -> callable:
+    quotes = {ticker: {'last_price': chain['base_asset_last_price']} for ticker in supported_base_asset.MAP}
+    for base_asset_ticker in supported_base_asset.MAP:
+        for option_data in chain['options']:
+            quotes[get_option_ticker(base_asset_ticker, option_data['ticker'])] = {
+                'last_price': option_data['last_price'],
+                'last_price_timestamp': None,
+                'ask': option_data['ask'],
+                'bid': option_data['bid'],
+            }
+
+    def get_data(api_method: str, ticker: str) -> dict:
+        if api_method == alor_api.API_METHOD_QUOTES_SUBSCRIBE:
+            return dict(quotes.get(ticker, {}), symbol=ticker)
+        return {'symbol': ticker, 'volatility': volatility}
+
+    return get_data
+
+
+def make_quote_tick(offset: float, ticker: str, data: dict, wire_format: str = alor_api.WIRE_FORMAT_SIMPLE):
+    guid = alor_api.get_guid(alor_api.API_METHOD_QUOTES_SUBSCRIBE, ticker)
+    data = alor_api.to_wire_format(dict(data, symbol=ticker), wire_format)
+    return ReplayTick(offset, guid, json.dumps({'data': data, 'guid': guid}))
+
+
+def _jitter(random_generator: random.Random, price):
+    if price is None:
+        return None
+    return round(price * (1 + random_generator.uniform(-_QUOTE_JITTER, _QUOTE_JITTER)))
+
+
+# send - coroutine function sending the tick
+async def replay(ticks: list, speed: float, send: callable):
+    started_at = time.monotonic()
+    for tick in ticks:
+        if speed != SPEED_MAX:
+            delay = started_at + tick.offset / speed - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await send(tick)
@@ -0,0 +1,113 @@
+# Compares throughput of chart.json served by the threaded Flask dev server and by the ASGI app on one event loop.
+# The load is generated by a separate process with a fixed count of concurrent connections,
+# every request opens a new connection, as the dev server closes it after every response.
+# Run from the src directory: python -m benchmark.web_tier_throughput
+import asyncio
+import logging
+import multiprocessing
+import socket
+import threading
+import time
+
+import numpy as np
+from werkzeug.serving import make_server
+
+from benchmark.chart_source import ChartSource, BASE_ASSET_TICKER
+from view import flask_app, asgi_app
+
+_CONCURRENCY = 50
+_DURATION = 3  # seconds
+_PATH = f'/chart.json?base_asset_ticker={BASE_ASSET_TICKER}'
+
+
+async def _request(port: int, headers: str) -> (int, float):
+    started_at = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {_PATH} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n{headers}\r\n'.encode())
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b' ', 2)[1]), time.perf_counter() - started_at
+
+
+async def _generate_load(port: int, headers: str) -> dict:
+    statuses, latencies = [], []
+    deadline = time.perf_counter() + _DURATION
+
+    async def run_connection():
+        while time.perf_counter() < deadline:
+            status, latency = await _request(port, headers)
+            statuses.append(status)
+            latencies.append(latency)
+
+    await asyncio.gather(*(run_connection() for _ in range(_CONCURRENCY)))
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests_per_second': len(latencies) / _DURATION,
+        'latency_p50_ms': float(np.percentile(latencies, 50)),
+        'latency_p99_ms': float(np.percentile(latencies, 99)),
+        'statuses': {str(status): statuses.count(status) for status in set(statuses)},
+    }
+
+
+def _run_load_process(port: int, headers: str, results):
+    results.put(asyncio.run(_generate_load(port, headers)))
+
+
+def _get_free_port() -> int:
+    with socket.socket() as free_socket:
+        free_socket.bind(('127.0.0.1', 0))
+        return free_socket.getsockname()[1]
+
+
+def _start_flask_server(chart_source: ChartSource) -> int:
+    flask_app.get_flask_app().set_option_app(chart_source)
+    server = make_server('127.0.0.1', 0, flask_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_port
+
+
+def _start_asgi_server(chart_source: ChartSource) -> int:
+    asgi_app.get_asgi_app().set_option_app(chart_source)
+    port = _get_free_port()
+    threading.Thread(target=asyncio.run, args=(asgi_app.get_asgi_app().serve(port),), daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+    return port
+
+
+def run(server: str, is_not_modified: bool) -> dict:
+    chart_source = ChartSource()
+    chart_source.update()
+    port = _start_flask_server(chart_source) if server == 'flask' else _start_asgi_server(chart_source)
+    headers = ''
+    if is_not_modified:
+        with socket.create_connection(('127.0.0.1', port)) as connection:
+            connection.sendall(f'GET {_PATH} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode())
+            response = b''
+            while chunk := connection.recv(65536):
+                response += chunk
+        etag = next(line.split(b':', 1)[1].strip() for line in response.split(b'\r\n')
+                    if line.lower().startswith(b'etag:'))
+        headers = f'If-None-Match: {etag.decode()}\r\n'
+
+    results = multiprocessing.Queue()
+    load_process = multiprocessing.Process(target=_run_load_process, args=(port, headers, results))
+    load_process.start()
+    result = results.get()
+    load_process.join()
+    return {'server': server, 'is_not_modified': is_not_modified, 'concurrency': _CONCURRENCY, **result}
+
+
+def main():
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    for server in ('flask', 'asgi'):
+        for is_not_modified in (False, True):
+            print(run(server, is_not_modified))
+
+
+if __name__ == '__main__':
+    main()
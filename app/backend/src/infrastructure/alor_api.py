@@ -1,10 +1,19 @@
 import asyncio
+import base64
 import json
 import hashlib
+import random
+import sys
+import time
+from collections.abc import Mapping
+
 import websockets
 
+from infrastructure import json_decoder, metrics
 from infrastructure.alor_api_event import AlorApiEvent
+from infrastructure.alor_shard import AlorShard
 from infrastructure.api_utils import get_object_from_json_endpoint
+from infrastructure.tick_journal import TickJournal
 
 # TODO: возможно, для случая с несколькими одновременно работающими экземплярами приложения одинаковый
 #  id может стать проблемой: разные инстансы будут создавать в API подписки на события с одинаковым GUID.
@@ -12,103 +21,496 @@ from infrastructure.api_utils import get_object_from_json_endpoint
 #  и делать уникальным для каждого инстанса.
 _APP_ID = 'option_volatility_dashboard'
 
-_REFRESH_TOKEN_URL = 'https://oauth.alor.ru/refresh'
-_WEBSOCKET_URL = 'wss://api.alor.ru/ws'
+DEFAULT_REFRESH_TOKEN_URL = 'https://oauth.alor.ru/refresh'
+DEFAULT_WEBSOCKET_URL = 'wss://api.alor.ru/ws'
 _EXCHANGE_MOEX = "MOEX"
 
-_API_METHOD_QUOTES_SUBSCRIBE = "QuotesSubscribe"
-_API_METHOD_INSTRUMENTS_GET_AND_SUBSCRIBE = "InstrumentsGetAndSubscribeV2"
+_DEFAULT_TOKEN_LIFETIME = 30 * 60      # seconds, if the token does not tell its expiration time
+_TOKEN_REFRESH_MARGIN = 60             # seconds before expiration of the token when it is refreshed
+_TOKEN_REFRESH_RETRY_INTERVAL = 5      # seconds
+_RECONNECT_MIN_DELAY = 0.1             # seconds, delays grow twice with every failed attempt
+_RECONNECT_MAX_DELAY = 30              # seconds
+_REPOPULATION_TIMEOUT = 10             # seconds to wait for data of resubscribed guids, see AlorShard
+
+API_METHOD_QUOTES_SUBSCRIBE = "QuotesSubscribe"
+API_METHOD_INSTRUMENTS_GET_AND_SUBSCRIBE = "InstrumentsGetAndSubscribeV2"
+API_METHOD_UNSUBSCRIBE = "unsubscribe"
+_API_METHOD_SUBSCRIBE = 'subscribe'  # not an opcode of Alor API, a request of a shard queue to send the subscription
+# Labels of received messages that are not data of a subscription
+_OPCODE_RESPONSE = 'response'      # response to a request
+_OPCODE_UNKNOWN = 'unknown'        # data of a guid that is already unsubscribed
+
+_received_messages = metrics.REGISTRY.counter('alor_received_messages_total',
+                                              'Messages received from Alor by opcode of the subscription',
+                                              ('opcode',))
+_message_handling_seconds = metrics.REGISTRY.histogram(
+    'alor_message_handling_seconds', 'Time from reading of a message to the end of its decoding and dispatching '
+                                     '(callbacks included unless conflated)', label_names=('opcode',))
+
+# Full field names, e.g. last_price, bid, ask
+WIRE_FORMAT_SIMPLE = 'Simple'
+# Short field names, several times smaller messages, e.g. c, b, a. Used for quotes only,
+# instrument updates are rare, so they are always requested in the simple format
+WIRE_FORMAT_SLIM = 'Slim'
+WIRE_FORMATS = (WIRE_FORMAT_SIMPLE, WIRE_FORMAT_SLIM)
+
+# Slim field name -> simple field name of quotes
+_SLIM_QUOTE_FIELD_NAMES = {
+    'sym': 'symbol',
+    'ex': 'exchange',
+    'desc': 'description',
+    'pcp': 'prev_close_price',
+    'po': 'open_price',
+    'ph': 'high_price',
+    'pl': 'low_price',
+    'c': 'last_price',
+    'lpt': 'last_price_timestamp',
+    'v': 'volume',
+    'a': 'ask',
+    'b': 'bid',
+    'av': 'ask_vol',
+    'bv': 'bid_vol',
+    'tav': 'total_ask_vol',
+    'tbv': 'total_bid_vol',
+    'ch': 'change',
+    'chp': 'change_percent',
+    'oi': 'open_interest',
+    'fv': 'facevalue',
+    'yld': 'yield',
+    'lot': 'lotsize',
+    'lotv': 'lotvalue',
+    'tso': 'ob_ms_timestamp',
+}
+_SIMPLE_QUOTE_FIELD_NAMES = {simple_name: slim_name for slim_name, simple_name in _SLIM_QUOTE_FIELD_NAMES.items()}
+
+
+# Quote data with simple field names as it is sent in the wire format, e.g. by a stub of Alor API
+def to_wire_format(data: dict, wire_format: str) -> dict:
+    if wire_format == WIRE_FORMAT_SLIM:
+        return {_SIMPLE_QUOTE_FIELD_NAMES.get(name, name): value for name, value in data.items()}
+    return data
+
+
+# Quote data received in the wire format as quote callbacks get it, by simple field names
+def from_wire_format(data: dict, wire_format: str) -> Mapping:
+    if wire_format == WIRE_FORMAT_SLIM:
+        return _RenamedFieldsView(data, _SLIM_QUOTE_FIELD_NAMES, _SIMPLE_QUOTE_FIELD_NAMES)
+    return data
 
 
 # Generate guid string for given api_method and ticker
 # guid string must be deterministic because otherwise Alor API may block requests.
 # This is because of it's anti-spam system
-def _get_guid(api_method: str, ticker: str):
+def get_guid(api_method: str, ticker: str):
     input_string = ';'.join([_APP_ID, api_method, ticker])
     sha256_hash = hashlib.sha256()
     sha256_hash.update(input_string.encode())
     return sha256_hash.hexdigest()
 
 
-def _get_authorization_token(client_token):
+def _get_authorization_token(client_token, refresh_token_url: str = DEFAULT_REFRESH_TOKEN_URL):
     params = {'token': client_token}
 
-    response = get_object_from_json_endpoint(_REFRESH_TOKEN_URL, 'POST', params)
+    response = get_object_from_json_endpoint(refresh_token_url, 'POST', params)
     authorization_token = None
     if response and 'AccessToken' in response:
         authorization_token = response['AccessToken']
     return authorization_token
 
 
+# Access token is a JWT, its expiration time (Unix time) is taken from the exp claim of the payload
+def _get_token_expiration_time(authorization_token: str) -> float:
+    try:
+        payload = authorization_token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return time.time() + _DEFAULT_TOKEN_LIFETIME
+
+
+# Jittered exponential backoff, so that shards and instances do not reconnect all at once
+def _get_reconnect_delay(attempts_count: int) -> float:
+    delay = min(_RECONNECT_MAX_DELAY, _RECONNECT_MIN_DELAY * 2 ** attempts_count)
+    return random.uniform(delay / 2, delay)
+
+
+# Rendezvous hashing: the subscription goes to the shard with the highest score. When a shard is added,
+# only the subscriptions for which the new shard has the highest score move to it, others stay in place
+def _get_shard_score(guid: str, shard_id: int) -> int:
+    return int.from_bytes(hashlib.sha256(f'{guid};{shard_id}'.encode()).digest()[:8], 'big')
+
+
+# Returns guid and data of a data message, None for other messages, e.g. responses to subscription requests
+def parse_message(message, decode: callable):
+    message_dict = decode(message)
+    if 'data' in message_dict and 'guid' in message_dict:
+        return message_dict['guid'], message_dict['data']
+    return None
+
+
+# Read-only view of slim data by simple field names. Fields are looked up on access,
+# callbacks read only a few of them, so that converting the whole message would cost more than decoding it
+class _RenamedFieldsView(Mapping):
+    __slots__ = ('_data', '_field_names', '_original_field_names')
+
+    def __init__(self, data: dict, field_names: dict, original_field_names: dict):
+        self._data = data
+        self._field_names = field_names
+        self._original_field_names = original_field_names
+
+    def __getitem__(self, name):
+        return self._data[self._original_field_names.get(name, name)]
+
+    def __iter__(self):
+        field_names = self._field_names
+        return (field_names.get(name, name) for name in self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
 class AlorApi:
-    def __init__(self, client_token):
-        self._async_queue = asyncio.Queue()
+    # conflation_interval - max delay in seconds of data delivery to callbacks when conflation is enabled.
+    # With conflation only the latest data for every guid is delivered to callbacks, stale data is dropped.
+    # Zero or None disables conflation.
+    # wire_format - format of quotes, see WIRE_FORMATS. Callbacks get simple field names in any format.
+    # json_decoder_name - decoder of incoming messages, see json_decoder.DECODERS.
+    # shards_count - number of websocket connections, subscriptions are spread between them by guid.
+    # on_ready_changed - called with is_ready on the event loop thread, see is_ready.
+    # tick_journal - if set, every received message is recorded to it as is
+    def __init__(self, client_token, conflation_interval: float = None, wire_format: str = WIRE_FORMAT_SIMPLE,
+                 json_decoder_name: str = json_decoder.DEFAULT_DECODER, shards_count: int = 1,
+                 on_ready_changed: callable = None, websocket_url: str = DEFAULT_WEBSOCKET_URL,
+                 refresh_token_url: str = DEFAULT_REFRESH_TOKEN_URL, tick_journal: TickJournal = None):
+        self._shards = [AlorShard(shard_id) for shard_id in range(shards_count)]
+        self._shards_changed_event = asyncio.Event()
         self._api_events = {}
-        self._auth_token = _get_authorization_token(client_token)
+        self._client_token = client_token
+        self._websocket_url = websocket_url
+        self._refresh_token_url = refresh_token_url
+        self._auth_token = None
+        self._auth_token_expiration_time = None
+        self._auth_token_lock = asyncio.Lock()
+        self._on_ready_changed = on_ready_changed
+        self._tick_journal = tick_journal
+        self._is_ready = False
+        self._conflation_interval = conflation_interval
+        self._wire_format = wire_format
+        self._decode = json_decoder.get_decode_function(json_decoder_name)
+        self._pending_data = {}
+        self._pending_data_event = asyncio.Event()
+        self._last_drain_time = time.monotonic()
+        self._received_messages_count = 0
+        self._coalesced_messages_count = 0
+        self._dispatched_messages_count = 0
+
+    # coroutines - other coroutines to run on the same event loop, e.g. a web server.
+    # Connections are reconnected and resubscribed until one of coroutines is finished
+    def run_async_connection(self, is_debug: bool, *coroutines):
+        asyncio.run(self.run_connection(*coroutines), debug=is_debug)
 
-    def run_async_connection(self, is_debug: bool):
-        asyncio.run(self._connect_to_websocket(), debug=is_debug)
+    # All connections are up and data of all subscriptions has been received since the last reconnection.
+    # Otherwise the data of some subscriptions is stale
+    @property
+    def is_ready(self) -> bool:
+        return self._is_ready
 
     def subscribe_to_instrument(self, ticker, callback):
-        self._subscribe_to_event(_API_METHOD_INSTRUMENTS_GET_AND_SUBSCRIBE, ticker, callback)
+        self._subscribe_to_event(API_METHOD_INSTRUMENTS_GET_AND_SUBSCRIBE, ticker, callback, WIRE_FORMAT_SIMPLE)
 
     def subscribe_to_quotes(self, ticker: str, callback: callable):
-        self._subscribe_to_event(_API_METHOD_QUOTES_SUBSCRIBE, ticker, callback)
+        self._subscribe_to_event(API_METHOD_QUOTES_SUBSCRIBE, ticker, callback, self._wire_format)
 
+    def unsubscribe_from_instrument(self, ticker: str):
+        self._unsubscribe_from_event(API_METHOD_INSTRUMENTS_GET_AND_SUBSCRIBE, ticker)
+
+    def unsubscribe_from_quotes(self, ticker: str):
+        self._unsubscribe_from_event(API_METHOD_QUOTES_SUBSCRIBE, ticker)
+
+    # Adds a websocket connection and moves to it its share of subscriptions.
+    # Must be called on the event loop thread when the connection is running
+    def add_shard(self):
+        new_shard = AlorShard(len(self._shards))
+        self._shards.append(new_shard)
+        for shard in self._shards[:-1]:
+            for guid in [guid for guid in shard.guids if self._get_shard(guid) is new_shard]:
+                shard.remove_guid(guid)
+                shard.async_queue.put_nowait((API_METHOD_UNSUBSCRIBE, guid))
+                new_shard.add_guid(guid)
+                new_shard.async_queue.put_nowait((_API_METHOD_SUBSCRIBE, guid))
+        self._update_ready()
+        self._shards_changed_event.set()
+
+    def get_shard_stats(self) -> list:
+        return [shard.get_stats() for shard in self._shards]
+
+    def get_conflation_stats(self) -> dict:
+        return {
+            'received_messages_count': self._received_messages_count,
+            'coalesced_messages_count': self._coalesced_messages_count,
+            'dispatched_messages_count': self._dispatched_messages_count,
+            'pending_messages_count': len(self._pending_data),
+        }
+
+    def _is_conflation_enabled(self) -> bool:
+        return bool(self._conflation_interval)
+
+    # Field names are restored only here, so that data dropped by conflation is never wrapped
     def _handle_data(self, guid, data):
         api_event = self._get_api_event(guid)
+        if api_event is None:  # unsubscribed, but the message was already sent by the server
+            return
         ticker = api_event.ticker
         callback = api_event.callback
+        if api_event.field_names is not None:
+            data = _RenamedFieldsView(data, api_event.field_names, api_event.original_field_names)
         callback(ticker, data)
 
     def _get_api_event(self, guid: str) -> AlorApiEvent:
-        return self._api_events[guid]
+        return self._api_events.get(guid)
 
     def _add_api_event(self, guid: str, api_event: AlorApiEvent):
         self._api_events[guid] = api_event
 
-    async def _connect_to_websocket(self):
-        async with websockets.connect(_WEBSOCKET_URL) as websocket:
-            await self._handler(websocket)
-
-    async def _consumer(self, message):
-        message_dict = json.loads(message)
-        if 'data' in message_dict and 'guid' in message_dict:
-            guid = message_dict['guid']
-            data = message_dict['data']
-            self._handle_data(guid, data)
-
-    async def _consumer_handler(self, websocket):
-        async for message in websocket:
-            await self._consumer(message)
+    def _get_shard(self, guid: str) -> AlorShard:
+        return max(self._shards, key=lambda shard: _get_shard_score(guid, shard.shard_id))
 
-    async def _producer_handler(self, websocket):
-        while True:
-            message = await self._async_queue.get()
-            await websocket.send(message)
-
-    async def _handler(self, websocket):
-        consumer_task = asyncio.create_task(self._consumer_handler(websocket))
-        producer_task = asyncio.create_task(self._producer_handler(websocket))
+    # Same as run_async_connection, but on the running event loop
+    async def run_connection(self, *coroutines):
+        tasks = [asyncio.create_task(self._run_shards()), asyncio.create_task(self._token_refresher_handler())]
+        if self._is_conflation_enabled():
+            tasks.append(asyncio.create_task(self._dispatcher_handler()))
+        tasks.extend(asyncio.create_task(coroutine) for coroutine in coroutines)
         done, pending = await asyncio.wait(
-            [consumer_task, producer_task],
+            tasks,
             return_when=asyncio.FIRST_COMPLETED,
         )
         for task in pending:
             task.cancel()
 
-    def _subscribe_to_event(self, api_method: str, ticker: str, callback: callable):
-        guid = _get_guid(api_method, ticker)
-        event = AlorApiEvent(ticker, callback)
+    # Runs a connection per shard, including shards added later, until any of connections is closed
+    async def _run_shards(self):
+        try:
+            while True:
+                for shard in self._shards:
+                    if shard.task is None:
+                        shard.task = asyncio.create_task(self._connect_to_websocket(shard))
+                shards_changed_task = asyncio.create_task(self._shards_changed_event.wait())
+                done, pending = await asyncio.wait(
+                    [shard.task for shard in self._shards] + [shards_changed_task],
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if shards_changed_task not in done:
+                    shards_changed_task.cancel()
+                    return
+                self._shards_changed_event.clear()
+        finally:
+            for shard in self._shards:
+                if shard.task is not None:
+                    shard.task.cancel()
+
+    # Supervises the connection of the shard: reconnects with backoff and resubscribes after every disconnection
+    async def _connect_to_websocket(self, shard: AlorShard):
+        attempts_count = 0
+        while True:
+            was_populated = False
+            try:
+                await self._ensure_authorization_token()
+                async with websockets.connect(self._websocket_url) as websocket:
+                    self._set_shard_connected(shard)
+                    try:
+                        await self._handler(websocket, shard)
+                    finally:
+                        was_populated = shard.is_populated
+                        self._set_shard_disconnected(shard)
+                sys.stderr.write(f'Alor websocket connection of shard {shard.shard_id} is closed\n')
+            except asyncio.CancelledError:
+                raise
+            except Exception as exception:
+                sys.stderr.write(f'Alor websocket connection of shard {shard.shard_id} failed: {exception!r}\n')
+
+            # Delays start over only after a connection that worked, so that a flapping connection backs off
+            if was_populated:
+                attempts_count = 0
+            await asyncio.sleep(_get_reconnect_delay(attempts_count))
+            attempts_count += 1
+
+    # Requests queued before the connection are dropped, all subscriptions of the shard are sent at once instead
+    def _set_shard_connected(self, shard: AlorShard):
+        while not shard.async_queue.empty():
+            shard.async_queue.get_nowait()
+        for guid in shard.guids:
+            shard.async_queue.put_nowait((_API_METHOD_SUBSCRIBE, guid))
+        shard.set_connected()
+        if not shard.is_populated:
+            shard.repopulation_timer = asyncio.get_running_loop().call_later(
+                _REPOPULATION_TIMEOUT, self._stop_awaiting_data, shard)
+        self._update_ready()
+
+    def _set_shard_disconnected(self, shard: AlorShard):
+        shard.set_disconnected()
+        self._update_ready()
+
+    def _stop_awaiting_data(self, shard: AlorShard):
+        shard.stop_awaiting_data()
+        self._update_ready()
+
+    def _update_ready(self):
+        is_ready = all(shard.is_populated for shard in self._shards)
+        if is_ready != self._is_ready:
+            self._is_ready = is_ready
+            if self._on_ready_changed is not None:
+                self._on_ready_changed(is_ready)
+
+    async def _ensure_authorization_token(self):
+        if self._auth_token is None or time.time() >= self._auth_token_expiration_time - _TOKEN_REFRESH_MARGIN:
+            await self._refresh_authorization_token()
+
+    # Token is requested in a thread, so that the event loop is not blocked. Concurrent refreshes are merged
+    async def _refresh_authorization_token(self):
+        async with self._auth_token_lock:
+            if self._auth_token is not None and \
+                    time.time() < self._auth_token_expiration_time - _TOKEN_REFRESH_MARGIN:
+                return
+            auth_token = await asyncio.get_running_loop().run_in_executor(
+                None, _get_authorization_token, self._client_token, self._refresh_token_url)
+            if auth_token is None:
+                raise Exception('Alor authorization token is not received')
+            self._auth_token = auth_token
+            self._auth_token_expiration_time = _get_token_expiration_time(auth_token)
+
+    # Refreshes the token before it expires, so that reconnections and new subscriptions never wait for it
+    async def _token_refresher_handler(self):
+        while True:
+            delay = _TOKEN_REFRESH_RETRY_INTERVAL
+            if self._auth_token is not None:
+                delay = max(self._auth_token_expiration_time - _TOKEN_REFRESH_MARGIN - time.time(),
+                            _TOKEN_REFRESH_RETRY_INTERVAL)
+            await asyncio.sleep(delay)
+            try:
+                await self._refresh_authorization_token()
+            except Exception as exception:
+                sys.stderr.write(f'Alor authorization token refresh failed: {exception!r}\n')
+
+    async def _consumer(self, message, shard: AlorShard):
+        received_time = time.monotonic()
+        guid_and_data = parse_message(message, self._decode)
+        opcode = _OPCODE_RESPONSE
+        if guid_and_data is not None:
+            guid, data = guid_and_data
+            api_event = self._get_api_event(guid)
+            opcode = api_event.api_method if api_event is not None else _OPCODE_UNKNOWN
+            self._received_messages_count += 1
+            if shard.record_data(guid):
+                self._update_ready()
+            if self._is_conflation_enabled():
+                self._conflate_data(guid, data)
+            else:
+                self._dispatched_messages_count += 1
+                self._handle_data(guid, data)
+        shard.record_message(len(message), received_time)
+        label_values = (opcode,)
+        _received_messages.inc(label_values)
+        _message_handling_seconds.observe(time.monotonic() - received_time, label_values)
+
+    async def _consumer_handler(self, websocket, shard: AlorShard):
+        tick_journal = self._tick_journal
+        async for message in websocket:
+            if tick_journal is not None:
+                tick_journal.append(message, time.time(), shard.shard_id)
+            await self._consumer(message, shard)
+
+    # Keeps only the latest data for the guid until the next drain.
+    # While messages keep coming the reader drains pending data itself once per conflation interval
+    def _conflate_data(self, guid, data):
+        if guid in self._pending_data:
+            self._coalesced_messages_count += 1
+        self._pending_data[guid] = data
+        if time.monotonic() - self._last_drain_time >= self._conflation_interval:
+            self._drain_pending_data()
+        else:
+            self._pending_data_event.set()
+
+    # Gets control only when the reader waits for the next message, i.e. when the loop is idle
+    async def _dispatcher_handler(self):
+        while True:
+            await self._pending_data_event.wait()
+            self._pending_data_event.clear()
+            self._drain_pending_data()
+
+    def _drain_pending_data(self):
+        pending_data, self._pending_data = self._pending_data, {}
+        self._last_drain_time = time.monotonic()
+        for guid, data in pending_data.items():
+            self._dispatched_messages_count += 1
+            self._handle_data(guid, data)
+
+    # Messages are built on sending, so that they always carry the current token.
+    # Queued requests are sent back to back without waiting for responses
+    async def _producer_handler(self, websocket, shard: AlorShard):
+        while True:
+            api_method, guid = await shard.async_queue.get()
+            if api_method == API_METHOD_UNSUBSCRIBE:
+                await websocket.send(self._get_json_to_unsubscribe(guid))
+                continue
+            api_event = self._get_api_event(guid)
+            if api_event is not None:
+                await websocket.send(self._get_json_to_subscribe(api_event.api_method, api_event.ticker, guid,
+                                                                 api_event.wire_format))
+
+    async def _handler(self, websocket, shard: AlorShard):
+        consumer_task = asyncio.create_task(self._consumer_handler(websocket, shard))
+        producer_task = asyncio.create_task(self._producer_handler(websocket, shard))
+        tasks = [consumer_task, producer_task]
+        try:
+            done, pending = await asyncio.wait(
+                tasks,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            for task in tasks:
+                task.cancel()
+        for task in done:
+            task.result()  # errors are reported by the supervisor of the connection
+
+    def _subscribe_to_event(self, api_method: str, ticker: str, callback: callable, wire_format: str):
+        guid = get_guid(api_method, ticker)
+        if wire_format == WIRE_FORMAT_SLIM:
+            event = AlorApiEvent(api_method, ticker, callback, wire_format, _SLIM_QUOTE_FIELD_NAMES,
+                                 _SIMPLE_QUOTE_FIELD_NAMES)
+        else:
+            event = AlorApiEvent(api_method, ticker, callback, wire_format)
         self._add_api_event(guid, event)
-        subscribe_json = self._get_json_to_subscribe(api_method, ticker, guid)
-        self._async_queue.put_nowait(subscribe_json)
+        shard = self._get_shard(guid)
+        shard.add_guid(guid)
+        shard.async_queue.put_nowait((_API_METHOD_SUBSCRIBE, guid))
 
-    def _get_json_to_subscribe(self, api_method: str, ticker: str, guid: str):
+    def _unsubscribe_from_event(self, api_method: str, ticker: str):
+        guid = get_guid(api_method, ticker)
+        if self._api_events.pop(guid, None) is None:
+            return
+        self._pending_data.pop(guid, None)
+        shard = self._get_shard(guid)
+        if shard.remove_guid(guid):
+            self._update_ready()
+        shard.async_queue.put_nowait((API_METHOD_UNSUBSCRIBE, guid))
+
+    def _get_json_to_subscribe(self, api_method: str, ticker: str, guid: str, wire_format: str):
         return json.dumps({
             "opcode": api_method,
             "code": ticker,
             "exchange": _EXCHANGE_MOEX,
+            "format": wire_format,
+            "guid": guid,
+            "token": self._auth_token
+        })
+
+    def _get_json_to_unsubscribe(self, guid: str):
+        return json.dumps({
+            "opcode": API_METHOD_UNSUBSCRIBE,
             "guid": guid,
             "token": self._auth_token
         })
@@ -3,9 +3,24 @@ EVENT_TYPE_INSTRUMENT = 'instrument'
 
 
 class AlorApiEvent:
-    def __init__(self, ticker: str, callback: callable):
+    # field_names - mapping of field names of a compact wire format to the names expected by the callback,
+    # original_field_names - the reverse mapping
+    def __init__(self, api_method: str, ticker: str, callback: callable, wire_format: str, field_names: dict = None,
+                 original_field_names: dict = None):
+        self._api_method = api_method
+        self._wire_format = wire_format
         self._ticker = ticker
         self._callback = callback
+        self._field_names = field_names
+        self._original_field_names = original_field_names
+
+    @property
+    def api_method(self) -> str:
+        return self._api_method
+
+    @property
+    def wire_format(self) -> str:
+        return self._wire_format
 
     @property
     def ticker(self) -> str:
@@ -14,3 +29,11 @@ class AlorApiEvent:
     @property
     def callback(self) -> callable:
         return self._callback
+
+    @property
+    def field_names(self) -> dict:
+        return self._field_names
+
+    @property
+    def original_field_names(self) -> dict:
+        return self._original_field_names
@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+
+# One websocket connection of AlorApi with the subscriptions assigned to it
+class AlorShard:
+    def __init__(self, shard_id: int):
+        self._shard_id = shard_id
+        self._async_queue = asyncio.Queue()  # messages to send
+        self._guids = {}                     # guids of subscriptions, dict is used as an insertion-ordered set
+        self._task = None
+        self._is_connected = False
+        self._awaiting_guids = set()         # resubscribed guids without data since the connection
+        self._repopulation_timer = None
+        self._disconnection_time = None      # time.monotonic()
+        self._connections_count = 0
+        self._last_recovery_time = None      # seconds from disconnection to data of all guids
+        self._received_messages_count = 0
+        self._received_chars_count = 0
+        self._handling_time = 0              # seconds, time spent on decoding and dispatching of messages
+        self._max_handling_time = 0          # seconds
+        self._last_message_time = None       # time.monotonic()
+
+    @property
+    def shard_id(self) -> int:
+        return self._shard_id
+
+    @property
+    def async_queue(self) -> asyncio.Queue:
+        return self._async_queue
+
+    @property
+    def guids(self) -> dict:
+        return self._guids
+
+    @property
+    def task(self) -> asyncio.Task:
+        return self._task
+
+    @task.setter
+    def task(self, task: asyncio.Task):
+        self._task = task
+
+    @property
+    def is_connected(self) -> bool:
+        return self._is_connected
+
+    # Connected and data of all subscriptions has been received since the connection
+    @property
+    def is_populated(self) -> bool:
+        return self._is_connected and not self._awaiting_guids
+
+    @property
+    def repopulation_timer(self) -> asyncio.TimerHandle:
+        return self._repopulation_timer
+
+    @repopulation_timer.setter
+    def repopulation_timer(self, repopulation_timer: asyncio.TimerHandle):
+        self._repopulation_timer = repopulation_timer
+
+    def set_connected(self):
+        self._is_connected = True
+        self._connections_count += 1
+        self._awaiting_guids = set(self._guids)
+        if not self._awaiting_guids:
+            self._record_recovery()
+
+    def set_disconnected(self):
+        if self._is_connected:
+            self._disconnection_time = time.monotonic()
+        self._is_connected = False
+        self._awaiting_guids = set()
+        if self._repopulation_timer is not None:
+            self._repopulation_timer.cancel()
+            self._repopulation_timer = None
+
+    def add_guid(self, guid: str):
+        self._guids[guid] = None
+
+    # Returns True if the guid was the last one awaited
+    def remove_guid(self, guid: str) -> bool:
+        del self._guids[guid]
+        return self.record_data(guid)
+
+    # Returns True if it was the last awaited data
+    def record_data(self, guid: str) -> bool:
+        if not self._awaiting_guids or guid not in self._awaiting_guids:
+            return False
+        self._awaiting_guids.discard(guid)
+        if self._awaiting_guids:
+            return False
+        self._record_recovery()
+        return True
+
+    # Stops waiting for data, e.g. of instruments that are not traded and get no updates
+    def stop_awaiting_data(self):
+        if self._awaiting_guids:
+            self._awaiting_guids = set()
+            self._record_recovery()
+
+    def _record_recovery(self):
+        if self._repopulation_timer is not None:
+            self._repopulation_timer.cancel()
+            self._repopulation_timer = None
+        if self._disconnection_time is not None:
+            self._last_recovery_time = time.monotonic() - self._disconnection_time
+            self._disconnection_time = None
+
+    # received_time - time.monotonic() when the message was received
+    def record_message(self, message_length: int, received_time: float):
+        handling_time = time.monotonic() - received_time
+        self._received_messages_count += 1
+        self._received_chars_count += message_length
+        self._handling_time += handling_time
+        self._max_handling_time = max(self._max_handling_time, handling_time)
+        self._last_message_time = received_time
+
+    # Throughput and lag are derived from the counters by the reader of stats as rates between two readings,
+    # e.g. handling_time growing as fast as the wall clock means that the shard connection cannot keep up
+    def get_stats(self) -> dict:
+        last_message_age = None
+        if self._last_message_time is not None:
+            last_message_age = time.monotonic() - self._last_message_time
+        return {
+            'shard_id': self._shard_id,
+            'is_connected': self._is_connected,
+            'is_populated': self.is_populated,
+            'awaiting_subscriptions_count': len(self._awaiting_guids),
+            'reconnections_count': max(self._connections_count - 1, 0),
+            'last_recovery_time': self._last_recovery_time,
+            'subscriptions_count': len(self._guids),
+            'queued_requests_count': self._async_queue.qsize(),
+            'received_messages_count': self._received_messages_count,
+            'received_chars_count': self._received_chars_count,
+            'handling_time': self._handling_time,
+            'max_handling_time': self._max_handling_time,
+            'last_message_age': last_message_age,
+        }
@@ -1,12 +1,49 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from infrastructure import json_decoder
+
+_CONNECT_TIMEOUT = 5  # seconds
+_READ_TIMEOUT = 30    # seconds
+_RETRIES_COUNT = 3
+_RETRY_BACKOFF_FACTOR = 0.5  # delays between retries are 0.5, 1, 2... seconds
+_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+_POOL_SIZE = 16
+
+
+# One session for all requests, so that connections (and TLS sessions) to the same host are kept alive and reused.
+# Session is shared between threads, connection pool of requests is thread-safe
+def _create_session() -> requests.Session:
+    retry = Retry(
+        total=_RETRIES_COUNT,
+        backoff_factor=_RETRY_BACKOFF_FACTOR,
+        status_forcelist=_RETRY_STATUS_CODES,
+        allowed_methods=None,  # POST is retried as well, requests of this app are idempotent
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=_POOL_SIZE, pool_maxsize=_POOL_SIZE, max_retries=retry)
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_session = _create_session()
 
 
 def get_object_from_json_endpoint(url, method='GET', params={}):
-    response = requests.request(method, url, params=params)
+    response = get_response(url, method, params)
 
     response_data = None
     if response.status_code == 200:
-        response_data = response.json()
+        response_data = json_decoder.decode(response.content)
     else:
         raise Exception(f"Error: {response.status_code}")
     return response_data
+
+
+# Raw response, e.g. to make conditional requests and read validators from headers
+def get_response(url, method='GET', params={}, headers=None) -> requests.Response:
+    return _session.request(method, url, params=params, headers=headers, timeout=(_CONNECT_TIMEOUT, _READ_TIMEOUT))
+
@@ -16,6 +16,44 @@ def get_env_or_exit(var_name):
     return value
 
 
+def get_str(var_name, default) -> str:
+    value = _get_env(var_name)
+    return default if value is None else value
+
+
+def get_float(var_name, default) -> float:
+    value = _get_env(var_name)
+
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        _print_error_message_and_exit(f'{var_name} environment variable must be a number.')
+
+
+def get_int(var_name, default) -> int:
+    value = _get_env(var_name)
+
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        _print_error_message_and_exit(f'{var_name} environment variable must be an integer.')
+
+
+def get_choice(var_name, choices, default):
+    value = _get_env(var_name)
+
+    if value is None:
+        return default
+    if value not in choices:
+        _print_error_message_and_exit(f'{var_name} environment variable must be one of: {", ".join(choices)}.')
+
+    return value
+
+
 def _get_env(var_name):
     return os.environ.get(var_name)
 
@@ -0,0 +1,130 @@
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from infrastructure import json_decoder
+from infrastructure.api_utils import get_response
+
+_ENTRY_FILE_EXTENSION = '.json.gz'
+_HTTP_STATUS_OK = 200
+_HTTP_STATUS_NOT_MODIFIED = 304
+
+
+# On-disk cache of ISS responses, an entry per endpoint and params in a gzip-compressed JSON file.
+# Entries expire on the datetime returned by get_expiration_datetime for the storing moment (naive UTC),
+# e.g. on the start of the next trading day. Fresh entries are returned right away and, optionally,
+# revalidated in the background. Background revalidation only rewrites the entry on disk: data already returned
+# to the running app is not updated, changed data is picked up at the next start.
+# Expired entries are revalidated before returning, with ETag / Last-Modified if the server sent them.
+# The directory must outlive the container to save requests on redeploys, see the iss_cache volume of docker-compose.yml
+class IssCache:
+    def __init__(self, directory: str, get_expiration_datetime: callable, revalidate_in_background: bool = True):
+        self._directory = directory
+        self._get_expiration_datetime = get_expiration_datetime
+        self._revalidate_in_background = revalidate_in_background
+        self._background_executor = None
+        self._lock = threading.Lock()
+        self._hits_count = 0
+        self._misses_count = 0
+        self._not_modified_count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def get_stats(self) -> dict:
+        return {
+            'hits_count': self._hits_count,
+            'misses_count': self._misses_count,
+            'not_modified_count': self._not_modified_count,
+        }
+
+    def get_object(self, url: str, params: dict = None):
+        params = params or {}
+        path = self._get_entry_path(url, params)
+        entry = _read_entry(path)
+        if entry is not None and datetime.utcnow() < datetime.fromisoformat(entry['expires_at']):
+            with self._lock:
+                self._hits_count += 1
+            if self._revalidate_in_background:
+                self._submit_background_revalidation(url, params, path, entry)
+            return entry['data']
+
+        with self._lock:
+            self._misses_count += 1
+        return self._revalidate(url, params, path, entry)['data']
+
+    # Waits until background revalidations are finished
+    def wait_for_background_revalidations(self):
+        with self._lock:
+            background_executor, self._background_executor = self._background_executor, None
+        if background_executor is not None:
+            background_executor.shutdown(wait=True)
+
+    def _revalidate(self, url: str, params: dict, path: str, entry) -> dict:
+        headers = {}
+        if entry is not None and entry['etag'] is not None:
+            headers['If-None-Match'] = entry['etag']
+        if entry is not None and entry['last_modified'] is not None:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = get_response(url, params=params, headers=headers)
+        now = datetime.utcnow()
+        if response.status_code == _HTTP_STATUS_NOT_MODIFIED and entry is not None:
+            with self._lock:
+                self._not_modified_count += 1
+            entry = dict(entry, stored_at=now.isoformat(), expires_at=self._get_expiration_datetime(now).isoformat())
+        elif response.status_code == _HTTP_STATUS_OK:
+            entry = {
+                'url': url,
+                'params': params,
+                'stored_at': now.isoformat(),
+                'expires_at': self._get_expiration_datetime(now).isoformat(),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'data': json_decoder.decode(response.content),
+            }
+        else:
+            raise Exception(f"Error: {response.status_code}")
+
+        _write_entry(path, entry)
+        return entry
+
+    def _submit_background_revalidation(self, url: str, params: dict, path: str, entry: dict):
+        with self._lock:
+            if self._background_executor is None:
+                self._background_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='iss_cache')
+            self._background_executor.submit(self._revalidate_quietly, url, params, path, entry)
+
+    # Stale data is still good until the next restart, so errors are only reported.
+    # The running app keeps the data it got, the revalidated entry is read at the next start
+    def _revalidate_quietly(self, url: str, params: dict, path: str, entry: dict):
+        try:
+            self._revalidate(url, params, path, entry)
+        except Exception as exception:
+            sys.stderr.write(f'ISS cache revalidation of {url} failed: {exception!r}\n')
+
+    def _get_entry_path(self, url: str, params: dict) -> str:
+        key = json.dumps([url, sorted(params.items())])
+        return os.path.join(self._directory, hashlib.sha256(key.encode()).hexdigest() + _ENTRY_FILE_EXTENSION)
+
+
+def _read_entry(path: str):
+    try:
+        with gzip.open(path, 'rb') as entry_file:
+            return json_decoder.decode(entry_file.read())
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exception:
+        sys.stderr.write(f'ISS cache entry {path} is broken and ignored: {exception!r}\n')
+        return None
+
+
+# Entry is written to a temporary file first, so that readers never see a partially written entry
+def _write_entry(path: str, entry: dict):
+    temporary_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with gzip.open(temporary_path, 'wt', encoding='utf-8', compresslevel=6) as entry_file:
+        json.dump(entry, entry_file, ensure_ascii=False, separators=(',', ':'))
+    os.replace(temporary_path, path)
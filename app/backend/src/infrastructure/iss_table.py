@@ -0,0 +1,35 @@
+# Block of an ISS response ({'columns': [...], 'data': [[...], ...]}) kept as is, without a dict per row.
+# Values are taken by column, dict-shaped rows are built only when asked for
+class IssTable:
+    __slots__ = ('_columns', '_data', '_column_indexes')
+
+    def __init__(self, columns: list, data: list):
+        self._columns = columns
+        self._data = data
+        self._column_indexes = {name: i for i, name in enumerate(columns)}
+
+    @staticmethod
+    def from_moex_data_structure(moex_data_structure: dict) -> 'IssTable':
+        if 'columns' not in moex_data_structure or 'data' not in moex_data_structure:
+            return IssTable([], [])
+        return IssTable(moex_data_structure['columns'], moex_data_structure['data'])
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def columns(self) -> list:
+        return self._columns
+
+    # Rows as lists of values in the order of columns
+    @property
+    def rows(self) -> list:
+        return self._data
+
+    def column(self, name: str) -> list:
+        i = self._column_indexes[name]
+        return [row[i] for row in self._data]
+
+    def to_dicts(self) -> list:
+        columns = self._columns
+        return [dict(zip(columns, row)) for row in self._data]
@@ -0,0 +1,33 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard decoder gives the same result, only slower
+    orjson = None
+
+# Standard library decoder
+DECODER_JSON = 'json'
+# orjson, several times faster on ISS and Alor payloads
+DECODER_ORJSON = 'orjson'
+DECODERS = (DECODER_JSON, DECODER_ORJSON)
+DEFAULT_DECODER = DECODER_JSON if orjson is None else DECODER_ORJSON
+
+
+# Function to decode str or bytes with JSON into Python objects
+def get_decode_function(decoder: str) -> callable:
+    if decoder == DECODER_JSON:
+        return json.loads
+    if decoder == DECODER_ORJSON:
+        if orjson is None:
+            raise ValueError('orjson JSON decoder is not installed')
+        return orjson.loads
+    raise ValueError(f'Unknown JSON decoder: {decoder}')
+
+
+# Decodes ISS responses and cache entries, see set_decoder
+decode = get_decode_function(DEFAULT_DECODER)
+
+
+def set_decoder(decoder: str):
+    global decode
+    decode = get_decode_function(decoder)
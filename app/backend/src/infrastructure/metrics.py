@@ -0,0 +1,166 @@
+import abc
+import asyncio
+import bisect
+
+import numpy as np
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds, from a tenth of a millisecond to seconds
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+# Metrics are updated on the event loop thread and rendered on any thread. Updates take no locks:
+# a scrape may see a histogram with its count updated and its sum not yet, which Prometheus tolerates.
+# Values are kept per tuple of label values
+class _Metric(abc.ABC):
+    def __init__(self, name: str, help_text: str, metric_type: str, label_names: tuple):
+        self._name = name
+        self._help_text = help_text
+        self._metric_type = metric_type
+        self._label_names = label_names
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def render(self) -> list:
+        lines = [f'# HELP {self._name} {self._help_text}', f'# TYPE {self._name} {self._metric_type}']
+        lines.extend(self._render_samples())
+        return lines
+
+    @abc.abstractmethod
+    def _render_samples(self) -> list:
+        pass
+
+    def _format_labels(self, label_values: tuple, extra_labels: str = None) -> str:
+        labels = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(self._label_names, label_values)]
+        if extra_labels is not None:
+            labels.append(extra_labels)
+        return '{' + ','.join(labels) + '}' if labels else ''
+
+
+class Counter(_Metric):
+    def __init__(self, name: str, help_text: str, label_names: tuple = ()):
+        super().__init__(name, help_text, 'counter', label_names)
+        self._values = {}
+
+    def inc(self, label_values: tuple = (), amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def _render_samples(self) -> list:
+        return [f'{self._name}{self._format_labels(label_values)} {_format_value(value)}'
+                for label_values, value in list(self._values.items())]
+
+
+class Gauge(_Metric):
+    # get_values - returns {label values: value} on every scrape, otherwise the gauge is set
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), get_values: callable = None):
+        super().__init__(name, help_text, 'gauge', label_names)
+        self._values = {}
+        self._get_values = get_values
+
+    def set(self, value: float, label_values: tuple = ()):
+        self._values[label_values] = value
+
+    def _render_samples(self) -> list:
+        values = self._get_values() if self._get_values is not None else self._values
+        return [f'{self._name}{self._format_labels(label_values)} {_format_value(value)}'
+                for label_values, value in list(values.items())]
+
+
+# Counts of observations per bucket, the cumulative counts of the exposition format are computed on scrape
+class Histogram(_Metric):
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS, label_names: tuple = ()):
+        super().__init__(name, help_text, 'histogram', label_names)
+        self._buckets = tuple(buckets)
+        self._bucket_bounds = np.array(buckets, dtype=float)
+        self._values = {}  # label values -> [bucket counts (the last one is +Inf), sum]
+
+    def observe(self, value: float, label_values: tuple = ()):
+        values = self._values.get(label_values)
+        if values is None:
+            values = self._values[label_values] = [[0] * (len(self._buckets) + 1), 0]
+        values[0][bisect.bisect_left(self._buckets, value)] += 1
+        values[1] += value
+
+    # Observes all values of the array at once
+    def observe_array(self, array: np.ndarray, label_values: tuple = ()):
+        if array.size == 0:
+            return
+        values = self._values.get(label_values)
+        if values is None:
+            values = self._values[label_values] = [[0] * (len(self._buckets) + 1), 0]
+        bucket_counts = np.bincount(np.searchsorted(self._bucket_bounds, array, side='left'),
+                                    minlength=len(self._buckets) + 1)
+        for i, count in enumerate(bucket_counts.tolist()):
+            values[0][i] += count
+        values[1] += float(array.sum())
+
+    def _render_samples(self) -> list:
+        samples = []
+        for label_values, (bucket_counts, total) in list(self._values.items()):
+            cumulative_count = 0
+            for bound, count in zip(self._buckets + (float('inf'),), list(bucket_counts)):
+                cumulative_count += count
+                le = f'le="{_format_value(bound)}"'
+                samples.append(f'{self._name}_bucket{self._format_labels(label_values, le)} {cumulative_count}')
+            samples.append(f'{self._name}_sum{self._format_labels(label_values)} {_format_value(total)}')
+            samples.append(f'{self._name}_count{self._format_labels(label_values)} {cumulative_count}')
+        return samples
+
+
+# Metrics of the process. A metric registered again with the same name replaces the previous one,
+# e.g. gauges reading a recreated object
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: tuple = ()) -> Counter:
+        return self.register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: tuple = (), get_values: callable = None) -> Gauge:
+        return self.register(Gauge(name, help_text, label_names, get_values))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS,
+                  label_names: tuple = ()) -> Histogram:
+        return self.register(Histogram(name, help_text, buckets, label_names))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+_event_loop_lag = REGISTRY.histogram('event_loop_lag_seconds',
+                                     'Delay of a timer callback of the event loop behind its scheduled time')
+_last_event_loop_lag = REGISTRY.gauge('event_loop_last_lag_seconds', 'Last measured event loop lag')
+
+
+# Sleeps for the interval and measures how late the loop wakes up, i.e. how long callbacks wait to run
+async def monitor_event_loop_lag(interval: float):
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled_time = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - scheduled_time, 0.)
+        _event_loop_lag.observe(lag)
+        _last_event_loop_lag.set(lag)
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
@@ -1,6 +1,8 @@
-from urllib.parse import urlunparse
+from urllib.parse import urlunparse, urlparse
 from string import Template
 from infrastructure.api_utils import get_object_from_json_endpoint
+from infrastructure.iss_cache import IssCache
+from infrastructure.iss_table import IssTable
 from model import option_type
 
 _SCHEME_HTTPS = 'https'
@@ -12,65 +14,85 @@ _OPTION_SERIES_URL = '/iss/statistics/engines/futures/markets/options/series.jso
 _OPTION_BOARD_URL_TEMPLATE = Template('/iss/statistics/engines/futures/markets/options/assets/$ticker/optionboard.json')
 _FUTURES_SERIES_URL = Template('/iss/statistics/engines/futures/markets/forts/series.json')
 
+# ISS sends only the requested blocks and columns, so that less data is transferred, decoded and cached
+_NO_METADATA_PARAMS = {'iss.meta': 'off'}
+_SECURITY_DESCRIPTION_PARAMS = {**_NO_METADATA_PARAMS, 'iss.only': 'description', 'description.columns': 'name,value'}
+_OPTION_EXPIRATIONS_PARAMS = {**_NO_METADATA_PARAMS, 'iss.only': 'expirations',
+                              'expirations.columns': 'expiration_date,series_type'}
+_OPTION_BOARD_COLUMNS = 'SECID,STRIKE'
+_OPTION_BOARD_PARAMS = {**_NO_METADATA_PARAMS, 'iss.only': 'call,put',
+                        'call.columns': _OPTION_BOARD_COLUMNS, 'put.columns': _OPTION_BOARD_COLUMNS}
+
+DEFAULT_API_URL = urlunparse((_SCHEME_HTTPS, _API_HOST, '', '', '', ''))
+_api_url = urlparse(DEFAULT_API_URL)
+_cache = None
+
+
+# Points requests to another ISS server, e.g. a local stub
+def set_api_url(api_url: str):
+    global _api_url
+    _api_url = urlparse(api_url)
+
+
+# Reference data is taken from the cache if it is set, see IssCache
+def set_cache(cache: IssCache):
+    global _cache
+    _cache = cache
+
+
+def _get_object(url: str, params: dict = None):
+    if _cache is not None:
+        return _cache.get_object(url, params)
+    return get_object_from_json_endpoint(url, params=params or {})
+
 
 def _make_absolute_url(relative_url: str) -> str:
     params = ''
     query = ''
     fragment = ''
-    return urlunparse((_SCHEME_HTTPS, _API_HOST, relative_url, params, query, fragment))
+    return urlunparse((_api_url.scheme, _api_url.netloc, _api_url.path.rstrip('/') + relative_url, params, query,
+                       fragment))
 
 
 def get_security_description(ticker: str):
     url = _make_absolute_url(_SECURITY_DESCRIPTION_URL_TEMPLATE.substitute(ticker=ticker))
-    response = get_object_from_json_endpoint(url)
+    response = _get_object(url, params=_SECURITY_DESCRIPTION_PARAMS)
     return _convert_moex_data_structure_to_list_of_dicts(response['description'])
 
 # Фьючерсные серии по базовому активу (напр. RTS)
 def get_futures_series(asset_code: str):
     url = _make_absolute_url(_FUTURES_SERIES_URL.substitute(ticker=asset_code))
-    response = get_object_from_json_endpoint(url, params={'asset_code': asset_code})
+    response = _get_object(url, params={'asset_code': asset_code})
     return _convert_moex_data_structure_to_list_of_dicts(response['series'])
 
 
 def get_option_series(asset_code: str):
     url = _make_absolute_url(_OPTION_SERIES_URL)
-    response = get_object_from_json_endpoint(url, params={'asset_code': asset_code})
+    response = _get_object(url, params={'asset_code': asset_code})
     return _convert_moex_data_structure_to_list_of_dicts(response['series'])
 
 
 def get_option_expirations(base_asset_ticker: str):
     url = _make_absolute_url(_OPTION_EXPIRATIONS_URL.substitute(ticker=base_asset_ticker))
-    response = get_object_from_json_endpoint(url)
+    response = _get_object(url, params=_OPTION_EXPIRATIONS_PARAMS)
     return _convert_moex_data_structure_to_list_of_dicts(response['expirations'])
 
 
+# Calls and puts of the expiration as tables with SECID and STRIKE columns
 def get_option_board(ticker: str, expiration_date: str):
     url = _make_absolute_url(_OPTION_BOARD_URL_TEMPLATE.substitute(ticker=ticker))
-    response = get_object_from_json_endpoint(url, params={'expiration_date': expiration_date})
+    response = _get_object(url, params={**_OPTION_BOARD_PARAMS, 'expiration_date': expiration_date})
     return {
-        option_type.CALL: _convert_moex_data_structure_to_list_of_dicts(response['call']),
-        option_type.PUT: _convert_moex_data_structure_to_list_of_dicts(response['put']),
+        option_type.CALL: IssTable.from_moex_data_structure(response['call']),
+        option_type.PUT: IssTable.from_moex_data_structure(response['put']),
     }
 
 
 def get_option_list_by_series(option_series_ticker: str):
     url = _make_absolute_url(_OPTIONS_LIST_URL_TEMPLATE.substitute(ticker=option_series_ticker))
-    response = get_object_from_json_endpoint(url)
+    response = _get_object(url)
     return _convert_moex_data_structure_to_list_of_dicts(response['securities'])
 
 
 def _convert_moex_data_structure_to_list_of_dicts(moex_data_structure):
-    list_of_dicts = []
-    if 'columns' not in moex_data_structure or 'data' not in moex_data_structure:
-        return list_of_dicts
-
-    columns = moex_data_structure['columns']
-    data = moex_data_structure['data']
-    for row in data:
-        row_dict = {}
-        for i in range(len(columns)):
-            key = columns[i]
-            value = row[i]
-            row_dict[key] = value
-        list_of_dicts.append(row_dict)
-    return list_of_dicts
+    return IssTable.from_moex_data_structure(moex_data_structure).to_dicts()
@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+# Samples of stacks without a tagged frame
+TAG_OTHER = 'other'
+
+_MAX_DURATION = 300  # seconds
+# Shorter intervals would make the profiler thread take the GIL from the profiled threads most of the time
+_MIN_INTERVAL = 0.001  # seconds
+_OUTPUT_FILE_SUFFIX = '.folded'
+
+
+# Wall clock sampling profiler of all threads of the process, started and stopped at runtime.
+# While running, a background thread takes the stacks of the other threads by sys._current_frames() every interval
+# and counts equal stacks, so nothing is added to the profiled code and there is no overhead at all when stopped.
+# A sample is tagged by the outermost frame of a function registered with add_tag, e.g. an event handler.
+# The result is in the folded stacks format read by flamegraph.pl, inferno and speedscope,
+# one line per stack: "tag;thread;outermost frame;...;innermost frame count"
+class SamplingProfiler:
+    # output_directory - where results are written when the profiling window ends, kept in memory only if None
+    def __init__(self, output_directory: str = None, duration: float = 30, interval: float = 0.01):
+        self._output_directory = output_directory
+        self._duration = duration
+        self._interval = interval
+        self._tags = {}  # code object -> tag
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._started_at = None
+        self._samples_count = 0
+        self._last_result = None
+        self._last_output_path = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None
+
+    def get_status(self) -> dict:
+        return {
+            'is_running': self.is_running,
+            'started_at': self._started_at,
+            'samples_count': self._samples_count,
+            'last_output_path': self._last_output_path,
+        }
+
+    # Folded stacks of the last finished profiling window
+    def get_last_result(self) -> str:
+        return self._last_result
+
+    # Functions or methods, samples with their frames on the stack get the tag
+    def add_tag(self, tag: str, functions):
+        for function in functions:
+            function = getattr(function, '__func__', function)
+            self._tags[function.__code__] = tag
+
+    # Returns False if profiling is running already. Duration is limited to _MAX_DURATION, interval to _MIN_INTERVAL
+    def start(self, duration: float = None, interval: float = None) -> bool:
+        with self._lock:
+            if self._thread is not None:
+                return False
+            duration = min(duration or self._duration, _MAX_DURATION)
+            interval = max(interval or self._interval, _MIN_INTERVAL)
+            self._stop_event.clear()
+            self._started_at = time.time()
+            self._samples_count = 0
+            self._thread = threading.Thread(target=self._run, args=(duration, interval), name='sampling_profiler',
+                                            daemon=True)
+            self._thread.start()
+            return True
+
+    # The result is ready when the profiler thread finishes, see get_last_result
+    def stop(self):
+        self._stop_event.set()
+
+    def toggle(self):
+        if self.is_running:
+            self.stop()
+        else:
+            self.start()
+
+    def _run(self, duration: float, interval: float):
+        stack_counts = {}  # (thread name, code objects from the outermost) -> samples count
+        own_thread_id = threading.get_ident()
+        deadline = time.monotonic() + duration
+        try:
+            while not self._stop_event.wait(interval) and time.monotonic() < deadline:
+                thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread_id:
+                        continue
+                    codes = []
+                    while frame is not None:
+                        codes.append(frame.f_code)
+                        frame = frame.f_back
+                    codes.reverse()
+                    key = (thread_names.get(thread_id, str(thread_id)), tuple(codes))
+                    stack_counts[key] = stack_counts.get(key, 0) + 1
+                self._samples_count += 1
+            self._last_result = self._format_result(stack_counts)
+            if self._output_directory:
+                self._last_output_path = self._write_result(self._last_result)
+        finally:
+            with self._lock:
+                self._thread = None
+
+    def _format_result(self, stack_counts: dict) -> str:
+        folded_stack_counts = {}
+        for (thread_name, codes), count in stack_counts.items():
+            tag = next((self._tags[code] for code in codes if code in self._tags), TAG_OTHER)
+            folded_stack = ';'.join([tag, thread_name] + [_format_frame(code) for code in codes])
+            folded_stack_counts[folded_stack] = folded_stack_counts.get(folded_stack, 0) + count
+        return ''.join(f'{folded_stack} {count}\n' for folded_stack, count in sorted(folded_stack_counts.items()))
+
+    def _write_result(self, result: str) -> str:
+        os.makedirs(self._output_directory, exist_ok=True)
+        file_name = datetime.fromtimestamp(self._started_at).strftime('profile-%Y%m%d-%H%M%S') + _OUTPUT_FILE_SUFFIX
+        path = os.path.join(self._output_directory, file_name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(result)
+        return path
+
+
+# Semicolons separate frames of the folded format, so they must not appear in a frame
+def _format_frame(code) -> str:
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f'{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'.replace(';', ':')
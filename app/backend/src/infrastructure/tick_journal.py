@@ -0,0 +1,183 @@
+import collections
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from datetime import datetime, timezone
+
+# Segment: file header, then records one after another. The rest of a segment is zero-filled,
+# a record with zero length marks the end of data. Record: length of the message, receive time (Unix time),
+# shard id, then the message as is (UTF-8)
+_SEGMENT_HEADER = b'TICKJRN1'
+_RECORD_HEADER = struct.Struct('<IdH')
+_RECORD_LENGTH = struct.Struct('<I')
+_RECORD_HEADER_TAIL = struct.Struct('<dH')  # the record header after the length
+_SEGMENT_FILE_EXTENSION = '.tj'
+_SEGMENT_FILE_NAME_PATTERN = re.compile(r'^(\d{8})-(\d{6})\.tj$')
+
+_DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024  # bytes
+_DEFAULT_FLUSH_INTERVAL = 0.2             # seconds
+_DEFAULT_MAX_PENDING_MESSAGES_COUNT = 1000000
+
+
+# Append-only journal of raw messages in segment files of fixed size, a segment per size limit and UTC day.
+# append() only puts the message to a queue, messages are encoded and written by a background thread
+# in batches through a memory map of the current segment, so that the caller never waits for the disk.
+# If the writer cannot keep up, messages above max_pending_messages_count are dropped and counted
+class TickJournal:
+    def __init__(self, directory: str, segment_size: int = _DEFAULT_SEGMENT_SIZE,
+                 flush_interval: float = _DEFAULT_FLUSH_INTERVAL,
+                 max_pending_messages_count: int = _DEFAULT_MAX_PENDING_MESSAGES_COUNT):
+        self._directory = directory
+        self._segment_size = segment_size
+        self._flush_interval = flush_interval
+        self._max_pending_messages_count = max_pending_messages_count
+        self._pending_messages = collections.deque()
+        self._flush_event = threading.Event()
+        self._is_closed = False
+        self._segment_file = None
+        self._segment_map = None
+        self._segment_date = None
+        self._segment_offset = 0
+        self._current_segment_size = 0  # may be above segment_size for a large message
+        self._segments_count = 0
+        self._written_messages_count = 0
+        self._written_bytes_count = 0
+        self._dropped_messages_count = 0
+        os.makedirs(directory, exist_ok=True)
+        self._writer_thread = threading.Thread(target=self._write_pending_messages_in_loop, name='tick_journal',
+                                               daemon=True)
+        self._writer_thread.start()
+
+    def get_stats(self) -> dict:
+        return {
+            'pending_messages_count': len(self._pending_messages),
+            'written_messages_count': self._written_messages_count,
+            'written_bytes_count': self._written_bytes_count,
+            'dropped_messages_count': self._dropped_messages_count,
+            'segments_count': self._segments_count,
+        }
+
+    # received_time - Unix time
+    def append(self, message, received_time: float, shard_id: int = 0):
+        if len(self._pending_messages) >= self._max_pending_messages_count:
+            self._dropped_messages_count += 1
+            return
+        self._pending_messages.append((message, received_time, shard_id))
+
+    # Writes pending messages and truncates the current segment to its data
+    def close(self):
+        if self._is_closed:
+            return
+        self._is_closed = True
+        self._flush_event.set()
+        self._writer_thread.join()
+        self._close_segment()
+
+    def _write_pending_messages_in_loop(self):
+        while not self._is_closed:
+            self._flush_event.wait(self._flush_interval)
+            try:
+                self._write_pending_messages()
+            except Exception as exception:
+                sys.stderr.write(f'Tick journal write failed: {exception!r}\n')
+        self._write_pending_messages()
+
+    def _write_pending_messages(self):
+        pending_messages = self._pending_messages
+        while pending_messages:
+            message, received_time, shard_id = pending_messages.popleft()
+            if isinstance(message, str):
+                message = message.encode()
+            if not message:  # zero length is the end marker
+                continue
+            self._write_record(message, received_time, shard_id)
+
+    def _write_record(self, message: bytes, received_time: float, shard_id: int):
+        record_size = _RECORD_HEADER.size + len(message)
+        record_date = datetime.fromtimestamp(received_time, timezone.utc).date()
+        if self._segment_map is None or record_date != self._segment_date or \
+                self._segment_offset + record_size > self._current_segment_size:
+            self._open_segment(record_date, record_size)
+
+        # The length is written last, so that a reader of the live segment never sees a record before its data:
+        # the zero length of the free space ends reading until then. It is copied at once, not byte by byte
+        segment_map, offset = self._segment_map, self._segment_offset
+        data_offset = offset + _RECORD_HEADER.size
+        segment_map[data_offset:data_offset + len(message)] = message
+        _RECORD_HEADER_TAIL.pack_into(segment_map, offset + _RECORD_LENGTH.size, received_time, shard_id)
+        segment_map[offset:offset + _RECORD_LENGTH.size] = _RECORD_LENGTH.pack(len(message))
+        self._segment_offset += record_size
+        self._written_messages_count += 1
+        self._written_bytes_count += record_size
+
+    # A message larger than the segment size gets a segment of its own size
+    def _open_segment(self, segment_date, record_size: int):
+        self._close_segment()
+        segment_size = max(self._segment_size, len(_SEGMENT_HEADER) + record_size + _RECORD_HEADER.size)
+        path = os.path.join(self._directory, self._get_next_segment_file_name(segment_date))
+        self._segment_file = open(path, 'x+b')
+        self._segment_file.truncate(segment_size)
+        self._segment_map = mmap.mmap(self._segment_file.fileno(), segment_size)
+        self._segment_map[:len(_SEGMENT_HEADER)] = _SEGMENT_HEADER
+        self._segment_date = segment_date
+        self._segment_offset = len(_SEGMENT_HEADER)
+        self._current_segment_size = segment_size
+        self._segments_count += 1
+
+    def _close_segment(self):
+        if self._segment_map is None:
+            return
+        self._segment_map.flush()
+        self._segment_map.close()
+        # The end marker is kept, so that the segment can be read the same way before and after closing
+        self._segment_file.truncate(min(self._segment_offset + _RECORD_HEADER.size, self._current_segment_size))
+        self._segment_file.close()
+        self._segment_map = None
+        self._segment_file = None
+
+    # Segments are never appended to after a restart, a new one is started
+    def _get_next_segment_file_name(self, segment_date) -> str:
+        date_string = segment_date.strftime('%Y%m%d')
+        sequence_numbers = [int(match.group(2)) for match in map(_SEGMENT_FILE_NAME_PATTERN.match,
+                                                                 os.listdir(self._directory))
+                            if match is not None and match.group(1) == date_string]
+        return f'{date_string}-{max(sequence_numbers, default=0) + 1:06d}{_SEGMENT_FILE_EXTENSION}'
+
+
+# Paths of segments of the journal in the order of writing
+def get_segment_paths(directory: str) -> list:
+    file_names = sorted(file_name for file_name in os.listdir(directory)
+                        if _SEGMENT_FILE_NAME_PATTERN.match(file_name) is not None)
+    return [os.path.join(directory, file_name) for file_name in file_names]
+
+
+# Yields (received_time, shard_id, message bytes) of all records of the journal in the order of writing.
+# Segment being written may be read as well, reading stops on its end marker
+def read_journal(directory: str, from_time: float = None):
+    for path in get_segment_paths(directory):
+        yield from _read_segment(path, from_time)
+
+
+def _read_segment(path: str, from_time: float):
+    with open(path, 'rb') as segment_file:
+        segment_size = os.fstat(segment_file.fileno()).st_size
+        if segment_size <= len(_SEGMENT_HEADER):
+            return
+        with mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as segment_map:
+            if segment_map[:len(_SEGMENT_HEADER)] != _SEGMENT_HEADER:
+                raise ValueError(f'{path} is not a tick journal segment')
+            offset = len(_SEGMENT_HEADER)
+            unpack_from = _RECORD_HEADER.unpack_from
+            record_header_size = _RECORD_HEADER.size
+            while offset + record_header_size <= segment_size:
+                message_length, received_time, shard_id = unpack_from(segment_map, offset)
+                data_offset = offset + record_header_size
+                # A record past the end is not written completely, e.g. the segment is truncated by a crash
+                if message_length == 0 or data_offset + message_length > segment_size:
+                    break
+                offset = data_offset + message_length
+                if from_time is None or received_time >= from_time:
+                    yield received_time, shard_id, segment_map[data_offset:offset]
@@ -4,6 +4,7 @@ from model.base_asset import BaseAsset
 class BaseAssetRepository:
     def __init__(self):
         self._base_assets_list = []
+        self._base_assets_by_ticker = {}
 
     def dump(self):
         base_asset_dumps = []
@@ -12,14 +13,11 @@ class BaseAssetRepository:
         return base_asset_dumps
 
     def get_by_ticker(self, ticker) -> BaseAsset:
-        for base_asset in self._base_assets_list:
-            if base_asset.ticker == ticker:
-                return base_asset
-
-        return None
+        return self._base_assets_by_ticker.get(ticker)
 
     def get_all(self) -> [BaseAsset]:
         return self._base_assets_list
 
     def insert_base_asset(self, base_asset: BaseAsset):
         self._base_assets_list.append(base_asset)
+        self._base_assets_by_ticker.setdefault(base_asset.ticker, base_asset)
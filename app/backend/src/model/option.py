@@ -1,107 +1,132 @@
 from datetime import datetime
 
+from model import option_store
+from model.option_store import OptionStore
 
+
+# Lightweight view over a row of OptionStore. An option created without a store gets its own single-row store,
+# OptionRepository moves such options into the shared store on insert
 class Option:
-    def __init__(self, ticker: str, base_asset_ticker: str, expiration_datetime: datetime, strike: float, option_type: str):
-        self._ticker = ticker
-        self._base_asset_ticker = base_asset_ticker
-        self._expiration_datetime = expiration_datetime
-        self._strike = strike
-        self._type = option_type
-        self._bid = None
-        self._ask = None
-        self._last_price = None
-        self._last_price_timestamp = None
-        self._volatility = None
-        self._bid_iv = None
-        self._ask_iv = None
-        self._last_price_iv = None
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, ticker: str, base_asset_ticker: str, expiration_datetime: datetime, strike: float, option_type: str,
+                 store: OptionStore = None):
+        self._store = store if store is not None else OptionStore(capacity=1)
+        self._row = self._store.append(ticker, base_asset_ticker, expiration_datetime, strike, option_type)
+
+    @property
+    def store(self) -> OptionStore:
+        return self._store
+
+    @property
+    def row(self) -> int:
+        return self._row
+
+    def move_to_store(self, store: OptionStore):
+        if store is not self._store:
+            self._row = store.copy_row(self._store, self._row)
+            self._store = store
+
+    def dump(self) -> dict:
+        return {
+            'ticker': self.ticker,
+            'base_asset_ticker': self.base_asset_ticker,
+            'expiration_datetime': self.expiration_datetime,
+            'strike': self.strike,
+            'type': self.type,
+            'bid': self.bid,
+            'ask': self.ask,
+            'last_price': self.last_price,
+            'last_price_timestamp': self.last_price_timestamp,
+            'volatility': self.volatility,
+            'bid_iv': self.bid_iv,
+            'ask_iv': self.ask_iv,
+            'last_price_iv': self.last_price_iv,
+        }
 
     @property
     def ticker(self):
-        return self._ticker
+        return self._store.get_ticker(self._row)
 
     @property
     def base_asset_ticker(self):
-        return self._base_asset_ticker
+        return self._store.get_base_asset_ticker(self._row)
 
     def get_time_to_maturity(self) -> float:
-        difference = self._expiration_datetime - datetime.utcnow()
-        seconds_in_year = 365 * 24 * 60 * 60
-        return difference.total_seconds() / seconds_in_year
+        return float(self._store.get_times_to_maturity(self._row))
 
     @property
     def expiration_datetime(self):
-        return self._expiration_datetime
+        return self._store.get_expiration_datetime(self._row)
 
     @property
     def strike(self) -> float:
-        return self._strike
+        return self._store.get_value(option_store.COLUMN_STRIKE, self._row)
 
     @property
     def type(self):
-        return self._type
+        return self._store.get_type(self._row)
 
     @property
     def bid(self):
-        return self._bid
+        return self._store.get_value(option_store.COLUMN_BID, self._row)
 
     @bid.setter
     def bid(self, bid):
-        self._bid = bid
+        self._store.set_value(option_store.COLUMN_BID, self._row, bid)
 
     @property
     def ask(self):
-        return self._ask
+        return self._store.get_value(option_store.COLUMN_ASK, self._row)
 
     @ask.setter
     def ask(self, ask):
-        self._ask = ask
+        self._store.set_value(option_store.COLUMN_ASK, self._row, ask)
 
     @property
     def last_price(self):
-        return self._last_price
+        return self._store.get_value(option_store.COLUMN_LAST_PRICE, self._row)
 
     @last_price.setter
     def last_price(self, last_price):
-        self._last_price = last_price
+        self._store.set_value(option_store.COLUMN_LAST_PRICE, self._row, last_price)
 
     @property
     def last_price_timestamp(self):
-        return self._last_price_timestamp
+        return self._store.get_value(option_store.COLUMN_LAST_PRICE_TIMESTAMP, self._row)
 
     @last_price_timestamp.setter
     def last_price_timestamp(self, last_price_timestamp):
-        self._last_price_timestamp = last_price_timestamp
+        self._store.set_value(option_store.COLUMN_LAST_PRICE_TIMESTAMP, self._row, last_price_timestamp)
 
     @property
     def volatility(self):
-        return self._volatility
+        return self._store.get_value(option_store.COLUMN_VOLATILITY, self._row)
 
     @volatility.setter
     def volatility(self, volatility):
-        self._volatility = volatility
+        self._store.set_value(option_store.COLUMN_VOLATILITY, self._row, volatility)
 
     @property
     def bid_iv(self):
-        return self._bid_iv
+        return self._store.get_value(option_store.COLUMN_BID_IV, self._row)
 
     @bid_iv.setter
     def bid_iv(self, bid_iv):
-        self._bid_iv = bid_iv
+        self._store.set_value(option_store.COLUMN_BID_IV, self._row, bid_iv)
 
     @property
     def ask_iv(self):
-        return self._ask_iv
+        return self._store.get_value(option_store.COLUMN_ASK_IV, self._row)
 
     @ask_iv.setter
     def ask_iv(self, ask_iv):
-        self._ask_iv = ask_iv
+        self._store.set_value(option_store.COLUMN_ASK_IV, self._row, ask_iv)
 
     @property
     def last_price_iv(self):
-        return self._last_price_iv
+        return self._store.get_value(option_store.COLUMN_LAST_PRICE_IV, self._row)
 
     @last_price_iv.setter
     def last_price_iv(self, last_price_iv):
-        self._last_price_iv = last_price_iv
+        self._store.set_value(option_store.COLUMN_LAST_PRICE_IV, self._row, last_price_iv)
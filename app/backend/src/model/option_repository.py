@@ -1,67 +1,122 @@
-from datetime import datetime
+import bisect
+import math
+from datetime import datetime, date
+
+import numpy as np
 
 from model.option import Option
+from model.option_store import OptionStore
 
 
 class OptionRepository:
 
     def __init__(self):
+        self._store = OptionStore()
         self._options_list = []
+        # Secondary indexes to avoid scanning the whole list of options on every lookup
+        self._options_by_ticker = {}
+        self._options_by_strike = {}           # (base asset ticker, strike) -> [Option]
+        self._options_by_expiration_date = {}  # (base asset ticker, expiration date) -> [Option]
+        self._sorted_strikes = {}              # base asset ticker -> sorted [strike]
 
     def dump(self):
-        return [vars(option) for option in self._options_list]
+        return [option.dump() for option in self._options_list]
+
+    # Columnar storage of all options of the repository
+    @property
+    def store(self) -> OptionStore:
+        return self._store
+
+    def create_option(self, ticker: str, base_asset_ticker: str, expiration_datetime: datetime, strike: float,
+                      option_type: str) -> Option:
+        option = Option(ticker, base_asset_ticker, expiration_datetime, strike, option_type, self._store)
+        self.insert_option(option)
+        return option
 
     def insert_option(self, option: Option):
+        option.move_to_store(self._store)
         self._options_list.append(option)
+        self._options_by_ticker.setdefault(option.ticker, option)
+
+        base_asset_ticker = option.base_asset_ticker
+        strike_key = (base_asset_ticker, option.strike)
+        if strike_key not in self._options_by_strike:
+            self._options_by_strike[strike_key] = []
+            bisect.insort(self._sorted_strikes.setdefault(base_asset_ticker, []), option.strike)
+        self._options_by_strike[strike_key].append(option)
+
+        expiration_date_key = (base_asset_ticker, option.expiration_datetime.date())
+        self._options_by_expiration_date.setdefault(expiration_date_key, []).append(option)
 
     def get_all(self) -> [Option]:
         return self._options_list
 
     def get_by_ticker(self, ticker) -> Option:
-        for option in self._options_list:
-            if option.ticker == ticker:
-                return option
-
-        return None
+        return self._options_by_ticker.get(ticker)
 
     def get_by_strike(self, base_asset_ticker, strike) -> [Option]:
-        options_by_strike = []
-        for option in self._options_list:
-            if option.base_asset_ticker == base_asset_ticker and option.strike == strike:
-                options_by_strike.append(option)
-        return options_by_strike
+        return list(self._options_by_strike.get((base_asset_ticker, strike), []))
 
     def get_by_strikes(self, base_asset_ticker, strikes: [int]) -> [Option]:
         options_by_strikes = []
-        for option in self._options_list:
-            if option.base_asset_ticker == base_asset_ticker and option.strike in strikes:
-                options_by_strikes.append(option)
-        return options_by_strikes
+        for strike in dict.fromkeys(strikes):
+            options_by_strikes.extend(self._options_by_strike.get((base_asset_ticker, strike), []))
+        return self._sort_by_insertion_order(options_by_strikes)
+
+    # Strikes of base asset options in ascending order
+    def get_strikes(self, base_asset_ticker) -> [float]:
+        return list(self._sorted_strikes.get(base_asset_ticker, []))
+
+    # Options with strikes in the closed range [min_strike, max_strike]
+    def get_by_strike_range(self, base_asset_ticker, min_strike, max_strike) -> [Option]:
+        sorted_strikes = self._sorted_strikes.get(base_asset_ticker, [])
+        first_index = bisect.bisect_left(sorted_strikes, min_strike)
+        last_index = bisect.bisect_right(sorted_strikes, max_strike)
+        return self.get_by_strikes(base_asset_ticker, sorted_strikes[first_index:last_index])
+
+    # Options matching all given criteria, None matches any value. Strikes are in the closed range
+    def find(self, base_asset_ticker: str = None, expiration_date: date = None, min_strike: float = None,
+             max_strike: float = None) -> [Option]:
+        if base_asset_ticker is not None:
+            options = self.get_by_strike_range(base_asset_ticker,
+                                               -math.inf if min_strike is None else min_strike,
+                                               math.inf if max_strike is None else max_strike)
+        else:
+            options = [option for option in self._options_list
+                       if (min_strike is None or option.strike >= min_strike) and
+                       (max_strike is None or option.strike <= max_strike)]
+        if expiration_date is not None:
+            options = [option for option in options if option.expiration_datetime.date() == expiration_date]
+        return options
+
+    def get_by_expiration_date(self, base_asset_ticker: str, expiration_date: date) -> [Option]:
+        return list(self._options_by_expiration_date.get((base_asset_ticker, expiration_date), []))
 
     def get_by_tickers(self, option_tickers: [str]) -> [Option]:
         found_options = []
-        for option in self._options_list:
-            if option.ticker in option_tickers:
+        for ticker in dict.fromkeys(option_tickers):
+            option = self._options_by_ticker.get(ticker)
+            if option is not None:
                 found_options.append(option)
-        return found_options
+        return self._sort_by_insertion_order(found_options)
 
     def get_by_tickers_for_base_asset(self, base_asset_ticker: str, option_tickers: [str]) -> [Option]:
-        found_options = []
-        for option in self._options_list:
-            if option.base_asset_ticker == base_asset_ticker and option.ticker in option_tickers:
-                found_options.append(option)
-        return found_options
+        return [option for option in self.get_by_tickers(option_tickers) if option.base_asset_ticker == base_asset_ticker]
 
     def get_by_tickers_and_expiration_dates_for_base_asset(self, base_asset_ticker: str, option_tickers: [str], expiration_datetimes: [datetime]):
+        expiration_dates = {expiration_datetime.date() for expiration_datetime in expiration_datetimes}
         found_options = []
-        for option in self._options_list:
-            if option.base_asset_ticker == base_asset_ticker and option.ticker in option_tickers:
-                is_expiration_date_in_list = False
-                for expiration_datetime in expiration_datetimes:
-                    if expiration_datetime.date() == option.expiration_datetime.date():
-                        is_expiration_date_in_list = True
-
-                if is_expiration_date_in_list:
-                    found_options.append(option)
+        for option in self.get_by_tickers_for_base_asset(base_asset_ticker, option_tickers):
+            if option.expiration_datetime.date() in expiration_dates:
+                found_options.append(option)
 
         return found_options
+
+    # Row ids of options in the store, to work with whole columns of given options
+    def get_rows(self, options: [Option]) -> np.ndarray:
+        return np.fromiter((option.row for option in options), dtype=np.intp, count=len(options))
+
+    # Lookups by several keys return options in the same order as the full scan of the list would do.
+    # Rows of the store are appended on insert, so they follow the insertion order
+    def _sort_by_insertion_order(self, options: [Option]) -> [Option]:
+        return sorted(options, key=lambda option: option.row)
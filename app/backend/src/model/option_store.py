@@ -0,0 +1,139 @@
+import math
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from model import option_type
+
+_INITIAL_CAPACITY = 256
+_SECONDS_IN_YEAR = 365 * 24 * 60 * 60
+
+# Numeric option fields are kept in columns, NaN stands for a missing value (None)
+COLUMN_STRIKE = 'strike'
+COLUMN_EXPIRATION_TIMESTAMP = 'expiration_timestamp'
+COLUMN_IS_CALL = 'is_call'
+COLUMN_BID = 'bid'
+COLUMN_ASK = 'ask'
+COLUMN_LAST_PRICE = 'last_price'
+COLUMN_LAST_PRICE_TIMESTAMP = 'last_price_timestamp'
+COLUMN_VOLATILITY = 'volatility'
+COLUMN_BID_IV = 'bid_iv'
+COLUMN_ASK_IV = 'ask_iv'
+COLUMN_LAST_PRICE_IV = 'last_price_iv'
+# Cached dIV/dS and the underlying price the quote IVs were solved at, see IvRecalculator
+COLUMN_BID_IV_SENSITIVITY = 'bid_iv_sensitivity'
+COLUMN_ASK_IV_SENSITIVITY = 'ask_iv_sensitivity'
+COLUMN_BID_IV_BASE_ASSET_PRICE = 'bid_iv_base_asset_price'
+COLUMN_ASK_IV_BASE_ASSET_PRICE = 'ask_iv_base_asset_price'
+
+_COLUMN_TYPES = {
+    COLUMN_STRIKE: np.float64,
+    COLUMN_EXPIRATION_TIMESTAMP: np.float64,
+    COLUMN_IS_CALL: np.bool_,
+    COLUMN_BID: np.float64,
+    COLUMN_ASK: np.float64,
+    COLUMN_LAST_PRICE: np.float64,
+    COLUMN_LAST_PRICE_TIMESTAMP: np.float64,
+    COLUMN_VOLATILITY: np.float64,
+    COLUMN_BID_IV: np.float64,
+    COLUMN_ASK_IV: np.float64,
+    COLUMN_LAST_PRICE_IV: np.float64,
+    COLUMN_BID_IV_SENSITIVITY: np.float64,
+    COLUMN_ASK_IV_SENSITIVITY: np.float64,
+    COLUMN_BID_IV_BASE_ASSET_PRICE: np.float64,
+    COLUMN_ASK_IV_BASE_ASSET_PRICE: np.float64,
+}
+
+
+# Struct-of-arrays storage of options: every option is a row id, every numeric field is a NumPy column.
+# Columns may be reallocated when the store grows, so views returned by column() must not be kept across appends
+class OptionStore:
+    def __init__(self, capacity: int = _INITIAL_CAPACITY):
+        self._size = 0
+        self._capacity = max(capacity, 1)
+        self._columns = {name: self._allocate_column(dtype, self._capacity) for name, dtype in _COLUMN_TYPES.items()}
+        self._tickers = []
+        self._base_asset_tickers = []
+        self._expiration_datetimes = []
+
+    def __len__(self):
+        return self._size
+
+    def append(self, ticker: str, base_asset_ticker: str, expiration_datetime: datetime, strike: float,
+               opt_type: str) -> int:
+        if self._size == self._capacity:
+            self._grow()
+
+        row = self._size
+        self._size += 1
+        self._tickers.append(ticker)
+        self._base_asset_tickers.append(base_asset_ticker)
+        self._expiration_datetimes.append(expiration_datetime)
+        self._columns[COLUMN_STRIKE][row] = _none_to_nan(strike)
+        self._columns[COLUMN_EXPIRATION_TIMESTAMP][row] = _get_utc_timestamp(expiration_datetime)
+        self._columns[COLUMN_IS_CALL][row] = opt_type == option_type.CALL
+        return row
+
+    # Copies the row of another store into this one, returns the new row id
+    def copy_row(self, store: 'OptionStore', row: int) -> int:
+        new_row = self.append(store.get_ticker(row), store.get_base_asset_ticker(row),
+                              store.get_expiration_datetime(row), store.get_value(COLUMN_STRIKE, row),
+                              store.get_type(row))
+        for name in _COLUMN_TYPES:
+            self._columns[name][new_row] = store._columns[name][row]
+        return new_row
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name][:self._size]
+
+    def get_value(self, name: str, row: int):
+        value = self._columns[name][row]
+        return None if math.isnan(value) else float(value)
+
+    def set_value(self, name: str, row: int, value):
+        self._columns[name][row] = _none_to_nan(value)
+
+    def get_ticker(self, row: int) -> str:
+        return self._tickers[row]
+
+    def get_base_asset_ticker(self, row: int) -> str:
+        return self._base_asset_tickers[row]
+
+    def get_expiration_datetime(self, row: int) -> datetime:
+        return self._expiration_datetimes[row]
+
+    def get_type(self, row: int) -> str:
+        return option_type.CALL if self._columns[COLUMN_IS_CALL][row] else option_type.PUT
+
+    def get_times_to_maturity(self, rows) -> np.ndarray:
+        return (self._columns[COLUMN_EXPIRATION_TIMESTAMP][rows] - time.time()) / _SECONDS_IN_YEAR
+
+    # Values of the column for given rows as a list with None instead of NaN
+    def get_values(self, name: str, rows) -> list:
+        values = self._columns[name][rows]
+        return [None if math.isnan(value) else value for value in values.tolist()]
+
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self._columns.values())
+
+    def _grow(self):
+        self._capacity *= 2
+        for name, column in self._columns.items():
+            new_column = self._allocate_column(column.dtype, self._capacity)
+            new_column[:self._size] = column[:self._size]
+            self._columns[name] = new_column
+
+    @staticmethod
+    def _allocate_column(dtype, capacity: int) -> np.ndarray:
+        if dtype == np.bool_:
+            return np.zeros(capacity, dtype=dtype)
+        return np.full(capacity, np.nan, dtype=dtype)
+
+
+def _get_utc_timestamp(naive_utc_datetime: datetime) -> float:
+    return naive_utc_datetime.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _none_to_nan(value):
+    return math.nan if value is None else value
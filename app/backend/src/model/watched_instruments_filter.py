@@ -1,23 +1,25 @@
+# Tickers are kept in dicts used as insertion-ordered sets, so that lookups and removals are O(1)
 class WatchedInstrumentsFilter:
     def __init__(self):
-        self._base_asset_tickers = []
-        self._option_tickers = []
+        self._base_asset_tickers = {}
+        self._option_tickers = {}
 
     @property
     def base_asset_tickers(self):
-        return self._base_asset_tickers
+        return list(self._base_asset_tickers)
 
     @property
     def option_tickers(self):
-        return self._option_tickers
+        return list(self._option_tickers)
 
     def add_base_asset_ticker(self, base_asset_ticker: str):
-        if not self.has_base_asset_ticker(base_asset_ticker):
-            self._base_asset_tickers.append(base_asset_ticker)
+        self._base_asset_tickers[base_asset_ticker] = None
 
     def add_option_ticker(self, option_ticker: str):
-        if not self.has_option_ticker(option_ticker):
-            self._option_tickers.append(option_ticker)
+        self._option_tickers[option_ticker] = None
+
+    def remove_option_ticker(self, option_ticker: str):
+        self._option_tickers.pop(option_ticker, None)
 
     def has_base_asset_ticker(self, base_asset_ticker):
         return base_asset_ticker in self._base_asset_tickers
@@ -0,0 +1,172 @@
+import asyncio
+import os
+from urllib.parse import parse_qs, urlencode
+
+import jinja2
+import uvicorn
+
+from view.web_view import WebView, WebResponse, EVENT_STREAM_CONTENT_TYPE
+
+_TEMPLATES_PATH = os.path.join(os.path.dirname(__file__), 'templates')
+
+# Route names are the same as the Flask endpoint names, so that templates are shared
+_ROUTE_PATHS = {
+    'get_index_html': '/',
+    'get_chart_json': '/chart.json',
+    'get_chart_stream': '/chart_stream',
+    'get_chart_html': '/chart.html',
+    'dump_model': '/dump_model',
+    'dump_watched_instruments': '/dump_watched_instruments',
+    'get_metrics': '/metrics',
+    'start_profiler': '/profiler/start',
+    'stop_profiler': '/profiler/stop',
+    'get_profile': '/profiler/profile.folded',
+}
+# Routes changing state, the rest are GET (and HEAD) routes as in FlaskApp
+_POST_ROUTE_NAMES = ('start_profiler', 'stop_profiler')
+
+
+# Serves the routes of WebView as an ASGI app on the event loop of AlorApi.
+# Handlers run on the same thread as the websocket client, so they may use the model and asyncio objects directly,
+# and waiting requests cost no threads. Like Flask, HEAD requests get the headers of GET without the body
+class AsgiApp:
+    def __init__(self):
+        self._templates = jinja2.Environment(loader=jinja2.FileSystemLoader(_TEMPLATES_PATH), autoescape=True)
+        self._templates.globals['url_for'] = _url_for
+        self._web_view = WebView(lambda name, **context: self._templates.get_template(name).render(**context))
+        self._option_app = None
+        self._routes = {path: name for name, path in _ROUTE_PATHS.items()}
+
+    def set_option_app(self, option_app):
+        self._option_app = option_app
+        self._web_view.set_option_app(option_app)
+
+    async def serve(self, port: int):
+        config = uvicorn.Config(self, host='0.0.0.0', port=port, lifespan='off', log_level='warning',
+                                proxy_headers=True, forwarded_allow_ips='*')
+        await uvicorn.Server(config).serve()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return
+
+        route_name = self._routes.get(scope['path'])
+        if route_name is None:
+            await _send_response(send, scope, WebResponse(404, 'Not Found', 'text/plain'))
+            return
+        methods = ('POST',) if route_name in _POST_ROUTE_NAMES else ('GET', 'HEAD')
+        if scope['method'] not in methods:
+            await _send_response(send, scope, WebResponse(405, 'Method Not Allowed', 'text/plain',
+                                                          {'Allow': ', '.join(methods)}))
+            return
+        await getattr(self, route_name)(scope, receive, send)
+
+    async def dump_model(self, scope, receive, send):
+        await _send_response(send, scope, self._web_view.dump_model(_get_query_param_getter(scope)))
+
+    async def dump_watched_instruments(self, scope, receive, send):
+        await _send_response(send, scope, self._web_view.dump_watched_instruments(_get_query_param_getter(scope)))
+
+    async def get_metrics(self, scope, receive, send):
+        await _send_response(send, scope, self._web_view.get_metrics())
+
+    async def start_profiler(self, scope, receive, send):
+        await _send_response(send, scope, self._web_view.start_profiler(_get_query_param_getter(scope)))
+
+    async def stop_profiler(self, scope, receive, send):
+        await _send_response(send, scope, self._web_view.stop_profiler())
+
+    async def get_profile(self, scope, receive, send):
+        await _send_response(send, scope, self._web_view.get_profile())
+
+    async def get_index_html(self, scope, receive, send):
+        await _send_response(send, scope, self._web_view.get_index_html())
+
+    async def get_chart_html(self, scope, receive, send):
+        await _send_response(send, scope, self._web_view.get_chart_html(_get_query_param_getter(scope)))
+
+    # Options around the current price are subscribed on demand
+    async def get_chart_json(self, scope, receive, send):
+        get_query_param = _get_query_param_getter(scope)
+        base_asset_ticker = self._web_view.get_chart_base_asset_ticker(get_query_param)
+        snapshot = None
+        if base_asset_ticker is not None:
+            self._option_app.refresh_watched_instruments(base_asset_ticker)
+            snapshot = await self._web_view.get_chart_snapshot_async(base_asset_ticker, get_query_param)
+        await _send_response(send, scope, self._web_view.get_chart_json(base_asset_ticker, snapshot,
+                                                                        _get_header(scope, b'if-none-match')))
+
+    async def get_chart_stream(self, scope, receive, send):
+        base_asset_ticker = self._web_view.get_chart_base_asset_ticker(_get_query_param_getter(scope))
+        response = self._web_view.get_chart_stream(base_asset_ticker)
+        if base_asset_ticker is None or scope['method'] == 'HEAD':
+            await _send_response(send, scope, response)
+            return
+
+        self._option_app.refresh_watched_instruments(base_asset_ticker)
+        await send({'type': 'http.response.start', 'status': response.status, 'headers': _get_headers(response)})
+        disconnect_task = asyncio.create_task(_wait_for_disconnect(receive))
+        try:
+            version = 0
+            while True:
+                snapshot_task = asyncio.create_task(
+                    self._web_view.wait_for_chart_event_snapshot_async(base_asset_ticker, version))
+                await asyncio.wait((snapshot_task, disconnect_task), return_when=asyncio.FIRST_COMPLETED)
+                if disconnect_task.done():
+                    snapshot_task.cancel()
+                    return
+
+                event, version = self._web_view.get_chart_event(snapshot_task.result(), version)
+                await send({'type': 'http.response.body', 'body': event.encode(), 'more_body': True})
+        finally:
+            disconnect_task.cancel()
+
+
+def _url_for(endpoint: str, **values) -> str:
+    path = _ROUTE_PATHS[endpoint]
+    return f'{path}?{urlencode(values)}' if values else path
+
+
+def _get_query_param_getter(scope) -> callable:
+    query_params = parse_qs(scope['query_string'].decode())
+
+    def get_query_param(name: str):
+        values = query_params.get(name)
+        return values[0] if values else None
+
+    return get_query_param
+
+
+def _get_header(scope, name: bytes):
+    for header_name, value in scope['headers']:
+        if header_name == name:
+            return value.decode()
+    return None
+
+
+def _get_headers(response: WebResponse) -> list:
+    headers = [(name.lower().encode(), value.encode()) for name, value in response.headers.items()]
+    if response.content_type is not None:
+        headers.append((b'content-type', response.content_type.encode()))
+    return headers
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _send_response(send, scope, response: WebResponse):
+    body = response.body.encode()
+    headers = _get_headers(response)
+    if response.status != 304 and response.content_type != EVENT_STREAM_CONTENT_TYPE:
+        headers.append((b'content-length', str(len(body)).encode()))
+    await send({'type': 'http.response.start', 'status': response.status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': b'' if scope['method'] == 'HEAD' else body})
+
+
+_asgi_app = AsgiApp()
+
+
+def get_asgi_app():
+    return _asgi_app
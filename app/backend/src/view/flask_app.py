@@ -1,19 +1,19 @@
 import flask
-from flask import Flask, jsonify, request
+from flask import Flask, request
 import threading
 
-from app import supported_base_asset
 from werkzeug.middleware.proxy_fix import ProxyFix
 from infrastructure import env_utils
+from view.web_view import WebView, WebResponse
 
-_BASE_ASSET_TICKER_QUERY_PARAM = 'base_asset_ticker'
 
+# Serves the routes of WebView by the Flask dev server in a separate thread
 class FlaskApp:
     def __init__(self):
-        self._option_app = None
+        self._web_view = WebView(flask.render_template)
 
     def set_option_app(self, option_app):
-        self._option_app = option_app
+        self._web_view.set_option_app(option_app)
 
     def start_app_in_thread(self):
         # Start Flask app in a separate thread
@@ -22,36 +22,62 @@ class FlaskApp:
         flask_thread.start()
 
     def dump_model(self):
-        return jsonify(self._option_app.dump_model())
+        return _to_flask_response(self._web_view.dump_model(request.args.get))
 
     def dump_watched_instruments(self):
-        return jsonify(self._option_app.dump_watched_instruments())
+        return _to_flask_response(self._web_view.dump_watched_instruments(request.args.get))
 
-    def get_index_html(self, error_message=None):
-        tickers = supported_base_asset.MAP.keys()
-        return flask.render_template('index.html', error_message=error_message, tickers=tickers)
+    def get_metrics(self):
+        return _to_flask_response(self._web_view.get_metrics())
+
+    def start_profiler(self):
+        return _to_flask_response(self._web_view.start_profiler(request.args.get))
+
+    def stop_profiler(self):
+        return _to_flask_response(self._web_view.stop_profiler())
+
+    def get_profile(self):
+        return _to_flask_response(self._web_view.get_profile())
+
+    def get_index_html(self):
+        return _to_flask_response(self._web_view.get_index_html())
 
     def get_chart_html(self):
-        base_asset_ticker = request.args.get(_BASE_ASSET_TICKER_QUERY_PARAM)
-        if base_asset_ticker not in supported_base_asset.MAP:
-            error_message = f'Тикер ({base_asset_ticker}) не поддерживается. Ниже ссылки на диаграммы по поддерживаемым тикерам.'
-            result = self.get_index_html(error_message=error_message)
-        else:
-            result = flask.render_template('chart.html', base_asset_ticker=base_asset_ticker)
-        return result
+        return _to_flask_response(self._web_view.get_chart_html(request.args.get))
 
     def get_chart_json(self):
-        base_asset_ticker = request.args.get(_BASE_ASSET_TICKER_QUERY_PARAM)
-        result = self._option_app.get_diagram_data(base_asset_ticker)
-        return jsonify(result)
+        base_asset_ticker = self._web_view.get_chart_base_asset_ticker(request.args.get)
+        snapshot = None
+        if base_asset_ticker is not None:
+            snapshot = self._web_view.get_chart_snapshot(base_asset_ticker, request.args.get)
+        return _to_flask_response(self._web_view.get_chart_json(base_asset_ticker, snapshot,
+                                                                request.headers.get('If-None-Match')))
+
+    def get_chart_stream(self):
+        base_asset_ticker = self._web_view.get_chart_base_asset_ticker(request.args.get)
+        response = self._web_view.get_chart_stream(base_asset_ticker)
+        if base_asset_ticker is None:
+            return _to_flask_response(response)
+        return flask.Response(self._generate_chart_events(base_asset_ticker), response.status, response.headers,
+                              content_type=response.content_type)
+
+    def _generate_chart_events(self, base_asset_ticker: str):
+        version = 0
+        while True:
+            snapshot = self._web_view.wait_for_chart_event_snapshot(base_asset_ticker, version)
+            event, version = self._web_view.get_chart_event(snapshot, version)
+            yield event
 
     def _run_flask_app(self):
         port = int(env_utils.get_env_or_exit('BACKEND_PORT'))
         app.run(host='0.0.0.0', port=port)
 
 
+def _to_flask_response(response: WebResponse):
+    return flask.Response(response.body, response.status, response.headers, content_type=response.content_type)
+
+
 app = Flask(__name__)
-app.json_provider_class.compact = False
 app.wsgi_app = ProxyFix(
     app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_prefix=1
 )
@@ -73,6 +99,11 @@ def get_chart_json():
     return _flask_app.get_chart_json()
 
 
+@app.route('/chart_stream', methods=['GET'])
+def get_chart_stream():
+    return _flask_app.get_chart_stream()
+
+
 @app.route('/chart.html', methods=['GET'])
 def get_chart_html():
     return _flask_app.get_chart_html()
@@ -86,3 +117,23 @@ def dump_model():
 @app.route('/dump_watched_instruments', methods=['GET'])
 def dump_watched_instruments():
     return _flask_app.dump_watched_instruments()
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return _flask_app.get_metrics()
+
+
+@app.route('/profiler/start', methods=['POST'])
+def start_profiler():
+    return _flask_app.start_profiler()
+
+
+@app.route('/profiler/stop', methods=['POST'])
+def stop_profiler():
+    return _flask_app.stop_profiler()
+
+
+@app.route('/profiler/profile.folded', methods=['GET'])
+def get_profile():
+    return _flask_app.get_profile()
@@ -0,0 +1,212 @@
+import datetime
+import json
+import time
+
+from werkzeug.http import http_date
+
+from app import supported_base_asset
+from app.model_dump_filter import parse_model_dump_filter
+from infrastructure import env_utils, metrics
+
+_BASE_ASSET_TICKER_QUERY_PARAM = 'base_asset_ticker'
+_AFTER_VERSION_QUERY_PARAM = 'after_version'
+_DURATION_QUERY_PARAM = 'duration'
+_INTERVAL_QUERY_PARAM = 'interval'
+_KEEPALIVE_EVENT = ': keepalive\n\n'
+# Chart data is delivered to the browser by server-sent events or by long polling of chart.json
+CHART_TRANSPORT_SSE = 'sse'
+CHART_TRANSPORT_POLL = 'poll'
+CHART_TRANSPORTS = (CHART_TRANSPORT_SSE, CHART_TRANSPORT_POLL)
+
+JSON_CONTENT_TYPE = 'application/json'
+HTML_CONTENT_TYPE = 'text/html; charset=utf-8'
+TEXT_CONTENT_TYPE = 'text/plain; charset=utf-8'
+EVENT_STREAM_CONTENT_TYPE = 'text/event-stream'
+
+
+# Status, body and headers of a response, FlaskApp and AsgiApp send it by their own means
+class WebResponse:
+    def __init__(self, status: int = 200, body: str = '', content_type: str = None, headers: dict = None):
+        self._status = status
+        self._body = body
+        self._content_type = content_type
+        self._headers = headers if headers is not None else {}
+
+    @property
+    def status(self) -> int:
+        return self._status
+
+    @property
+    def body(self) -> str:
+        return self._body
+
+    @property
+    def content_type(self) -> str:
+        return self._content_type
+
+    @property
+    def headers(self) -> dict:
+        return self._headers
+
+
+# Handlers of all routes independent of the web server: FlaskApp and AsgiApp only parse requests and send responses.
+# get_query_param - returns the value of the query parameter by its name or None.
+# render_template - renders the template by its name with given variables
+class WebView:
+    def __init__(self, render_template: callable):
+        self._option_app = None
+        self._render_template = render_template
+        # Snapshot versions start over on restart, so ETags of different runs must not match
+        self._etag_prefix = str(int(time.time()))
+        self._long_poll_timeout = env_utils.get_float('CHART_LONG_POLL_TIMEOUT', 25)
+        self._chart_transport = env_utils.get_choice('CHART_TRANSPORT', CHART_TRANSPORTS, CHART_TRANSPORT_SSE)
+
+    def set_option_app(self, option_app):
+        self._option_app = option_app
+
+    # Filtered by base_asset_ticker, expiration_date, min_strike and max_strike, paginated by offset and limit
+    def dump_model(self, get_query_param: callable) -> WebResponse:
+        return _get_json_response(self._option_app.dump_model(parse_model_dump_filter(get_query_param)))
+
+    def dump_watched_instruments(self, get_query_param: callable) -> WebResponse:
+        return _get_json_response(self._option_app.dump_watched_instruments(parse_model_dump_filter(get_query_param)))
+
+    # The metrics route is not found unless metrics are enabled
+    def get_metrics(self) -> WebResponse:
+        if not self._option_app.is_metrics_enabled:
+            return _NOT_FOUND_RESPONSE
+        return WebResponse(200, self._option_app.get_metrics(), metrics.CONTENT_TYPE)
+
+    # Profiler routes are not found unless the profiler is enabled
+    def start_profiler(self, get_query_param: callable) -> WebResponse:
+        if not self._option_app.is_profiler_enabled:
+            return _NOT_FOUND_RESPONSE
+        return _get_json_response(self._option_app.start_profiler(
+            _parse(get_query_param(_DURATION_QUERY_PARAM), float),
+            _parse(get_query_param(_INTERVAL_QUERY_PARAM), float)))
+
+    def stop_profiler(self) -> WebResponse:
+        if not self._option_app.is_profiler_enabled:
+            return _NOT_FOUND_RESPONSE
+        return _get_json_response(self._option_app.stop_profiler())
+
+    def get_profile(self) -> WebResponse:
+        if not self._option_app.is_profiler_enabled:
+            return _NOT_FOUND_RESPONSE
+        profile = self._option_app.get_profile()
+        if profile is None:
+            return WebResponse(404, 'No finished profile yet', TEXT_CONTENT_TYPE)
+        return WebResponse(200, profile, TEXT_CONTENT_TYPE)
+
+    def get_index_html(self, error_message=None) -> WebResponse:
+        tickers = supported_base_asset.MAP.keys()
+        return WebResponse(200, self._render_template('index.html', error_message=error_message, tickers=tickers),
+                           HTML_CONTENT_TYPE)
+
+    def get_chart_html(self, get_query_param: callable) -> WebResponse:
+        base_asset_ticker = get_query_param(_BASE_ASSET_TICKER_QUERY_PARAM)
+        if base_asset_ticker not in supported_base_asset.MAP:
+            error_message = f'Тикер ({base_asset_ticker}) не поддерживается. Ниже ссылки на диаграммы по поддерживаемым тикерам.'
+            return self.get_index_html(error_message=error_message)
+        return WebResponse(200, self._render_template('chart.html', base_asset_ticker=base_asset_ticker,
+                                                      chart_transport=self._chart_transport),
+                           HTML_CONTENT_TYPE)
+
+    # Base asset ticker of chart.json and chart_stream requests, None if it is not supported
+    def get_chart_base_asset_ticker(self, get_query_param: callable) -> str:
+        base_asset_ticker = get_query_param(_BASE_ASSET_TICKER_QUERY_PARAM)
+        return base_asset_ticker if base_asset_ticker in supported_base_asset.MAP else None
+
+    # Chart data is versioned: with after_version the request waits until a newer version is published
+    # or the long poll timeout expires. Blocks the calling thread
+    def get_chart_snapshot(self, base_asset_ticker: str, get_query_param: callable):
+        after_version = _parse(get_query_param(_AFTER_VERSION_QUERY_PARAM), int)
+        if after_version is None:
+            return self._option_app.get_chart_snapshot(base_asset_ticker)
+        return self._option_app.wait_for_chart_snapshot(base_asset_ticker, after_version, self._long_poll_timeout)
+
+    # Same as get_chart_snapshot, but waits on the event loop
+    async def get_chart_snapshot_async(self, base_asset_ticker: str, get_query_param: callable):
+        after_version = _parse(get_query_param(_AFTER_VERSION_QUERY_PARAM), int)
+        if after_version is None:
+            return self._option_app.get_chart_snapshot(base_asset_ticker)
+        return await self._option_app.wait_for_chart_snapshot_async(base_asset_ticker, after_version,
+                                                                    self._long_poll_timeout)
+
+    # snapshot - of the supported base_asset_ticker, see get_chart_snapshot.
+    # Unchanged data is answered with 304 to If-None-Match
+    def get_chart_json(self, base_asset_ticker: str, snapshot, if_none_match: str) -> WebResponse:
+        if base_asset_ticker is None or snapshot is None:
+            return _get_json_response(self._option_app.get_diagram_data(base_asset_ticker))
+
+        etag = f'"{self._etag_prefix}-{base_asset_ticker}-{snapshot.version}"'
+        if_none_match_etags = _parse_etags(if_none_match)
+        if etag in if_none_match_etags or '*' in if_none_match_etags:
+            return WebResponse(304, '', None, {'ETag': etag})
+        return WebResponse(200, snapshot.data_json, JSON_CONTENT_TYPE, {'ETag': etag})
+
+    # Server-sent events stream of the chart: the full data first, then deltas of changed cells.
+    # A subscriber that missed a version, or a version with changed labels or strikes, gets the full data again.
+    # Events are serialized once on publishing, so any count of subscribers costs no extra computation.
+    # The response has no body, events follow it, see get_chart_event
+    def get_chart_stream(self, base_asset_ticker: str) -> WebResponse:
+        if base_asset_ticker is None:
+            return _get_json_response(self._option_app.get_diagram_data(base_asset_ticker), 404)
+        return WebResponse(200, '', EVENT_STREAM_CONTENT_TYPE, {
+            'Cache-Control': 'no-cache',
+            # Disables buffering of the stream by nginx
+            'X-Accel-Buffering': 'no',
+        })
+
+    # Waits for the snapshot after the version sent last, blocks the calling thread
+    def wait_for_chart_event_snapshot(self, base_asset_ticker: str, version: int):
+        return self._option_app.wait_for_chart_snapshot(base_asset_ticker, version, self._long_poll_timeout)
+
+    async def wait_for_chart_event_snapshot_async(self, base_asset_ticker: str, version: int):
+        return await self._option_app.wait_for_chart_snapshot_async(base_asset_ticker, version,
+                                                                    self._long_poll_timeout)
+
+    # Returns the event to send for the snapshot waited after the version sent last, and the version sent with it.
+    # A keepalive comment is sent when no newer snapshot is published within the long poll timeout
+    @staticmethod
+    def get_chart_event(snapshot, version: int) -> (str, int):
+        if snapshot is None or snapshot.version == version:
+            return _KEEPALIVE_EVENT, version
+        if snapshot.version == version + 1 and snapshot.delta_json is not None:
+            return _format_event('delta', snapshot.version, snapshot.delta_json), snapshot.version
+        return _format_event('snapshot', snapshot.version, snapshot.data_json), snapshot.version
+
+
+_NOT_FOUND_RESPONSE = WebResponse(404, 'Not Found', TEXT_CONTENT_TYPE)
+
+
+# Same output as jsonify of Flask with compact=False: indented, sorted keys, dates as HTTP dates
+def to_json(data) -> str:
+    return json.dumps(data, default=_to_json_value, indent=2, sort_keys=True) + '\n'
+
+
+def _to_json_value(value):
+    if isinstance(value, datetime.date):
+        return http_date(value)
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _get_json_response(data, status: int = 200) -> WebResponse:
+    return WebResponse(status, to_json(data), JSON_CONTENT_TYPE)
+
+
+def _parse_etags(if_none_match: str) -> [str]:
+    if not if_none_match:
+        return []
+    return [etag.strip().removeprefix('W/') for etag in if_none_match.split(',')]
+
+
+def _parse(value, parse: callable):
+    try:
+        return parse(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_event(event: str, event_id: int, data: str) -> str:
+    return f'event: {event}\nid: {event_id}\ndata: {data}\n\n'
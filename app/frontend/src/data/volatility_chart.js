@@ -376,8 +376,16 @@ function requestChartData() {
     // Create a new XMLHttpRequest object
     var xhr = new XMLHttpRequest();
 
-    // Configure the request
-    xhr.open('GET', g_requestDataUrl, true);
+    // Configure the request. With a known version the server answers when a newer version is published
+    // or when the long poll timeout expires
+    var url = g_requestDataUrl;
+    if (g_chartDataVersion !== null) {
+        url += '&after_version=' + g_chartDataVersion;
+    }
+    xhr.open('GET', url, true);
+    if (g_chartDataEtag !== null) {
+        xhr.setRequestHeader('If-None-Match', g_chartDataEtag);
+    }
 
     // Set up the onload function to handle the response
     xhr.onload = function() {
@@ -386,16 +394,30 @@ function requestChartData() {
             // Parse the JSON response
             var jsonResponse = JSON.parse(xhr.responseText);
 
+            if (jsonResponse.version === undefined) {
+                // Not chart data (e.g. an unknown ticker), the long poll would not wait for it
+                console.error('Unexpected chart data response: ' + xhr.responseText);
+                setTimeout(requestChartData, REQUEST_RETRY_INTERVAL);
+                return;
+            }
+            g_chartDataVersion = jsonResponse.version;
+            g_chartDataEtag = xhr.getResponseHeader('ETag');
             updateChart(jsonResponse);
+            requestChartData();
+        } else if (xhr.status === 304) {
+            // Nothing changed during the long poll
+            requestChartData();
         } else {
             // Handle errors
             console.error('Request failed with status code ' + xhr.status);
+            setTimeout(requestChartData, REQUEST_RETRY_INTERVAL);
         }
     };
 
     // Set up the onerror function to handle errors
     xhr.onerror = function() {
         console.error('Request failed');
+        setTimeout(requestChartData, REQUEST_RETRY_INTERVAL);
     };
 
     // Send the request
@@ -403,6 +425,42 @@ function requestChartData() {
 }
 
 
+function subscribeToChartStream() {
+    var eventSource = new EventSource(g_streamDataUrl);
+
+    // Full chart data, sent first and whenever labels or strikes change
+    eventSource.addEventListener('snapshot', function(event) {
+        g_chartData = JSON.parse(event.data);
+        updateChart(g_chartData);
+    });
+
+    // Changed cells of view datasets since the previous version
+    eventSource.addEventListener('delta', function(event) {
+        var delta = JSON.parse(event.data);
+        if (g_chartData === null || g_chartData.version !== delta.previous_version) {
+            // Missed the base version, the stream is reopened to get the full data again
+            eventSource.close();
+            g_chartData = null;
+            subscribeToChartStream();
+            return;
+        }
+        for (var i = 0; i < delta.cells.length; i++) {
+            var cell = delta.cells[i];
+            g_chartData.view_datasets[cell[0]][cell[1]] = cell[2];
+        }
+        g_chartData.last_price = delta.last_price;
+        g_chartData.is_stale = delta.is_stale;
+        g_chartData.version = delta.version;
+        updateChart(g_chartData);
+    });
+
+    // EventSource reconnects by itself, the full data is sent first after reconnection
+    eventSource.onerror = function() {
+        console.error('Chart stream failed');
+    };
+}
+
+
 const verticalLinePlugin = {
     id: 'draw_vertical_line',
 
@@ -503,6 +561,7 @@ function updateChart(chartData) {
     g_chart.data.labels = chartData['strikes'];
     g_chart.options.plugins['draw_vertical_line'].lineX = chartData['last_price'];
     g_chart.update();
+    document.getElementById('staleDataMessage').hidden = !chartData['is_stale'];
 }
 
 function initDataset(label, data) {
@@ -577,7 +636,17 @@ function initChart() {
     });
 }
 
+const REQUEST_RETRY_INTERVAL = 3000;
+
 var g_requestDataUrl = document.getElementById('requestDataUrl').value;
+var g_streamDataUrl = document.getElementById('streamDataUrl').value;
+var g_chartTransport = document.getElementById('chartTransport').value;
+var g_chartDataVersion = null;
+var g_chartDataEtag = null;
+var g_chartData = null;
 var g_chart = initChart();
-requestChartData();
-setInterval(requestChartData, 3000);
\ No newline at end of file
+if (g_chartTransport === 'sse' && window.EventSource !== undefined) {
+    subscribeToChartStream();
+} else {
+    requestChartData();
+}
\ No newline at end of file